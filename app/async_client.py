@@ -0,0 +1,166 @@
+# app/async_client.py
+import asyncio
+import os
+import threading
+import time
+import weakref
+import httpx
+from . import circuit_breaker, deadline, rate_limit
+from .http_client import HTTP_POOL_MAXSIZE, RETRY_STATUSES, get_config, settle_usage
+
+# Async counterpart of http_client: one httpx.AsyncClient shared by every upstream call made
+# on an event loop, with the same per-provider timeouts and retry policy. Sync code (the
+# Flask views) hands coroutines to a single background loop with run(), so one loop thread
+# multiplexes the I/O of every in-flight trip.
+ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", "100"))
+
+_loop = None
+_loop_lock = threading.Lock()
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_loop():
+    """The shared event loop, started on a daemon thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-upstream", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the shared loop from synchronous code and return its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def get_client():
+    """The AsyncClient for the running loop (one per loop, so normally exactly one)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=HTTP_POOL_MAXSIZE),
+            headers={'Accept-Encoding': 'gzip, deflate'},
+            follow_redirects=True,
+        )
+        _clients[loop] = client
+    return client
+
+
+def _timeout(provider, timeout):
+    if timeout is None:
+        config = get_config(provider)
+        return httpx.Timeout(config['read_timeout'], connect=config['connect_timeout'])
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return timeout
+
+
+def _retry_delay(config, attempt, response):
+    """Seconds to wait before retry number `attempt`, honouring Retry-After like urllib3."""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    if attempt <= 1:
+        return 0
+    return config['backoff'] * (2 ** (attempt - 1))
+
+
+async def request(provider, method, url, timeout=None, rate_wait=None, hedge=False, **kwargs):
+    """Send a request on the shared client with the provider's timeouts, retries, rate limits
+    and circuit breaker; hedge=True races a second attempt against a slow idempotent one."""
+    config = get_config(provider)
+    if timeout is None:
+        timeout = (config['connect_timeout'], config['read_timeout'])
+    timeout = deadline.cap_timeout(timeout)
+    breaker = circuit_breaker.get_breaker(provider)
+    breaker.before_call()
+    tokens = rate_limit.estimate_tokens(kwargs.get('json'))
+    try:
+        await rate_limit.acquire_async(provider, tokens, rate_wait)
+    except rate_limit.OverBudget:
+        breaker.release_probe()
+        raise
+    hedge_delay = breaker.hedge_delay() if hedge and not tokens else 0
+    started = time.monotonic()
+    try:
+        if hedge_delay:
+            response = await _hedged(provider, hedge_delay, config, method, url, timeout, kwargs)
+        else:
+            response = await _send(provider, config, method, url, timeout, kwargs)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record(time.monotonic() - started, ok=response.status_code not in circuit_breaker.FAILURE_STATUSES)
+    if tokens:
+        settle_usage(provider, tokens, response)
+    return response
+
+
+async def _hedged(provider, delay, config, method, url, timeout, kwargs):
+    """Like http_client._hedged: a second attempt after `delay` seconds, first response wins.
+    Attempts still running when this returns or is cancelled are cancelled with it."""
+    first = asyncio.ensure_future(_send(provider, config, method, url, timeout, kwargs))
+    attempts = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        try:
+            await rate_limit.acquire_async(provider, 0, 0)
+        except rate_limit.OverBudget:
+            return await first
+        print(f"[HTTP] Hedging slow {provider} {method} after {delay:.2f}s (async)")
+        attempts.append(asyncio.ensure_future(_send(provider, config, method, url, timeout, kwargs)))
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+    finally:
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
+
+
+async def _send(provider, config, method, url, timeout, kwargs):
+    retry_methods = {m.strip().upper() for m in config['retry_methods'].split(',') if m.strip()}
+    retries = config['retries'] if method.upper() in retry_methods else 0
+    client = get_client()
+    attempt = 0
+    while True:
+        response = None
+        try:
+            response = await client.request(method, url, timeout=_timeout(provider, timeout), **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+        except httpx.ConnectError:
+            # Like urllib3, connection failures are retried whatever the method
+            if attempt >= config['retries']:
+                raise
+        except httpx.TransportError:
+            if attempt >= retries:
+                raise
+        attempt += 1
+        delay = _retry_delay(config, attempt, response)
+        if deadline.low(delay + 0.1):
+            # No time left for another attempt: hand back what we have
+            if response is None:
+                raise deadline.DeadlineExceeded(f"No time left to retry {provider}")
+            return response
+        await asyncio.sleep(delay)
+
+
+async def get(provider, url, **kwargs):
+    return await request(provider, 'GET', url, **kwargs)
+
+
+async def post(provider, url, **kwargs):
+    return await request(provider, 'POST', url, **kwargs)
@@ -0,0 +1,243 @@
+# app/cache.py
+import contextlib
+import contextvars
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Every named cache registers here so /cache_stats can report on all of them
+_registry = {}
+
+# Background refreshes of stale entries (see TTLCache.lookup) share this small pool
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", "4"))
+_refresh_pool = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+# Inside refresh_ahead(seconds), lookups report entries that would expire within that many
+# seconds as misses, so the caller fetches and stores them again before they go cold
+_refresh_margin = contextvars.ContextVar('refresh_margin', default=0)
+
+
+@contextlib.contextmanager
+def refresh_ahead(seconds):
+    """Refresh, rather than reuse, cached entries that expire within `seconds` (used by the warmer)."""
+    token = _refresh_margin.set(seconds)
+    try:
+        yield
+    finally:
+        _refresh_margin.reset(token)
+
+
+def _sizeof(value):
+    """Approximate size of a cached value in bytes."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry.
+
+    Entries expire after `ttl` seconds (None = never) and the least recently used
+    entry is evicted once either `max_entries` or `max_bytes` is exceeded. Negative
+    entries (failed or empty lookups) are stored with the shorter `negative_ttl` so a
+    failing query is not retried on every request.
+
+    With `stale_ttl`, expired (non-negative) entries are kept that many seconds longer:
+    lookups that pass a `refresh` function get the stale value straight away while one
+    background refresh per key fetches a new one. Past the stale window they are misses.
+    """
+
+    def __init__(self, name, ttl=None, max_entries=1024, max_bytes=None, negative_ttl=60, stale_ttl=0):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing = set()
+        self._data = OrderedDict()  # key -> (value, expires_at, size, negative)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.stale_hits = 0
+        self.background_refreshes = 0
+        _registry[name] = self
+
+    def lookup(self, key, refresh=None):
+        """
+        Return (found, value). Expired entries count as misses and are dropped, unless
+        `refresh` is given and the entry is still within `stale_ttl`: then the stale value
+        is returned and refresh() (which should set() the new value) runs in the background,
+        at most once at a time per key.
+        """
+        now = time.monotonic()
+        start_refresh = False
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at, size, negative = entry
+            if expires_at is not None and expires_at <= now:
+                servable = not negative and now < expires_at + self.stale_ttl
+                if not servable or refresh is None or _refresh_margin.get():
+                    if not servable:
+                        self._remove(key)
+                        self.expirations += 1
+                    self.misses += 1
+                    return False, None
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self.background_refreshes += 1
+                    start_refresh = True
+            elif expires_at is not None and expires_at <= now + _refresh_margin.get():
+                # Left in place for other readers until the refreshed value replaces it
+                self.refreshes += 1
+                self.misses += 1
+                return False, None
+            else:
+                self._data.move_to_end(key)
+                if negative:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+        if start_refresh:
+            _refresh_pool.submit(self._run_refresh, key, refresh)
+        return True, value
+
+    def _run_refresh(self, key, refresh):
+        try:
+            refresh()
+        except Exception as e:
+            # The stale value keeps being served until the stale window runs out
+            print(f"[Cache] Refreshing {self.name} entry failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key, default=None):
+        found, value = self.lookup(key)
+        return value if found else default
+
+    def set(self, key, value, ttl=None, negative=False):
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = _sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size, negative)
+            self._bytes += size
+            self._evict()
+
+    def set_negative(self, key, value=None, ttl=None):
+        """Remember that `key` failed or was empty; served until negative_ttl runs out."""
+        self.set(key, value, ttl=ttl, negative=True)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'refreshes': self.refreshes,
+                'stale_hits': self.stale_hits,
+                'background_refreshes': self.background_refreshes,
+                'hit_rate': round((self.hits + self.negative_hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        _, _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is in flight
+    wait for and share its result (or exception). Nothing is remembered afterwards, so
+    pair it with a TTLCache for reuse across time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+def all_stats():
+    """Stats for every registered cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def normalize_key_part(value):
+    """Case- and whitespace-insensitive form of a string used in cache keys."""
+    return ' '.join(str(value or '').lower().split())
@@ -0,0 +1,166 @@
+# app/circuit_breaker.py
+import collections
+import threading
+import time
+from .utils import env_settings
+
+# One breaker per upstream provider. Consecutive failures (errors, 5xx responses, or
+# responses slower than the provider's latency SLO) open the breaker; while it is open calls
+# fail fast with CircuitOpen, so callers go straight to their fallbacks instead of waiting out
+# timeouts. After reset_timeout one probe call is let through: success closes the breaker,
+# failure keeps it open for another reset_timeout.
+# The breaker also keeps recent latencies, which set the delay before a hedged GET sends its
+# second attempt (hedge_delay is used until enough samples exist; 0 disables hedging).
+# Every value can be overridden from the environment, e.g. BREAKER_QLOO_LATENCY_SLO=5
+# or BREAKER_QLOO_FAILURE_THRESHOLD=0 (which disables the breaker).
+BREAKER_DEFAULTS = {
+    'qloo': {'failure_threshold': 5, 'latency_slo': 3.0, 'reset_timeout': 30.0, 'hedge_delay': 1.0, 'min_hedge_delay': 0.2},
+    'together': {'failure_threshold': 3, 'latency_slo': 45.0, 'reset_timeout': 60.0, 'hedge_delay': 0.0, 'min_hedge_delay': 0.0},
+    'openweather': {'failure_threshold': 5, 'latency_slo': 2.0, 'reset_timeout': 30.0, 'hedge_delay': 0.8, 'min_hedge_delay': 0.1},
+    'unsplash': {'failure_threshold': 5, 'latency_slo': 4.0, 'reset_timeout': 30.0, 'hedge_delay': 0.0, 'min_hedge_delay': 0.0},
+    'default': {'failure_threshold': 5, 'latency_slo': 10.0, 'reset_timeout': 30.0, 'hedge_delay': 0.0, 'min_hedge_delay': 0.0},
+}
+
+# Responses that count as failures (429s are the rate limiter's business, not the breaker's)
+FAILURE_STATUSES = (500, 502, 503, 504)
+
+# Latency samples kept per provider, and how many are needed before the p95 is trusted
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+
+def get_breaker_config(provider):
+    """Breaker settings for a provider, with environment overrides applied."""
+    defaults = BREAKER_DEFAULTS.get(provider, BREAKER_DEFAULTS['default'])
+    return env_settings(f"BREAKER_{provider.upper()}_", defaults, int_keys=('failure_threshold',))
+
+
+class CircuitBreaker:
+    def __init__(self, provider, config, clock=time.monotonic):
+        self.provider = provider
+        self.config = config
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.state = 'closed'
+        self.short_circuited = 0
+        self.trips = 0
+
+    def allow(self):
+        """True if a call may go out now. Once reset_timeout has passed, one probe is allowed."""
+        if self.config['failure_threshold'] <= 0:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = self._clock()
+            if now - self._opened_at >= self.config['reset_timeout']:
+                # Let this call probe; the rest keep failing fast until it reports back
+                self.state = 'half_open'
+                self._opened_at = now
+                return True
+            self.short_circuited += 1
+            return False
+
+    def before_call(self):
+        if not self.allow():
+            raise CircuitOpen(f"{self.provider} circuit is open")
+
+    def release_probe(self):
+        """Hand back an admitted call that never went out (e.g. the rate limiter refused it),
+        so a half-open breaker lets the next call probe instead of waiting another reset_timeout."""
+        with self._lock:
+            if self.state == 'half_open':
+                self._opened_at = self._clock() - self.config['reset_timeout']
+
+    def is_open(self):
+        """True while calls would be short-circuited (nothing is counted or probed)."""
+        with self._lock:
+            return (self._opened_at is not None
+                    and self._clock() - self._opened_at < self.config['reset_timeout'])
+
+    def record(self, elapsed, ok=True):
+        """Report a finished call: ok=False for errors and 5xx, slow calls count as failures."""
+        with self._lock:
+            if ok:
+                self._latencies.append(elapsed)
+            if ok and elapsed <= self.config['latency_slo']:
+                self._failures = 0
+                self._opened_at = None
+                self.state = 'closed'
+                return
+            self._failures += 1
+            threshold = self.config['failure_threshold']
+            if threshold > 0 and (self.state == 'half_open' or self._failures >= threshold):
+                if self.state != 'open':
+                    self.trips += 1
+                    print(f"[Breaker] {self.provider} circuit opened after {self._failures} failures")
+                self.state = 'open'
+                self._opened_at = self._clock()
+
+    def record_failure(self):
+        self.record(0.0, ok=False)
+
+    def p95(self):
+        """95th percentile of recent successful latencies, or None without enough samples."""
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging a GET, or 0 if this provider isn't hedged."""
+        if self.config['hedge_delay'] <= 0:
+            return 0.0
+        p95 = self.p95()
+        if p95 is None:
+            return self.config['hedge_delay']
+        return max(self.config['min_hedge_delay'], p95)
+
+    def stats(self):
+        p95 = self.p95()
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'trips': self.trips,
+            'short_circuited': self.short_circuited,
+            'p95_seconds': round(p95, 3) if p95 is not None else None,
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    """Process-wide breaker for a provider, created on first use."""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(provider, get_breaker_config(provider))
+                _breakers[provider] = breaker
+    return breaker
+
+
+def is_open(provider):
+    """True if calls to this provider are currently being short-circuited."""
+    return get_breaker(provider).is_open()
+
+
+def get_breaker_stats():
+    return {provider: breaker.stats() for provider, breaker in list(_breakers.items())}
+
+
+def reset():
+    """Forget every breaker (used by tests)."""
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,86 @@
+# app/deadline.py
+import asyncio
+import contextlib
+import contextvars
+import os
+import time
+
+# A request-wide time budget. The deadline lives in a context variable, so every upstream call
+# made while handling the request (including from pipeline stage threads and event loop tasks,
+# which inherit the context) caps its timeouts to the time that is left, and fails fast with
+# DeadlineExceeded once it is gone. Callers then take the fallbacks they already have.
+ITINERARY_DEADLINE_SECONDS = float(os.getenv("ITINERARY_DEADLINE_SECONDS", "45"))
+
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting an upstream call when the request's time budget is spent."""
+
+
+@contextlib.contextmanager
+def within(seconds):
+    """Run the block under a deadline `seconds` from now (or the current one, if sooner)."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None if there is no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def low(seconds):
+    """True if there is a deadline and fewer than `seconds` remain before it."""
+    left = remaining()
+    return left is not None and left < seconds
+
+
+def cap_timeout(timeout):
+    """A requests-style timeout (number or (connect, read) tuple) shortened to the time left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline passed")
+    if isinstance(timeout, tuple):
+        return tuple(min(part, left) for part in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def cap_wait(wait):
+    """A wait in seconds (None for no limit) shortened to the time left."""
+    left = remaining()
+    if left is None:
+        return wait
+    return left if wait is None else min(wait, left)
+
+
+async def run_within(make_coro, fallback, min_seconds=0):
+    """
+    Await make_coro() until the current deadline, or return fallback() instead if the
+    deadline passes first or fewer than `min_seconds` are left to begin with.
+    """
+    if low(min_seconds):
+        print(f"[Deadline] {remaining():.1f}s left, skipping to the fallback")
+        return fallback()
+    try:
+        return await asyncio.wait_for(make_coro(), remaining())
+    except asyncio.TimeoutError:
+        print("[Deadline] Ran out of time, using the fallback")
+        return fallback()
@@ -0,0 +1,49 @@
+# app/destinations.py
+import json
+import os
+from .matching import inference_targets
+
+# The destinations users land on most: keyword fallbacks, Qloo inference targets and the
+# cities with hand-written descriptions and venue lists. One table (data/destinations.json)
+# feeds get_city_info, the keyword fallback, the Qloo venue fallback and the cache warmer.
+DESTINATIONS_FILE = os.getenv(
+    "DESTINATIONS_FILE", os.path.join(os.path.dirname(__file__), "data", "destinations.json")
+)
+
+
+def load_catalog(path=DESTINATIONS_FILE):
+    """(city -> entry, default venue list) from a destinations file."""
+    with open(path, encoding='utf-8') as f:
+        table = json.load(f)
+    return {entry['city']: entry for entry in table['cities']}, table['default_venues']
+
+
+_catalog, DEFAULT_VENUES = load_catalog()
+
+
+def description(city):
+    entry = _catalog.get(city) or {}
+    return entry.get('description') or f'{city} is a vibrant destination offering rich cultural experiences and unique local attractions.'
+
+
+def known_venues(city):
+    """Hand-picked venues for the keyword fallback (generic places for unknown cities)."""
+    entry = _catalog.get(city) or {}
+    return list(entry.get('venues') or DEFAULT_VENUES)
+
+
+def search_fallback_venues(city):
+    """Venues shown when Qloo finds nothing for a city."""
+    entry = _catalog.get(city) or {}
+    return list(entry.get('search_fallback') or DEFAULT_VENUES[:3])
+
+
+def catalog_cities():
+    """[(city, country)] for every catalog city and Qloo inference target, catalog first."""
+    cities = [(entry['city'], entry.get('country')) for entry in _catalog.values()]
+    seen = {city for city, _ in cities}
+    for city, country in inference_targets():
+        if city not in seen:
+            seen.add(city)
+            cities.append((city, country))
+    return cities
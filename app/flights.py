@@ -0,0 +1,67 @@
+# app/flights.py
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from . import rate_limit
+from .cache import TTLCache, SingleFlight, normalize_key_part
+from .itinerary import get_flight_estimate_with_sites
+
+# One Together completion per (origin, destination, month), shared by the itinerary page's
+# AJAX call and the PDF. Failures ("Contact travel agent...") are kept only briefly.
+_estimate_cache = TTLCache(
+    'flight_estimates',
+    ttl=int(os.getenv("FLIGHT_CACHE_TTL", str(12 * 3600))),
+    max_entries=int(os.getenv("FLIGHT_CACHE_MAX_ENTRIES", "2048")),
+    negative_ttl=int(os.getenv("FLIGHT_CACHE_NEGATIVE_TTL", "300")),
+)
+_in_flight = SingleFlight()
+_prefetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FLIGHT_PREFETCH_WORKERS", "4")), thread_name_prefix="flight-prefetch"
+)
+
+_MONTH_RE = re.compile(r'(\d{4})-(\d{1,2})')
+
+
+def normalize_month(month):
+    """'2025-7', '2025-07' and '2025-07-14' all become '2025-07'; anything else is just normalized text."""
+    match = _MONTH_RE.search(str(month or ''))
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}"
+    return normalize_key_part(month)
+
+
+def estimate_key(origin, destination, month):
+    return (normalize_key_part(origin), normalize_key_part(destination), normalize_month(month))
+
+
+def _compute(origin, destination, month, key):
+    price, sites = get_flight_estimate_with_sites(origin, destination, month)
+    if str(price).startswith('$'):
+        _estimate_cache.set(key, (price, sites))
+    else:
+        _estimate_cache.set_negative(key, (price, sites))
+    return price, sites
+
+
+def get_estimate(origin, destination, month):
+    """(price, sites) for a round trip, from cache, a call already in flight, or a new completion."""
+    key = estimate_key(origin, destination, month)
+    found, cached = _estimate_cache.lookup(key)
+    if found:
+        return cached
+    return _in_flight.do(key, _compute, origin, destination, normalize_month(month), key)
+
+
+def prefetch_estimate(origin, destination, month):
+    """Start computing an estimate in the background so it's ready when the page asks."""
+    if _estimate_cache.get(estimate_key(origin, destination, month)) is not None:
+        return
+    if rate_limit.over_budget('together'):
+        # Speculative work: leave the budget to requests someone is waiting on
+        return
+    future = _prefetch_pool.submit(get_estimate, origin, destination, month)
+    future.add_done_callback(lambda f: f.exception() and print(f"[Flights] Prefetch failed: {f.exception()}"))
+
+
+def get_estimate_cache_stats():
+    return dict(_estimate_cache.stats(), coalesced=_in_flight.coalesced)
@@ -2,14 +2,27 @@
 import os
 import requests
 from .qloo_api import get_qloo_branding_info
+from .destinations import DEFAULT_VENUES, known_venues, description as destination_description
+from .matching import best_destination
+from .taxonomy import cultural_paths, group_venues
 
 def get_taste_recommendations(user_input):
     """Get destination using Qloo's Taste AI™ based on cultural preferences"""
-    from .qloo_api import get_taste_based_destinations, get_qloo_branding_info
+    from .qloo_api import get_taste_based_destinations
     
     # Always use Qloo for destination recommendation
     print(f"DEBUG: Calling Qloo with user_input: {user_input}")
-    qloo_result = get_taste_based_destinations(user_input)
+    return recommendations_from_qloo(user_input, get_taste_based_destinations(user_input))
+
+async def get_taste_recommendations_async(user_input):
+    """get_taste_recommendations with the Qloo searches awaited on the event loop."""
+    from .qloo_api import get_taste_based_destinations_async
+
+    print(f"DEBUG: Calling Qloo (async) with user_input: {user_input}")
+    return recommendations_from_qloo(user_input, await get_taste_based_destinations_async(user_input))
+
+def recommendations_from_qloo(user_input, qloo_result):
+    """Trip destination from the Qloo result, or the keyword fallback when Qloo had nothing."""
     print(f"DEBUG: Qloo returned: {qloo_result}")
     
     if qloo_result:
@@ -46,83 +59,14 @@ def get_taste_recommendations(user_input):
     # Combine all user preferences for analysis
     all_preferences = f"{music} {movie} {food}".lower()
     
-    # City keyword mapping
-    city_keywords = {
-        'Paris': ['french', 'france', 'paris', 'louvre', 'eiffel', 'baguette', 'croissant', 'wine', 'cheese', 'amélie', 'godard'],
-        'Rome': ['italian', 'italy', 'rome', 'pasta', 'pizza', 'vatican', 'colosseum', 'fellini', 'gelato'],
-        'Tokyo': ['japanese', 'japan', 'tokyo', 'sushi', 'anime', 'manga', 'ramen', 'miyazaki', 'kurosawa'],
-        'London': ['british', 'england', 'london', 'tea', 'fish and chips', 'beatles', 'shakespeare', 'pub'],
-        'Barcelona': ['spanish', 'spain', 'barcelona', 'tapas', 'paella', 'flamenco', 'gaudí', 'catalan'],
-        'Berlin': ['german', 'germany', 'berlin', 'beer', 'sausage', 'techno', 'bowie', 'kraftwerk'],
-        'Amsterdam': ['dutch', 'netherlands', 'amsterdam', 'cheese', 'stroopwafel', 'van gogh', 'rembrandt'],
-        'Madrid': ['spanish', 'spain', 'madrid', 'tapas', 'flamenco', 'prado', 'almodovar']
-    }
-    
-    # Find best matching city
-    best_match_score = 0
-    for city, keywords in city_keywords.items():
-        score = sum(1 for keyword in keywords if keyword in all_preferences)
-        if score > best_match_score:
-            best_match_score = score
-            recommended_city = city
-    
-    # Get venues based on city with proper fallbacks
-    def get_city_specific_venues(city, venues_needed):
-        city_venues = {
-            'Barcelona': ['Park Güell', 'Sagrada Familia', 'Gothic Quarter', 'El Born District', 'La Boqueria Market', 'Casa Batlló', 'Picasso Museum', 'Barceloneta Beach', 'Montjuïc Hill', 'Casa Milà', 'Palau de la Música', 'Camp Nou'],
-            'Paris': ['Eiffel Tower', 'Louvre Museum', 'Notre-Dame', 'Champs-Élysées', 'Montmartre', 'Arc de Triomphe', 'Seine River', 'Latin Quarter', 'Marais District', 'Versailles'],
-            'Rome': ['Colosseum', 'Vatican City', 'Trevi Fountain', 'Roman Forum', 'Pantheon', 'Spanish Steps', 'Trastevere', 'Campo de Fiori', 'Villa Borghese', 'Castel Sant Angelo'],
-            'Tokyo': ['Shibuya Crossing', 'Senso-ji Temple', 'Tsukiji Market', 'Harajuku', 'Tokyo Skytree', 'Meiji Shrine', 'Akihabara', 'Ginza', 'Ueno Park', 'Roppongi'],
-            'London': ['Big Ben', 'Tower Bridge', 'British Museum', 'Hyde Park', 'Covent Garden', 'Camden Market', 'Tate Modern', 'Westminster Abbey', 'Buckingham Palace', 'Thames River'],
-            'Berlin': ['Brandenburg Gate', 'Museum Island', 'East Side Gallery', 'Checkpoint Charlie', 'Reichstag', 'Potsdamer Platz', 'Kreuzberg', 'Tiergarten', 'Hackescher Markt', 'Alexanderplatz'],
-            'Amsterdam': ['Anne Frank House', 'Van Gogh Museum', 'Rijksmuseum', 'Jordaan District', 'Red Light District', 'Vondelpark', 'Canal Ring', 'Dam Square', 'Bloemenmarkt', 'Museumplein'],
-            'Madrid': ['Prado Museum', 'Royal Palace', 'Retiro Park', 'Gran Vía', 'Plaza Mayor', 'Reina Sofía Museum', 'Thyssen Museum', 'Malasaña', 'La Latina', 'Temple of Debod']
-        }
-        
-        venues = city_venues.get(city, ['City Center', 'Historic District', 'Cultural Quarter', 'Main Square', 'Local Market', 'Arts District'])
-        return venues[:venues_needed]
+    # Find best matching city (one pass over the compiled keyword table)
+    recommended_city = best_destination(all_preferences, default=recommended_city)
     
     # Get city-specific venues
-    dynamic_venues = get_city_specific_venues(recommended_city, venues_needed)
+    dynamic_venues = known_venues(recommended_city)[:venues_needed]
     
     # Categorize venues by type for organized format
-    music_venues = []
-    film_venues = []
-    food_venues = []
-    additional_venues = []
-    
-    for venue in dynamic_venues:
-        venue_lower = venue.lower()
-        if any(word in venue_lower for word in ['music', 'concert', 'palau', 'born', 'gracia']):
-            music_venues.append(venue)
-        elif any(word in venue_lower for word in ['market', 'boqueria', 'food', 'mercat', 'raval']):
-            food_venues.append(venue)
-        elif any(word in venue_lower for word in ['gothic', 'museum', 'park', 'casa', 'sagrada', 'ciutadella', 'poble']):
-            film_venues.append(venue)
-        else:
-            additional_venues.append(venue)
-    
-    # Get additional spots using remaining venues only
-    def get_additional_spots_clean(city, music, movie, food, remaining_venues):
-        additional_spots = []
-        
-        for venue in remaining_venues:
-            if len(additional_spots) < 6:
-                if any(word in venue.lower() for word in ['beach', 'hill', 'mountain']):
-                    cultural_path = f'{music} → Scenic inspiration → {venue}'
-                elif any(word in venue.lower() for word in ['stadium', 'camp']):
-                    cultural_path = f'{movie} → Sports culture → {venue}'
-                elif any(word in venue.lower() for word in ['port', 'vell']):
-                    cultural_path = f'{food} → Waterfront dining → {venue}'
-                else:
-                    cultural_path = f'Cultural exploration → {venue}'
-                
-                additional_spots.append({
-                    'venue': venue,
-                    'cultural_path': cultural_path
-                })
-        
-        return additional_spots[:6]
+    music_venues, food_venues, film_venues, additional_venues = group_venues(dynamic_venues)
     
     # Create organized taste mapping structure
     taste_mapping = {
@@ -149,7 +93,7 @@ def get_taste_recommendations(user_input):
                 'cultural_path': f"{food} → Culinary culture → {venue}"
             } for venue in food_venues[:3]
         ],
-        'additional_spots': get_additional_spots_clean(recommended_city, music, movie, food, additional_venues)
+        'additional_spots': cultural_paths(additional_venues, music, movie, food)
     }
     
     fallback_reason = f"""No exact match found, but {recommended_city} captures your cultural vibe! 🌟
@@ -177,24 +121,10 @@ Your unique tastes deserve exploration — this destination offers rich cultural
 def get_city_info(city_name, venues=None):
     """Get comprehensive city information using provided venues for consistency"""
     
-    # Enhanced city descriptions for better context
-    city_descriptions = {
-        'Liverpool': 'Liverpool is a vibrant port city in northwest England, famous as the birthplace of The Beatles and home to a rich musical heritage that shaped global pop culture.',
-        'Berlin': 'Berlin is Germany\'s dynamic capital, a city where history meets cutting-edge culture, known for its artistic innovation and transformative musical scenes.',
-        'Rome': 'Rome is the eternal city where ancient history meets culinary excellence, offering authentic Italian cuisine in the very place where it originated.',
-        'Tokyo': 'Tokyo is a mesmerizing metropolis that seamlessly blends traditional Japanese culture with ultra-modern innovation, creating a unique cultural experience.',
-        'Barcelona': 'Barcelona is a captivating Mediterranean city renowned for its distinctive architecture, vibrant arts scene, and exceptional culinary culture.',
-        'Paris': 'Paris is the city of light and love, a cultural epicenter known for its artistic heritage, world-class cuisine, and cinematic history.',
-        'New Orleans': 'New Orleans is a soulful city where jazz was born, offering a unique blend of musical heritage, Creole culture, and distinctive cuisine.',
-        'Vienna': 'Vienna is the imperial city of music, home to classical composers and elegant coffee house culture in the heart of Europe.',
-        'Amsterdam': 'Amsterdam is a charming canal city known for its artistic heritage, liberal culture, and historic architecture.',
-        'Madrid': 'Madrid is Spain\'s vibrant capital, renowned for its world-class museums, lively tapas culture, and passionate flamenco traditions.'
-    }
-    
-    description = city_descriptions.get(city_name, f'{city_name} is a vibrant destination offering rich cultural experiences and unique local attractions.')
+    description = destination_description(city_name)
     
     # Use provided venues for consistency, or fallback to generic places
-    places = venues if venues else ['City Center', 'Historic District', 'Cultural Quarter', 'Main Square']
+    places = venues if venues else DEFAULT_VENUES[:4]
     
     return {
         'name': city_name,
@@ -0,0 +1,184 @@
+# app/http_client.py
+import os
+import threading
+import time
+from concurrent import futures
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from . import circuit_breaker, deadline, rate_limit
+from .utils import env_settings
+
+# Per-provider defaults. Every value can be overridden from the environment, e.g.
+# HTTP_TOGETHER_READ_TIMEOUT=90 or HTTP_QLOO_RETRIES=0.
+PROVIDER_DEFAULTS = {
+    'qloo': {'connect_timeout': 3.05, 'read_timeout': 10, 'retries': 2, 'backoff': 0.3, 'retry_methods': 'GET'},
+    'together': {'connect_timeout': 5, 'read_timeout': 60, 'retries': 1, 'backoff': 0.5, 'retry_methods': 'GET'},
+    'openweather': {'connect_timeout': 3.05, 'read_timeout': 8, 'retries': 2, 'backoff': 0.3, 'retry_methods': 'GET'},
+    'unsplash': {'connect_timeout': 3.05, 'read_timeout': 8, 'retries': 2, 'backoff': 0.3, 'retry_methods': 'GET'},
+    'images': {'connect_timeout': 3.05, 'read_timeout': 15, 'retries': 1, 'backoff': 0.3, 'retry_methods': 'GET'},
+    'default': {'connect_timeout': 3.05, 'read_timeout': 15, 'retries': 1, 'backoff': 0.3, 'retry_methods': 'GET'},
+}
+
+# Connections kept alive per host inside each provider's pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Threads that send both attempts of hedged requests
+HTTP_HEDGE_WORKERS = int(os.getenv("HTTP_HEDGE_WORKERS", "16"))
+_hedge_pool = futures.ThreadPoolExecutor(max_workers=HTTP_HEDGE_WORKERS, thread_name_prefix="http-hedge")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# Parsed settings per provider, read from the environment once (close_all forgets them)
+_configs = {}
+
+
+def get_config(provider):
+    """Timeouts and retry settings for a provider, with environment overrides applied."""
+    config = _configs.get(provider)
+    if config is None:
+        defaults = PROVIDER_DEFAULTS.get(provider, PROVIDER_DEFAULTS['default'])
+        config = _configs[provider] = env_settings(f"HTTP_{provider.upper()}_", defaults, int_keys=('retries',))
+    return config
+
+
+def default_timeout(provider):
+    """(connect, read) timeout tuple used when a caller doesn't pass one."""
+    config = get_config(provider)
+    return (config['connect_timeout'], config['read_timeout'])
+
+
+def _build_session(provider):
+    config = get_config(provider)
+    retry = Retry(
+        total=config['retries'],
+        connect=config['retries'],
+        read=config['retries'],
+        status=config['retries'],
+        backoff_factor=config['backoff'],
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(m.strip().upper() for m in config['retry_methods'].split(',') if m.strip()),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+
+def get_session(provider):
+    """Process-wide keep-alive session for a provider, created on first use."""
+    session = _sessions.get(provider)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                session = _build_session(provider)
+                _sessions[provider] = session
+    return session
+
+
+def request(provider, method, url, rate_wait=None, hedge=False, **kwargs):
+    """
+    Send a request through the provider's pooled session with its default timeouts, cut
+    short by the current request deadline (see deadline.py). Raises
+    circuit_breaker.CircuitOpen without sending if the provider's breaker is open.
+    The provider's rate limits are applied next: the call waits up to `rate_wait` seconds
+    (the provider's max_wait by default) for capacity, else raises rate_limit.OverBudget
+    and hands its breaker slot back.
+    With hedge=True an idempotent request that is slower than the provider's recent p95 is
+    sent a second time and whichever response arrives first is returned.
+    """
+    if kwargs.get('timeout') is None:
+        kwargs['timeout'] = default_timeout(provider)
+    # Never wait past the request's deadline, if one is set
+    kwargs['timeout'] = deadline.cap_timeout(kwargs['timeout'])
+    breaker = circuit_breaker.get_breaker(provider)
+    breaker.before_call()
+    tokens = rate_limit.estimate_tokens(kwargs.get('json'))
+    try:
+        rate_limit.acquire(provider, tokens, rate_wait)
+    except rate_limit.OverBudget:
+        breaker.release_probe()
+        raise
+    hedge_delay = breaker.hedge_delay() if hedge and not tokens and not kwargs.get('stream') else 0
+    started = time.monotonic()
+    try:
+        if hedge_delay:
+            response = _hedged(provider, hedge_delay, method, url, kwargs)
+        else:
+            response = get_session(provider).request(method, url, **kwargs)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record(time.monotonic() - started, ok=response.status_code not in circuit_breaker.FAILURE_STATUSES)
+    if tokens and not kwargs.get('stream'):
+        settle_usage(provider, tokens, response)
+    return response
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _hedged(provider, delay, method, url, kwargs):
+    """Send once; if there is no answer after `delay` seconds send again and take the first response."""
+    send = lambda: get_session(provider).request(method, url, **kwargs)
+    first = _hedge_pool.submit(send)
+    try:
+        return first.result(timeout=delay)
+    except futures.TimeoutError:
+        pass
+    try:
+        # The second attempt only goes out if there is spare capacity right now
+        rate_limit.acquire(provider, 0, 0)
+    except rate_limit.OverBudget:
+        return first.result()
+    print(f"[HTTP] Hedging slow {provider} {method} after {delay:.2f}s")
+    attempts = [first, _hedge_pool.submit(send)]
+    error = None
+    for done in futures.as_completed(attempts):
+        if done.exception() is None:
+            for other in attempts:
+                if other is not done:
+                    other.add_done_callback(_close_response)
+            return done.result()
+        error = done.exception()
+    raise error
+
+
+def settle_usage(provider, estimated_tokens, response):
+    """Replace the estimated token spend of an LLM call with what the response reports."""
+    try:
+        actual = rate_limit.usage_tokens(response.json())
+    except Exception:
+        return
+    rate_limit.get_limiter(provider).settle(estimated_tokens, actual)
+
+
+def settle_streamed_usage(provider, body, chunk):
+    """settle_usage for a streamed LLM call: `chunk` is the final chunk, which carries the usage."""
+    rate_limit.get_limiter(provider).settle(rate_limit.estimate_tokens(body), rate_limit.usage_tokens(chunk))
+
+
+def get(provider, url, **kwargs):
+    return request(provider, 'GET', url, **kwargs)
+
+
+def post(provider, url, **kwargs):
+    return request(provider, 'POST', url, **kwargs)
+
+
+def close_all():
+    """Drop every pooled connection and parsed setting (used by tests and on shutdown)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _configs.clear()
@@ -0,0 +1,49 @@
+# app/idempotency.py
+import hashlib
+import json
+import os
+from .cache import TTLCache, SingleFlight
+
+# Double-clicks, refreshes and repeated PDF clicks re-send the same form. Requests are keyed
+# on the canonical payload (plus the client's idempotency key when it sends one): a repeat
+# that arrives while the first is running waits for it, and one arriving within
+# IDEMPOTENCY_TTL seconds gets the stored result. Results the caller marks as not worth
+# keeping (degraded pages) are only shared with the requests already waiting on them.
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "300"))
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_FIELD = "idempotency_key"
+
+_results = TTLCache(
+    'idempotent_results',
+    ttl=IDEMPOTENCY_TTL,
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("IDEMPOTENCY_MAX_BYTES", str(64 * 1024 * 1024))) or None,
+)
+_in_flight = SingleFlight()
+
+
+def request_key(scope, form, client_key=None):
+    """Key for one logical request: scope, client key (if any) and a hash of the form fields."""
+    fields = {k: v for k, v in form.to_dict(flat=False).items() if k != IDEMPOTENCY_FIELD}
+    client_key = client_key or form.get(IDEMPOTENCY_FIELD, '')
+    payload = json.dumps([scope, client_key, fields], sort_keys=True, ensure_ascii=False)
+    return f"{scope}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def run_once(key, func, *args, keep=None):
+    """
+    func(*args), shared with identical requests in flight and reused for IDEMPOTENCY_TTL
+    seconds, unless keep(result) is false: then the next identical request runs again.
+    """
+    found, cached = _results.lookup(key)
+    if found:
+        print(f"[Idempotency] Replaying stored result for {key[:24]}")
+        return cached
+    return _in_flight.do(key, _run_and_store, key, func, args, keep)
+
+
+def _run_and_store(key, func, args, keep):
+    result = func(*args)
+    if keep is None or keep(result):
+        _results.set(key, result)
+    return result
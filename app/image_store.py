@@ -0,0 +1,191 @@
+# app/image_store.py
+import contextvars
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from . import deadline, http_client
+from .cache import TTLCache, normalize_key_part
+from .unsplash_api import get_image_batch
+
+# Destination photos are fetched from Unsplash in batches per city, stored on disk under the
+# SHA-256 of the original bytes and served locally in pre-resized variants.
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(tempfile.gettempdir(), "tastetrip_images"))
+IMAGE_BATCH_SIZE = int(os.getenv("IMAGE_BATCH_SIZE", "5"))
+IMAGE_STORE_TTL = int(os.getenv("IMAGE_STORE_TTL", str(7 * 24 * 3600)))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+DEFAULT_IMAGE = "/static/images/logo.png"
+
+# Variant name -> max width in pixels. 'page' is the itinerary hero, 'pdf' is what the PDF embeds.
+VARIANT_WIDTHS = {
+    'thumb': 400,
+    'pdf': 1000,
+    'page': 1280,
+}
+
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+_LOCAL_URL_RE = re.compile(r'/images/([0-9a-f]{64})/(\w+)\.jpg$')
+
+# City -> list of digests. Mirrors the JSON index files on disk; a failed batch is remembered
+# briefly so a missing key or an outage doesn't hit Unsplash on every page.
+# Past IMAGE_STORE_TTL a city's batch is still served for IMAGE_STORE_STALE_TTL while a new
+# batch is fetched in the background
+IMAGE_STORE_STALE_TTL = int(os.getenv("IMAGE_STORE_STALE_TTL", str(7 * 24 * 3600)))
+_index_cache = TTLCache('image_index', ttl=IMAGE_STORE_TTL, max_entries=1024, negative_ttl=300,
+                        stale_ttl=IMAGE_STORE_STALE_TTL)
+_download_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-download")
+_rotation = {}
+_rotation_lock = threading.Lock()
+_city_locks = {}
+_city_locks_lock = threading.Lock()
+
+
+def _city_key(city):
+    return normalize_key_part(city)
+
+
+def _index_path(city_key):
+    name = hashlib.sha256(city_key.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(IMAGE_STORE_DIR, 'cities', f"{name}.json")
+
+
+def variant_path(digest, variant):
+    return os.path.join(IMAGE_STORE_DIR, digest[:2], digest, f"{variant}.jpg")
+
+
+def local_url(digest, variant='page'):
+    return f"/images/{digest}/{variant}.jpg"
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def store_image(data):
+    """Store original image bytes as resized JPEG variants; returns the content digest."""
+    digest = hashlib.sha256(data).hexdigest()
+    if all(os.path.exists(variant_path(digest, v)) for v in VARIANT_WIDTHS):
+        return digest
+    with Image.open(io.BytesIO(data)) as original:
+        original = original.convert('RGB')
+        for variant, max_width in VARIANT_WIDTHS.items():
+            img = original.copy()
+            if img.width > max_width:
+                img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, 'JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+            _write_atomic(variant_path(digest, variant), out.getvalue())
+    return digest
+
+
+def _download(photo):
+    try:
+        response = http_client.get('images', photo['url'])
+        if response.status_code == 200:
+            return store_image(response.content)
+        print(f"[Images] Download failed with status {response.status_code}: {photo['url']}")
+    except Exception as e:
+        print(f"[Images] Could not store {photo['url']}: {e}")
+    return None
+
+
+def _load_index(city_key):
+    try:
+        with open(_index_path(city_key), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - index.get('fetched_at', 0) > IMAGE_STORE_TTL:
+        return None
+    digests = [d for d in index.get('images', []) if _DIGEST_RE.match(d) and os.path.exists(variant_path(d, 'page'))]
+    return digests or None
+
+
+def _fetch_batch(city, city_key):
+    """Fetch a batch of photos for a city, store them, and write its index."""
+    photos = get_image_batch(city, IMAGE_BATCH_SIZE)
+    # Downloads run in copies of the caller's context, so they keep the request deadline
+    futures = [_download_pool.submit(contextvars.copy_context().run, _download, photo) for photo in photos]
+    digests = [d for d in (future.result() for future in futures) if d]
+    digests = list(dict.fromkeys(digests))
+    if digests:
+        index = {'city': city_key, 'fetched_at': time.time(), 'images': digests}
+        _write_atomic(_index_path(city_key), json.dumps(index).encode('utf-8'))
+        print(f"[Images] Stored {len(digests)} photos for {city}")
+    return digests
+
+
+def _refresh_city(city, city_key):
+    """Replace a stale batch in the background; the stale one stays if nothing comes back."""
+    digests = _fetch_batch(city, city_key)
+    if digests:
+        _index_cache.set(city_key, digests)
+
+
+def city_images(city):
+    """Digests of the stored photos for a city, fetching a batch on first use."""
+    city_key = _city_key(city)
+    found, digests = _index_cache.lookup(city_key, refresh=lambda: _refresh_city(city, city_key))
+    if found:
+        return digests
+    with _city_locks_lock:
+        lock = _city_locks.setdefault(city_key, threading.Lock())
+    with lock:
+        # Another request may have filled it while we waited
+        found, digests = _index_cache.lookup(city_key)
+        if found:
+            return digests
+        digests = _load_index(city_key) or _fetch_batch(city, city_key)
+        if digests:
+            _index_cache.set(city_key, digests)
+        elif not deadline.expired():
+            # A fetch cut short by the request deadline says nothing about the city
+            _index_cache.set_negative(city_key, [])
+        return digests
+
+
+def city_image(city, variant='page'):
+    """Local URL of the next stored photo for a city, rotating through the batch."""
+    digests = city_images(city)
+    if not digests:
+        return DEFAULT_IMAGE
+    city_key = _city_key(city)
+    with _rotation_lock:
+        counter = _rotation.setdefault(city_key, itertools.count())
+        position = next(counter)
+    return local_url(digests[position % len(digests)], variant)
+
+
+def read_variant(digest, variant):
+    """Bytes of a stored variant, or None if it isn't in the store."""
+    if not _DIGEST_RE.match(digest or '') or variant not in VARIANT_WIDTHS:
+        return None
+    try:
+        with open(variant_path(digest, variant), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def read_local_url(url, variant=None):
+    """Bytes behind a /images/... URL (optionally a different variant), or None for other URLs."""
+    match = _LOCAL_URL_RE.search(url or '')
+    if not match:
+        return None
+    return read_variant(match.group(1), variant or match.group(2))
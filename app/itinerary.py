@@ -1,10 +1,39 @@
 import os
-import requests
+import asyncio
+import contextvars
+import copy
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from . import async_client, deadline, http_client
+from .cache import TTLCache, normalize_key_part
+from .schemas import parse_completion
 
 
 load_dotenv()
 API_KEY = os.getenv("TOGETHER_API_KEY")
+TOGETHER_CHAT_URL = "https://api.together.xyz/v1/chat/completions"
+ITINERARY_MODEL = "mistralai/Mistral-7B-Instruct-v0.1"
+
+# Generated itineraries keyed on a hash of the trip inputs. Only responses that parsed as
+# valid JSON are stored, so error and fallback dicts are always regenerated.
+_itinerary_cache = TTLCache(
+    'itinerary',
+    ttl=int(os.getenv("ITINERARY_CACHE_TTL", str(24 * 3600))),
+    max_entries=int(os.getenv("ITINERARY_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("ITINERARY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))) or None,
+)
+# Forecast temperatures are grouped into bands this many degrees wide so a 1°C change rarely changes the key
+ITINERARY_CACHE_TEMP_BUCKET = int(os.getenv("ITINERARY_CACHE_TEMP_BUCKET", "5"))
+
+# "single" asks for every section and day in one completion; "split" issues one completion per
+# auxiliary section and one per week of days concurrently, so wall time tracks the slowest chunk
+ITINERARY_GENERATION_MODE = os.getenv("ITINERARY_GENERATION_MODE", "single")
+ITINERARY_DAYS_PER_CHUNK = int(os.getenv("ITINERARY_DAYS_PER_CHUNK", "7"))
+ITINERARY_SPLIT_MAX_WORKERS = int(os.getenv("ITINERARY_SPLIT_MAX_WORKERS", "12"))
+_split_pool = ThreadPoolExecutor(max_workers=ITINERARY_SPLIT_MAX_WORKERS, thread_name_prefix="itinerary-split")
 
 def get_flight_estimate(origin, destination, month_year):
     """
@@ -26,16 +55,36 @@ def get_flight_estimate(origin, destination, month_year):
         "temperature": 0.3
     }
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.post('together', url, headers=headers, json=data)
         response.raise_for_status()
-        result = response.json()
-        price_str = result['choices'][0]['message']['content'].strip().replace('$','')
-        price = float(''.join([c for c in price_str if (c.isdigit() or c=='.')]))
-        summary = f"Estimated round-trip flight from {origin} to {destination} in {month_year}: ${int(price)} USD (economy)"
-        return price, summary
+        return _flight_price(response.json(), origin, destination, month_year)
+    except Exception as e:
+        return None, f"(Flight estimate unavailable: {str(e)})"
+
+async def get_flight_estimate_async(origin, destination, month_year):
+    """get_flight_estimate on the shared async client."""
+    prompt = f"""
+    Estimate the average round-trip economy flight price in USD from {origin} to {destination} for travel in {month_year}. Respond with just a number (no currency sign, no explanation).
+    """
+    data = {
+        "model": ITINERARY_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 20,
+        "temperature": 0.3
+    }
+    try:
+        response = await async_client.post('together', TOGETHER_CHAT_URL, headers=together_headers(), json=data)
+        response.raise_for_status()
+        return _flight_price(response.json(), origin, destination, month_year)
     except Exception as e:
         return None, f"(Flight estimate unavailable: {str(e)})"
 
+def _flight_price(result, origin, destination, month_year):
+    price_str = result['choices'][0]['message']['content'].strip().replace('$','')
+    price = float(''.join([c for c in price_str if (c.isdigit() or c=='.')]))
+    summary = f"Estimated round-trip flight from {origin} to {destination} in {month_year}: ${int(price)} USD (economy)"
+    return price, summary
+
 def get_flight_estimate_with_sites(origin, destination, month_year):
     """
     Get flight price estimate using Together AI
@@ -49,18 +98,58 @@ def get_flight_estimate_with_sites(origin, destination, month_year):
     
     return "Contact travel agent for pricing", ["Skyscanner", "Kayak", "Expedia"]
 
-def generate_itinerary_and_sections(taste_data, weather=None):
-    """
-    Prompts the AI to return: itinerary (with day activities in morning/afternoon/evening), packing checklist, cultural tips, budget (in USDT), transport tips, safety tags, closing message.
-    Returns a dict with keys: itinerary, packing, tips, budget, transport, safety, closing.
-    """
+def weather_bucket(weather):
+    """Coarse, hashable summary of a forecast: lower-cased condition and rounded temperature per day."""
+    if not weather or not isinstance(weather, list):
+        return []
+    bucket = []
+    for day in weather:
+        if not isinstance(day, dict):
+            continue
+        temp = day.get('temp')
+        try:
+            temp = int(float(temp) // ITINERARY_CACHE_TEMP_BUCKET * ITINERARY_CACHE_TEMP_BUCKET)
+        except (TypeError, ValueError):
+            temp = None
+        bucket.append([normalize_key_part(day.get('desc', '')), temp])
+    return bucket
+
+def trip_dates(taste_data):
+    """[start_date, end_date] as the prompt states them, or None when either is missing."""
+    start_date = str(taste_data.get('start_date') or '').strip()
+    end_date = str(taste_data.get('end_date') or '').strip()
+    return [start_date, end_date] if start_date and end_date else None
+
+def itinerary_cache_key(taste_data, weather=None):
+    """Canonical hash of the inputs that shape the itinerary prompt."""
+    try:
+        num_days = int(taste_data.get('days', '3'))
+    except (ValueError, TypeError):
+        num_days = 3
+    canonical = {
+        'city': normalize_key_part(taste_data.get('city')),
+        'country': normalize_key_part(taste_data.get('country')),
+        'vibe': normalize_key_part(taste_data.get('vibe', 'cultural')),
+        'days': num_days,
+        'venues': [normalize_key_part(v) for v in taste_data.get('venues', []) or []],
+        'taste_mapping': taste_data.get('taste_mapping', []) or [],
+        'weather': weather_bucket(weather),
+        'dates': trip_dates(taste_data),
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_itinerary_cache_stats():
+    return _itinerary_cache.stats()
+
+def trip_prompt_context(taste_data, weather=None):
+    """Trip details and guidance text shared by the single and split itinerary prompts."""
     vibe = taste_data.get("vibe", "cultural")
     city = taste_data['city']
     country = taste_data.get('country', '')
     days = taste_data.get('days', '3')
-    start_date = taste_data.get('start_date', '')
-    end_date = taste_data.get('end_date', '')
-    date_str = f"from {start_date} to {end_date}" if start_date and end_date else "(no dates provided)"
+    dates = trip_dates(taste_data)
+    date_str = f"from {dates[0]} to {dates[1]}" if dates else "(no dates provided)"
     currency = taste_data.get('currency', 'USD')
     themes = taste_data.get('themes', ['','',''])
     venues = taste_data.get('venues', [])
@@ -79,24 +168,6 @@ def generate_itinerary_and_sections(taste_data, weather=None):
     except (ValueError, TypeError):
         num_days = 3
     
-    # For longer trips, create weekly structure
-    if num_days > 14:
-        itinerary_structure = []
-        weeks = num_days // 7
-        remaining_days = num_days % 7
-        
-        for week in range(weeks):
-            week_start = week * 7 + 1
-            itinerary_structure.extend([f'"Day {i}": {{"morning": "morning activity", "afternoon": "afternoon activity", "evening": "evening activity"}}' for i in range(week_start, week_start + 7)])
-        
-        if remaining_days > 0:
-            final_start = weeks * 7 + 1
-            itinerary_structure.extend([f'"Day {i}": {{"morning": "morning activity", "afternoon": "afternoon activity", "evening": "evening activity"}}' for i in range(final_start, final_start + remaining_days)])
-        
-        itinerary_json = ', '.join(itinerary_structure)
-    else:
-        itinerary_json = ', '.join([f'"Day {i+1}": {{"morning": "morning activity in {city}", "afternoon": "afternoon activity in {city}", "evening": "evening activity in {city}"}}' for i in range(num_days)])
-    
     # Create venue-specific guidance for AI
     venue_guidance = ""
     if venues:
@@ -125,6 +196,39 @@ def generate_itinerary_and_sections(taste_data, weather=None):
         
         if taste_details:
             taste_guidance = f"\nTASTE CONNECTIONS: {'; '.join(taste_details)}. Ensure each day's activities reflect these personal taste connections."
+
+    return {
+        'city': city, 'country': country, 'vibe': vibe, 'num_days': num_days,
+        'date_str': date_str, 'venues': venues, 'weather_summary': weather_summary,
+        'venue_guidance': venue_guidance, 'taste_guidance': taste_guidance,
+    }
+
+def day_chunks(num_days, size=7):
+    """Split days 1..num_days into (first, last) ranges of `size` days, remainder last."""
+    chunks = []
+    weeks = num_days // size
+    for week in range(weeks):
+        chunks.append((week * size + 1, week * size + size))
+    if num_days % size:
+        chunks.append((weeks * size + 1, num_days))
+    return chunks
+
+def build_itinerary_request(taste_data, weather=None):
+    """Build the Together chat request for the full itinerary prompt."""
+    ctx = trip_prompt_context(taste_data, weather)
+    city, country, vibe, num_days = ctx['city'], ctx['country'], ctx['vibe'], ctx['num_days']
+    date_str, venues = ctx['date_str'], ctx['venues']
+    weather_summary, venue_guidance, taste_guidance = ctx['weather_summary'], ctx['venue_guidance'], ctx['taste_guidance']
+
+    # For longer trips, create weekly structure
+    if num_days > 14:
+        itinerary_structure = []
+        for first, last in day_chunks(num_days):
+            itinerary_structure.extend([f'"Day {i}": {{"morning": "morning activity", "afternoon": "afternoon activity", "evening": "evening activity"}}' for i in range(first, last + 1)])
+        
+        itinerary_json = ', '.join(itinerary_structure)
+    else:
+        itinerary_json = ', '.join([f'"Day {i+1}": {{"morning": "morning activity in {city}", "afternoon": "afternoon activity in {city}", "evening": "evening activity in {city}"}}' for i in range(num_days)])
     
     prompt = f'''
     Create a {num_days}-day travel plan for {city}, {country} {date_str} with {vibe} theme.
@@ -154,11 +258,6 @@ def generate_itinerary_and_sections(taste_data, weather=None):
     }}
     '''
 
-    url = "https://api.together.xyz/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
     # Increase max_tokens for longer itineraries with venue details
     base_tokens = 1200
     venue_tokens = len(venues) * 20 if venues else 0
@@ -167,74 +266,363 @@ def generate_itinerary_and_sections(taste_data, weather=None):
     if max_tokens > 4000:
         max_tokens = 4000
     
-    data = {
-        "model": "mistralai/Mistral-7B-Instruct-v0.1",
+    return {
+        "model": ITINERARY_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": max_tokens,
         "temperature": 0.6
     }
+
+def together_headers():
+    return {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+def normalize_sections(data):
+    """Trim packing lists and split budget categories into at most 12 lines each."""
+    # Limit packing items to 8 per category and truncate long text
+    if 'packing' in data and isinstance(data['packing'], dict):
+        for category, items in data['packing'].items():
+            if isinstance(items, list):
+                # Limit to 8 items and truncate text to 30 characters
+                data['packing'][category] = [item[:30] + '...' if len(item) > 30 else item for item in items[:8]]
+
+    # Parse budget as lists of up to 12 lines for each category
+    if 'budget' in data and isinstance(data['budget'], dict):
+        for cat in ['accommodation', 'food', 'activities']:
+            val = data['budget'].get(cat, [])
+            if isinstance(val, str):
+                # Split by line or semicolon
+                lines = [line.strip() for line in re.split(r'[\n;]', val) if line.strip()]
+                data['budget'][cat] = lines[:12]
+            elif isinstance(val, list):
+                # Only keep up to 12 lines
+                data['budget'][cat] = [str(item).strip() for item in val[:12] if str(item).strip()]
+            else:
+                data['budget'][cat] = []
+    return data
+
+def fallback_sections(value):
+    """Same value in every section, used when the model output can't be used."""
+    return {k: value for k in ['packing','tips','local_info','budget','transport','safety','closing','itinerary']}
+
+def is_fallback(sections):
+    """True for fallback_sections output: the same text (an error, a late notice or the raw
+    completion) in every section, so the itinerary is a string instead of days."""
+    return isinstance(sections, dict) and isinstance(sections.get('itinerary'), str)
+
+def finish_sections(content, cache_key=None):
+    """Parse a completion into the sections dict, caching it only if it was complete, valid JSON."""
     try:
-        response = requests.post(url, headers=headers, json=data)
+        parsed, complete = parse_completion(content)
+        data = normalize_sections(parsed)
+        if not complete:
+            print("[Itinerary] Completion was cut off; keeping the sections that arrived complete")
+        elif cache_key:
+            _itinerary_cache.set(cache_key, copy.deepcopy(data))
+        return data
+    except Exception as e:
+        print(f"JSON parsing error: {e}")
+        # fallback: return as text in all fields
+        return fallback_sections(content)
+
+def _chat_request(prompt, max_tokens, temperature=0.6):
+    return {
+        "model": ITINERARY_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+
+def split_itinerary_requests(taste_data, weather=None):
+    """
+    Request bodies for split mode as a list of (section, body): one per chunk of days
+    (section 'itinerary', in day order) followed by one per auxiliary section.
+    """
+    ctx = trip_prompt_context(taste_data, weather)
+    city, country, vibe, num_days = ctx['city'], ctx['country'], ctx['vibe'], ctx['num_days']
+    trip = f"a {num_days}-day {vibe} trip to {city}, {country} {ctx['date_str']}"
+    background = f"{ctx['weather_summary']}{ctx['taste_guidance']}"
+    bodies = []
+
+    # Each chunk gets its own share of the venues so the weeks don't repeat each other
+    chunks = day_chunks(num_days, ITINERARY_DAYS_PER_CHUNK)
+    venues = ctx['venues'][:15]
+    for index, (first, last) in enumerate(chunks):
+        chunk_venues = venues[index::len(chunks)]
+        venue_guidance = ''
+        if chunk_venues:
+            venue_guidance = f"\nIMPORTANT: Include these specific venues in these days: {', '.join(chunk_venues)}. Each venue should connect to the user's cultural preferences."
+        days_json = ', '.join([f'"Day {i}": {{"morning": "morning activity in {city}", "afternoon": "afternoon activity in {city}", "evening": "evening activity in {city}"}}' for i in range(first, last + 1)])
+        prompt = f'''
+    Plan Day {first} to Day {last} of {trip}. The other days are planned separately.
+    {background}{venue_guidance}
+
+    CRITICAL: Generate exactly Day {first} through Day {last}, no other days.
+    CRITICAL: Each activity must clearly connect to the user's stated preferences. Explain WHY each venue/activity was chosen based on their tastes.
+
+    Return ONLY valid JSON:
+    {{"itinerary": {{{days_json}}}}}
+    '''
+        max_tokens = min(200 + len(chunk_venues) * 20 + (last - first + 1) * 60, 4000)
+        bodies.append(('itinerary', _chat_request(prompt, max_tokens)))
+
+    sections = {
+        'packing': ('', f'{{"packing": {{"Clothing": ["item1", "item2"], "Electronics": ["smartphone", "charger"], "Documents": ["passport"], "Toiletries": ["item1"], "Other": ["item1"]}}}}', 300),
+        'tips': ('', f'{{"tips": ["tip1 for {city}", "tip2 for {city}", "tip3 for {city}"]}}', 250),
+        'budget': (
+            "Provide detailed, line-separated budget estimates for accommodation, food and activities: "
+            "up to 12 lines per category as a list of strings, each with a clear cost value and a short description. "
+            "Use numbers and currency consistently. Do NOT summarize as a single line.",
+            '{"budget": {"accommodation": ["Hotel XYZ: $120/night", "Boutique guesthouse: $85/night"], "food": ["Lunch at Cafe: $15"], "activities": ["Museum entry: $20"]}}',
+            700,
+        ),
+        'transport': ('', f'{{"transport": ["transport1 in {city}", "transport2 in {city}"]}}', 250),
+        'safety': ('Give safety and accessibility tags for the destination.', '{"safety": ["safety1", "safety2", "safety3"]}', 200),
+        'closing': ('Write a short personalized closing message for the traveller.', '{"closing": "personalized message"}', 150),
+    }
+    for section, (instructions, example, max_tokens) in sections.items():
+        prompt = f'''
+    Write only the {section} section for {trip}.
+    {background}
+    {instructions}
+
+    Return ONLY valid JSON:
+    {example}
+    '''
+        bodies.append((section, _chat_request(prompt, max_tokens)))
+    return bodies
+
+def complete_json(body):
+    """Run one Together completion and parse it: (JSON object, whether it arrived complete)."""
+    response = http_client.post('together', TOGETHER_CHAT_URL, headers=together_headers(), json=body)
+    response.raise_for_status()
+    return _completion_json(response.json())
+
+async def complete_json_async(body):
+    response = await async_client.post('together', TOGETHER_CHAT_URL, headers=together_headers(), json=body)
+    response.raise_for_status()
+    return _completion_json(response.json())
+
+def _completion_json(result):
+    return parse_completion(result['choices'][0]['message']['content'])
+
+def _split_outcomes(bodies):
+    """Submit every split request up front, then yield (section, (parsed, complete), error) in request order."""
+    # Each call runs in a copy of the caller's context, so it keeps the request deadline
+    futures = [(section, _split_pool.submit(contextvars.copy_context().run, complete_json, body))
+               for section, body in bodies]
+    for section, future in futures:
+        try:
+            yield section, future.result(), None
+        except Exception as e:
+            yield section, None, e
+
+async def _split_outcomes_async(bodies):
+    results = await asyncio.gather(*(complete_json_async(body) for _, body in bodies), return_exceptions=True)
+    return [
+        (section, None, result) if isinstance(result, Exception) else (section, result, None)
+        for (section, _), result in zip(bodies, results)
+    ]
+
+def _merge_split(outcomes, cache_key):
+    """
+    Generator behind split mode. Yields each chunk's days in day order as its outcome
+    arrives, then the merged sections dict. The merge is only cached if every request
+    came back as complete, valid JSON.
+    """
+    data = {}
+    itinerary = {}
+    errors = []
+    truncated = False
+    total = 0
+    for section, result, error in outcomes:
+        total += 1
+        if error is not None:
+            print(f"[Itinerary] Split request for {section} failed: {error}")
+            errors.append(error)
+            continue
+        parsed, complete = result
+        truncated = truncated or not complete
+        if section == 'itinerary':
+            days = parsed.get('itinerary', parsed)
+            if isinstance(days, dict):
+                for name, schedule in days.items():
+                    itinerary[name] = schedule
+                    yield 'day', name, schedule
+        elif section in parsed:
+            data[section] = parsed[section]
+    if len(errors) == total:
+        yield 'sections', None, fallback_sections(f"Error: {str(errors[0]) if errors else 'no requests'}")
+        return
+    data['itinerary'] = itinerary
+    data = normalize_sections(data)
+    if cache_key and not errors and not truncated:
+        _itinerary_cache.set(cache_key, copy.deepcopy(data))
+    yield 'sections', None, data
+
+def _split_generation(taste_data, weather, cache_key):
+    return _merge_split(_split_outcomes(split_itinerary_requests(taste_data, weather)), cache_key)
+
+def generate_itinerary_and_sections(taste_data, weather=None, mode=None):
+    """
+    Prompts the AI to return: itinerary (with day activities in morning/afternoon/evening), packing checklist, cultural tips, budget (in USDT), transport tips, safety tags, closing message.
+    Returns a dict with keys: itinerary, packing, tips, budget, transport, safety, closing.
+    Successful results are memoized on the trip inputs (see itinerary_cache_key).
+    `mode` is "single" or "split" and defaults to ITINERARY_GENERATION_MODE.
+    """
+    cache_key = itinerary_cache_key(taste_data, weather)
+    found, cached = _itinerary_cache.lookup(cache_key)
+    if found:
+        print(f"[Itinerary] Cache hit for {taste_data.get('city')}")
+        return copy.deepcopy(cached)
+
+    if (mode or ITINERARY_GENERATION_MODE) == 'split':
+        for kind, _, value in _split_generation(taste_data, weather, cache_key):
+            if kind == 'sections':
+                return value
+
+    data = build_itinerary_request(taste_data, weather)
+    try:
+        response = http_client.post('together', TOGETHER_CHAT_URL, headers=together_headers(), json=data)
         response.raise_for_status()
         result = response.json()
-        import json
-        import re
         content = result['choices'][0]['message']['content'].strip()
-        # Try to extract JSON from the response
-        try:
-            # If the model returns markdown, strip it
-            if content.startswith('```json'):
-                content = content.split('```json')[1].split('```')[0].strip()
-            elif content.startswith('```'):
-                content = content.split('```')[1].split('```')[0].strip()
-            # Extract JSON from mixed text/JSON response
-            elif '{' in content:
-                start = content.find('{')
-                # Find the last complete closing brace
-                end = content.rfind('}')
-                if end > start:
-                    content = content[start:end+1]
-                else:
-                    content = content[start:]
-            
-            # Clean invalid control characters
-            content = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', content)
-            
-            # Validate JSON completeness by counting braces
-            open_braces = content.count('{')
-            close_braces = content.count('}')
-            if open_braces != close_braces:
-                # Try to fix incomplete JSON by adding missing closing braces
-                missing_braces = open_braces - close_braces
-                content += '}' * missing_braces
-            
-            data = json.loads(content)
-            
-            # Limit packing items to 8 per category and truncate long text
-            if 'packing' in data and isinstance(data['packing'], dict):
-                for category, items in data['packing'].items():
-                    if isinstance(items, list):
-                        # Limit to 8 items and truncate text to 30 characters
-                        data['packing'][category] = [item[:30] + '...' if len(item) > 30 else item for item in items[:8]]
-
-            # Parse budget as lists of up to 12 lines for each category
-            if 'budget' in data and isinstance(data['budget'], dict):
-                for cat in ['accommodation', 'food', 'activities']:
-                    val = data['budget'].get(cat, [])
-                    if isinstance(val, str):
-                        # Split by line or semicolon
-                        lines = [line.strip() for line in re.split(r'[\n;]', val) if line.strip()]
-                        data['budget'][cat] = lines[:12]
-                    elif isinstance(val, list):
-                        # Only keep up to 12 lines
-                        data['budget'][cat] = [str(item).strip() for item in val[:12] if str(item).strip()]
-                    else:
-                        data['budget'][cat] = []
-
-            return data
-        except Exception as e:
-            print(f"JSON parsing error: {e}")
-            # fallback: return as text in all fields
-            return {k: content for k in ['packing','tips','local_info','budget','transport','safety','closing','itinerary']}
+        return finish_sections(content, cache_key)
+    except Exception as e:
+        return fallback_sections(f"Error: {str(e)}")
+
+async def generate_itinerary_and_sections_async(taste_data, weather=None, mode=None):
+    """generate_itinerary_and_sections on the shared async client; same cache and result shape."""
+    cache_key = itinerary_cache_key(taste_data, weather)
+    found, cached = _itinerary_cache.lookup(cache_key)
+    if found:
+        print(f"[Itinerary] Cache hit for {taste_data.get('city')}")
+        return copy.deepcopy(cached)
+
+    if (mode or ITINERARY_GENERATION_MODE) == 'split':
+        outcomes = await _split_outcomes_async(split_itinerary_requests(taste_data, weather))
+        for kind, _, value in _merge_split(outcomes, cache_key):
+            if kind == 'sections':
+                return value
+
+    data = build_itinerary_request(taste_data, weather)
+    try:
+        response = await async_client.post('together', TOGETHER_CHAT_URL, headers=together_headers(), json=data)
+        response.raise_for_status()
+        content = response.json()['choices'][0]['message']['content'].strip()
+        return finish_sections(content, cache_key)
+    except Exception as e:
+        return fallback_sections(f"Error: {str(e)}")
+
+_DAY_KEY_RE = re.compile(r'"(Day \d+)"\s*:\s*\{')
+
+def _find_object_end(text, start):
+    """Index of the brace closing the object that opens at text[start], or None if not complete yet."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+class DayStreamParser:
+    """Pulls complete "Day N": {...} objects out of a completion as it streams in."""
+
+    def __init__(self):
+        self.text = ''
+        self.pos = 0
+
+    def feed(self, chunk):
+        """Add streamed text; return a list of (day_name, schedule) completed by it."""
+        self.text += chunk
+        days = []
+        while True:
+            match = _DAY_KEY_RE.search(self.text, self.pos)
+            if not match:
+                break
+            start = match.end() - 1
+            end = _find_object_end(self.text, start)
+            if end is None:
+                break
+            self.pos = end + 1
+            try:
+                schedule = json.loads(self.text[start:end+1], strict=False)
+            except ValueError:
+                continue
+            if isinstance(schedule, dict):
+                days.append((match.group(1), schedule))
+        return days
+
+def stream_itinerary_and_sections(taste_data, weather=None, mode=None):
+    """
+    Streaming variant of generate_itinerary_and_sections. Yields ('day', name, schedule)
+    for each itinerary day as soon as it has been generated, then ('sections', None, data)
+    with the same dict generate_itinerary_and_sections would have returned.
+    """
+    cache_key = itinerary_cache_key(taste_data, weather)
+    found, cached = _itinerary_cache.lookup(cache_key)
+    if found:
+        print(f"[Itinerary] Cache hit for {taste_data.get('city')}")
+        cached = copy.deepcopy(cached)
+        if isinstance(cached.get('itinerary'), dict):
+            for name, schedule in cached['itinerary'].items():
+                yield 'day', name, schedule
+        yield 'sections', None, cached
+        return
+
+    if (mode or ITINERARY_GENERATION_MODE) == 'split':
+        yield from _split_generation(taste_data, weather, cache_key)
+        return
+
+    data = build_itinerary_request(taste_data, weather)
+    data['stream'] = True
+    # The last chunk then reports the real token usage, which replaces the spend estimate
+    data['stream_options'] = {'include_usage': True}
+    parser = DayStreamParser()
+    parts = []
+    usage = None
+    try:
+        with http_client.post('together', TOGETHER_CHAT_URL, headers=together_headers(), json=data, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    break
+                # A stage abandoned at the deadline stops reading instead of holding its thread
+                if deadline.expired():
+                    raise deadline.DeadlineExceeded("Request deadline passed while streaming")
+                chunk = json.loads(payload)
+                if chunk.get('usage'):
+                    usage = chunk
+                if not chunk.get('choices'):
+                    continue
+                choice = chunk['choices'][0]
+                delta = (choice.get('delta') or {}).get('content') or choice.get('text') or ''
+                parts.append(delta)
+                for name, schedule in parser.feed(delta):
+                    yield 'day', name, schedule
     except Exception as e:
-        return {k: f"Error: {str(e)}" for k in ['packing','tips','local_info','budget','transport','safety','closing','itinerary']}
+        yield 'sections', None, fallback_sections(f"Error: {str(e)}")
+        return
+    finally:
+        http_client.settle_streamed_usage('together', data, usage)
+    yield 'sections', None, finish_sections(''.join(parts).strip(), cache_key)
@@ -0,0 +1,179 @@
+# app/jobs.py
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .cache import TTLCache
+
+# Finished jobs (and their results) are kept this long for the client to collect
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "900"))
+# Worker processes are spawned rather than forked: the parent already runs thread pools
+JOB_PROCESS_START_METHOD = os.getenv("JOB_PROCESS_START_METHOD", "spawn")
+
+_jobs = TTLCache('jobs', ttl=JOB_RESULT_TTL, max_entries=int(os.getenv("JOB_MAX_TRACKED", "5000")))
+# Idempotency key -> job id, so a repeated submit is handed the job already under way
+_job_keys = TTLCache('job_keys', ttl=JOB_RESULT_TTL, max_entries=int(os.getenv("JOB_MAX_TRACKED", "5000")))
+
+
+class JobQueueFull(Exception):
+    """Raised by JobQueue.submit when the backlog is at its limit."""
+
+
+class Job:
+    """One unit of background work and its outcome."""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    def to_dict(self):
+        status = self.status
+        if status == 'queued' and self.future is not None and self.future.running():
+            status = 'running'
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs of one kind on a thread or process pool. At most `max_workers` run at once
+    and at most `max_backlog` more may wait; past that, submit raises JobQueueFull.
+    """
+
+    def __init__(self, kind, max_workers=2, max_backlog=20, use_processes=False):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_backlog = max_backlog
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+        self._keys_lock = threading.Lock()
+        self._active = 0
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                context = multiprocessing.get_context(JOB_PROCESS_START_METHOD)
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"job-{self.kind}")
+        return self._executor
+
+    def submit(self, func, *args):
+        """Queue func(*args) and return its Job immediately. func must be picklable for process queues."""
+        with self._lock:
+            if self._active >= self.max_workers + self.max_backlog:
+                self.rejected += 1
+                raise JobQueueFull(f"{self.kind} queue is full ({self._active} jobs in flight)")
+            self._active += 1
+            executor = self._get_executor()
+        job = Job(self.kind)
+        _jobs.set(job.id, job)
+        if self.use_processes:
+            # The worker process can't report back when it starts; to_dict asks the future instead
+            future = executor.submit(func, *args)
+            job.future = future
+        else:
+            future = executor.submit(self._run, job, func, args)
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return job
+
+    def submit_once(self, key, func, *args, keep=None):
+        """
+        Like submit, but a repeat with the same key gets the job that is already queued,
+        running or done instead of a new one. Failed jobs, and done jobs whose result fails
+        keep(result), are submitted again.
+        """
+        with self._keys_lock:
+            job_id = _job_keys.get(key)
+            job = get_job(job_id) if job_id else None
+            if job is not None and job.status != 'failed' and (
+                    job.status != 'done' or keep is None or keep(job.result)):
+                print(f"[Jobs] Reusing {self.kind} job {job.id} for {key[:24]}")
+                return job
+            job = self.submit(func, *args)
+            _job_keys.set(key, job.id)
+            return job
+
+    def _run(self, job, func, args):
+        with self._lock:
+            self._running += 1
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _finish(self, job, future):
+        error = future.exception()
+        job.finished_at = time.time()
+        if error is None:
+            job.result = future.result()
+            job.status = 'done'
+        else:
+            print(f"[Jobs] {self.kind} job {job.id} failed: {error}")
+            job.error = str(error)
+            job.status = 'failed'
+        with self._lock:
+            self._active -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        # Restart the expiry clock so the result is kept for JOB_RESULT_TTL after it finished
+        _jobs.set(job.id, job)
+        duration = job.finished_at - job.submitted_at
+        print(f"[Jobs] {self.kind} job {job.id} {job.status} in {duration:.1f}s")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_backlog': self.max_backlog,
+                'in_flight': self._active,
+                'running': self._running if not self.use_processes else None,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
+
+
+def get_job(job_id):
+    """The Job with this id, or None if it is unknown or its result has expired."""
+    return _jobs.get(job_id)
+
+
+ITINERARY_JOBS = JobQueue(
+    'itinerary',
+    max_workers=int(os.getenv("ITINERARY_JOB_WORKERS", "4")),
+    max_backlog=int(os.getenv("ITINERARY_JOB_BACKLOG", "32")),
+)
+# PDF rendering is CPU-bound, so it runs in worker processes instead of sharing the GIL
+PDF_JOBS = JobQueue(
+    'pdf',
+    max_workers=int(os.getenv("PDF_JOB_WORKERS", str(os.cpu_count() or 2))),
+    max_backlog=int(os.getenv("PDF_JOB_BACKLOG", "16")),
+    use_processes=True,
+)
@@ -0,0 +1,124 @@
+# app/matching.py
+import json
+import os
+
+# Preference -> city matching. The keyword tables live in data/city_keywords.json and are
+# compiled once into Aho-Corasick automata, so scoring a description is one pass over its
+# text however many cities and keywords the table holds. Keywords match as substrings of
+# the lowercased text, the same as the `keyword in text` scans they replace.
+CITY_KEYWORDS_FILE = os.getenv(
+    "CITY_KEYWORDS_FILE", os.path.join(os.path.dirname(__file__), "data", "city_keywords.json")
+)
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over the keywords of a ranked list of entries (dicts with a
+    'keywords' list). An entry's score is how many of its keywords occur in the text;
+    rank (table order) breaks ties.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        # keyword -> ranks of the entries listing it
+        self._keyword_ranks = {}
+        for rank, entry in enumerate(self.entries):
+            for keyword in entry['keywords']:
+                self._keyword_ranks.setdefault(keyword.lower(), []).append(rank)
+        self._build(list(self._keyword_ranks))
+
+    def _build(self, keywords):
+        goto = [{}]
+        out = [[]]
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    out.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            out[state].append(keyword)
+        # Breadth-first failure links; each state also reports what its fallback state matches
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(char, 0)
+                out[child].extend(out[fail[child]])
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(matches) for matches in out]
+
+    def matched_keywords(self, text):
+        """Set of keywords occurring anywhere in text (case-insensitive)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in str(text or '').lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def scores(self, text):
+        """[(entry, score)] for every entry with a match, best score first, then by rank."""
+        counts = {}
+        for keyword in self.matched_keywords(text):
+            for rank in self._keyword_ranks[keyword]:
+                counts[rank] = counts.get(rank, 0) + 1
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.entries[rank], score) for rank, score in ranked]
+
+    def best(self, text):
+        """Highest-scoring entry, or None if no keyword matches."""
+        scored = self.scores(text)
+        return scored[0][0] if scored else None
+
+    def first(self, text):
+        """Lowest-ranked entry with any matching keyword, or None."""
+        ranks = [rank for keyword in self.matched_keywords(text) for rank in self._keyword_ranks[keyword]]
+        return self.entries[min(ranks)] if ranks else None
+
+
+def load_matchers(path=CITY_KEYWORDS_FILE):
+    """(destination matcher, inference matcher) compiled from a keyword table file."""
+    with open(path, encoding='utf-8') as f:
+        table = json.load(f)
+    return KeywordMatcher(table['destinations']), KeywordMatcher(table['inference'])
+
+
+_destinations, _inference = load_matchers()
+
+
+def destination_scores(text):
+    """[(city, score)] for preference text, best match first."""
+    return [(entry['city'], score) for entry, score in _destinations.scores(text)]
+
+
+def best_destination(text, default=None):
+    """City whose keywords best match the preference text (earlier cities win ties)."""
+    entry = _destinations.best(text)
+    return entry['city'] if entry else default
+
+
+def infer_city(text):
+    """(city, country) from the first inference rule whose keywords occur in text, else (None, None)."""
+    entry = _inference.first(text)
+    if entry is None:
+        return None, None
+    return entry['city'], entry.get('country')
+
+
+def inference_targets():
+    """[(city, country)] that infer_city can return, each once, in table order."""
+    targets = {}
+    for entry in _inference.entries:
+        targets.setdefault(entry['city'], entry.get('country'))
+    return list(targets.items())
@@ -0,0 +1,226 @@
+# app/pipeline.py
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from . import deadline
+
+# Shared by all requests; stages never submit work back into this pool so it cannot deadlock
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "8"))
+# A stage abandoned at the deadline keeps its thread until its upstream call gives up (the
+# deadline caps that call's timeout). The pool has this many extra threads for them; while
+# that many are still running, stages that can degrade take their fallback instead of
+# queueing behind them.
+PIPELINE_ABANDONED_HEADROOM = int(os.getenv("PIPELINE_ABANDONED_HEADROOM", "8"))
+_stage_pool = ThreadPoolExecutor(max_workers=PIPELINE_MAX_WORKERS + PIPELINE_ABANDONED_HEADROOM,
+                                 thread_name_prefix="pipeline-stage")
+_abandoned_lock = threading.Lock()
+_abandoned = 0
+
+
+def _abandon(future):
+    """Let go of a stage the run no longer waits for: cancel it if it hasn't started, else count it until it ends."""
+    global _abandoned
+    if future.cancel():
+        return
+    with _abandoned_lock:
+        _abandoned += 1
+    future.add_done_callback(_abandoned_done)
+
+
+def _abandoned_done(future):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+
+def abandoned_stages():
+    """Stages abandoned at a deadline whose threads are still running."""
+    return _abandoned
+
+
+class Stage:
+    """One step of a pipeline: reads named inputs, writes named outputs.
+
+    `func` is called with the input values positionally, in the order of `inputs`.
+    With a single output the return value is stored as-is; with several outputs the
+    function must return a tuple of the same length.
+
+    `fallback`, if given, is a cheap function taking the same inputs. Its value is used
+    instead of failing when the stage raises, when fewer than `min_seconds` are left
+    before the request deadline as the stage becomes ready, or when the deadline passes
+    while the stage is still running.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=None, fallback=None, min_seconds=0):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs) if outputs else (name,)
+        self.fallback = fallback
+        self.min_seconds = min_seconds
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+
+class PipelineResult:
+    """Values produced by a run, plus per-stage timings in milliseconds."""
+
+    def __init__(self):
+        self.values = {}
+        self.timings = {}
+        self.errors = {}
+        self.fallbacks = {}
+        self.total_ms = 0.0
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def summary(self):
+        parts = ', '.join(f"{name}={t['duration_ms']:.0f}ms" for name, t in self.timings.items())
+        return f"total={self.total_ms:.0f}ms ({parts})"
+
+
+class Pipeline:
+    """Runs a set of stages as a dependency graph, overlapping independent stages."""
+
+    def __init__(self, stages, name="pipeline"):
+        self.name = name
+        self.stages = list(stages)
+        self._producer = {}
+        for stage in self.stages:
+            for output in stage.outputs:
+                if output in self._producer:
+                    raise ValueError(f"Output '{output}' is produced by both '{self._producer[output].name}' and '{stage.name}'")
+                self._producer[output] = stage
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+
+        def visit(stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"Pipeline '{self.name}' has a cycle through stage '{stage.name}'")
+            visiting.add(stage.name)
+            for name in stage.inputs:
+                if name in self._producer:
+                    visit(self._producer[name])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+
+        for stage in self.stages:
+            visit(stage)
+
+    def run(self, initial=None, on_result=None):
+        """Execute every stage once and return a PipelineResult.
+
+        `initial` supplies values that no stage produces (e.g. form fields). If given,
+        `on_result(stage_name, value)` is called as each stage finishes, before its
+        dependents start. If a stage raises, the exception is re-raised after in-flight
+        stages finish, unless the stage has a fallback. Under a request deadline
+        (deadline.within) the run returns by the deadline as long as every stage that
+        can be slow has a fallback.
+        """
+        result = PipelineResult()
+        result.values.update(initial or {})
+        for stage in self.stages:
+            missing = [name for name in stage.inputs if name not in self._producer and name not in result.values]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' needs inputs nobody provides: {missing}")
+
+        started = time.perf_counter()
+        pending = list(self.stages)
+        running = {}
+        failure = None
+
+        def finish(stage, value):
+            if len(stage.outputs) == 1:
+                result.values[stage.outputs[0]] = value
+            else:
+                result.values.update(zip(stage.outputs, value))
+            if on_result is not None:
+                on_result(stage.name, value)
+
+        def degrade(stage, args, why):
+            print(f"[Pipeline] Stage '{stage.name}' {why}, using its fallback")
+            result.fallbacks[stage.name] = why
+            finish(stage, stage.fallback(*args))
+
+        while pending or running:
+            skipped = False
+            if failure is None:
+                for stage in [s for s in pending if all(name in result.values for name in s.inputs)]:
+                    pending.remove(stage)
+                    args = [result.values[name] for name in stage.inputs]
+                    if stage.fallback is not None and deadline.low(stage.min_seconds):
+                        degrade(stage, args, f"skipped with {deadline.remaining():.1f}s left")
+                        skipped = True
+                        continue
+                    if stage.fallback is not None and abandoned_stages() >= PIPELINE_ABANDONED_HEADROOM:
+                        degrade(stage, args, f"skipped with {abandoned_stages()} abandoned stages still running")
+                        skipped = True
+                        continue
+                    # Stage threads see the caller's context, and with it the request deadline
+                    future = _stage_pool.submit(contextvars.copy_context().run, self._timed, stage, args, started)
+                    running[future] = (stage, args)
+            elif not running:
+                break
+            if not running:
+                if skipped:
+                    # Fallback values may have made more stages ready
+                    continue
+                raise RuntimeError(f"Pipeline '{self.name}' stalled with stages {[s.name for s in pending]} unrunnable")
+
+            # Only stages that can degrade are abandoned at the deadline; the rest are waited for
+            can_degrade = any(stage.fallback is not None for stage, _ in running.values())
+            finished, _ = wait(running, timeout=deadline.remaining() if can_degrade else None,
+                               return_when=FIRST_COMPLETED)
+            if not finished:
+                for future, (stage, args) in list(running.items()):
+                    if stage.fallback is not None:
+                        del running[future]
+                        _abandon(future)
+                        degrade(stage, args, "ran past the deadline")
+                continue
+            for future in finished:
+                stage, args = running.pop(future)
+                value, error, timing = future.result()
+                result.timings[stage.name] = timing
+                if error is not None:
+                    print(f"[Pipeline] Stage '{stage.name}' failed: {error}")
+                    result.errors[stage.name] = error
+                    if stage.fallback is not None:
+                        degrade(stage, args, "failed")
+                        continue
+                    failure = failure or error
+                    continue
+                finish(stage, value)
+
+        result.total_ms = (time.perf_counter() - started) * 1000
+        print(f"[Pipeline] {self.name}: {result.summary()}")
+        if failure is not None:
+            raise failure
+        return result
+
+    @staticmethod
+    def _timed(stage, args, run_started):
+        start = time.perf_counter()
+        value, error = None, None
+        try:
+            value = stage.func(*args)
+        except Exception as e:
+            error = e
+        end = time.perf_counter()
+        timing = {
+            'start_ms': (start - run_started) * 1000,
+            'end_ms': (end - run_started) * 1000,
+            'duration_ms': (end - start) * 1000,
+        }
+        return value, error, timing
@@ -1,6 +1,13 @@
 import os
-import requests
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from . import async_client, circuit_breaker, deadline, http_client, rate_limit
+from .cache import TTLCache, normalize_key_part
+from .destinations import search_fallback_venues
+from .matching import infer_city
+from .taxonomy import cultural_paths, group_venues
 
 # Load API keys from .env
 load_dotenv()
@@ -17,72 +24,215 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Bounded pool shared by every request so concurrent trips can't open unlimited Qloo connections
+QLOO_MAX_WORKERS = int(os.getenv("QLOO_MAX_WORKERS", "6"))
+_search_pool = ThreadPoolExecutor(max_workers=QLOO_MAX_WORKERS, thread_name_prefix="qloo-search")
+
+# /search results repeat across users ("jazz", "Italian", "Barcelona restaurants"), so keep
+# them for a while. Empty results and error responses are remembered only briefly. Once a
+# result expires it is still served for up to QLOO_CACHE_STALE_TTL while it is refreshed in
+# the background, so no request waits on Qloo for a search someone has already made.
+_search_cache = TTLCache(
+    'qloo_search',
+    ttl=int(os.getenv("QLOO_CACHE_TTL", str(6 * 3600))),
+    max_entries=int(os.getenv("QLOO_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("QLOO_CACHE_MAX_BYTES", str(16 * 1024 * 1024))) or None,
+    negative_ttl=int(os.getenv("QLOO_CACHE_NEGATIVE_TTL", "120")),
+    stale_ttl=int(os.getenv("QLOO_CACHE_STALE_TTL", str(24 * 3600))),
+)
+
+def search_cache_key(name, expected_city=None, expected_country=None):
+    return (normalize_key_part(name), normalize_key_part(expected_city), normalize_key_part(expected_country))
+
+def get_search_cache_stats():
+    """Hit/miss counters and size of the Qloo search cache."""
+    return _search_cache.stats()
+
 def get_similar_entities(entity_type, name, expected_city=None, expected_country=None):
     """Get entities from Qloo search with location enrichment and filtering"""
     if not QLOO_API_KEY or not name:
         print(f"[Qloo] Missing API key or name: key={bool(QLOO_API_KEY)}, name='{name}'")
         return []
     
+    cache_key = search_cache_key(name, expected_city, expected_country)
+    found, cached = _search_cache.lookup(
+        cache_key, refresh=lambda: _refresh_search(cache_key, name, expected_city, expected_country))
+    if found:
+        print(f"[Qloo] Cache hit for '{name}' ({len(cached)} results)")
+        return list(cached)
+    
     try:
         url = f"{QLOO_BASE_URL}/search"
         print(f"[Qloo] Calling {url} with query='{name}'")
-        response = requests.get(url, headers=HEADERS, params={"query": name}, timeout=10)
-        
-        print(f"[Qloo] Response status: {response.status_code}")
-        print(f"[Qloo] Response text: {response.text[:500]}...")  # First 500 chars
-        
-        if response.status_code == 200:
-            results = response.json().get('results', [])
-            print(f"[Qloo] Found {len(results)} results for '{name}'")
-            
-            # Enrich with location data and filter
-            enriched = []
-            for res in results:
-                if res:  # Check if result is not None
-                    location = res.get("location") or {}
-                    # Try to extract city from multiple possible locations
-                    city = res.get("city") or location.get("city")
-                    country = location.get("country")
-                    if not city:
-                        # Try Qloo's new format: properties.geocode.city
-                        properties = res.get("properties", {})
-                        geocode = properties.get("geocode", {})
-                        city = geocode.get("city")
-                        country = country or geocode.get("country")
-                    
-                    # Filter by expected city and country
-                    if expected_city and expected_city.lower() not in str(city or "").lower():
-                        continue
-                    if expected_country and expected_country.lower() not in str(country or "").lower():
-                        continue
-                    
-                    enriched.append({
-                        "name": res.get("name"),
-                        "type": res.get("type"),
-                        "city": city,
-                        "country": country,
-                        "category": res.get("category")
-                    })
-            print(f"[Qloo] Enriched to {len(enriched)} results")
-            return enriched
-        else:
-            print(f"[Qloo] API returned status {response.status_code} for query '{name}'")
-            return []
+        response = http_client.get('qloo', url, headers=HEADERS, params={"query": name}, hedge=True)
+        return _finish_search(response, cache_key, name, expected_city, expected_country)
+    except (rate_limit.OverBudget, circuit_breaker.CircuitOpen, deadline.DeadlineExceeded) as e:
+        # Not cached: the search is fine, we just can't run it right now
+        print(f"[Qloo] Skipping search for '{name}': {e}")
+        return []
+    except Exception as e:
+        print(f"[Qloo] Error searching for '{name}': {e}")
+        _search_cache.set_negative(cache_key, [])
+        return []
+
+async def get_similar_entities_async(entity_type, name, expected_city=None, expected_country=None):
+    """get_similar_entities on the shared async client; same cache and results."""
+    if not QLOO_API_KEY or not name:
+        print(f"[Qloo] Missing API key or name: key={bool(QLOO_API_KEY)}, name='{name}'")
+        return []
+
+    cache_key = search_cache_key(name, expected_city, expected_country)
+    found, cached = _search_cache.lookup(
+        cache_key, refresh=lambda: _refresh_search(cache_key, name, expected_city, expected_country))
+    if found:
+        print(f"[Qloo] Cache hit for '{name}' ({len(cached)} results)")
+        return list(cached)
+
+    try:
+        url = f"{QLOO_BASE_URL}/search"
+        print(f"[Qloo] Calling {url} with query='{name}' (async)")
+        response = await async_client.get('qloo', url, headers=HEADERS, params={"query": name}, hedge=True)
+        return _finish_search(response, cache_key, name, expected_city, expected_country)
+    except (rate_limit.OverBudget, circuit_breaker.CircuitOpen, deadline.DeadlineExceeded) as e:
+        # Not cached: the search is fine, we just can't run it right now
+        print(f"[Qloo] Skipping search for '{name}': {e}")
+        return []
     except Exception as e:
         print(f"[Qloo] Error searching for '{name}': {e}")
+        _search_cache.set_negative(cache_key, [])
         return []
 
+def _refresh_search(cache_key, name, expected_city, expected_country):
+    """Re-run a stale search in the background; the stale result stays if this fails."""
+    url = f"{QLOO_BASE_URL}/search"
+    print(f"[Qloo] Refreshing search for '{name}'")
+    response = http_client.get('qloo', url, headers=HEADERS, params={"query": name})
+    if response.status_code != 200:
+        raise RuntimeError(f"Qloo returned status {response.status_code}")
+    _finish_search(response, cache_key, name, expected_city, expected_country)
+
+def _finish_search(response, cache_key, name, expected_city, expected_country):
+    """Enrich and filter a /search response, caching the outcome."""
+    print(f"[Qloo] Response status: {response.status_code}")
+    print(f"[Qloo] Response text: {response.text[:500]}...")  # First 500 chars
+    
+    if response.status_code == 200:
+        results = response.json().get('results', [])
+        print(f"[Qloo] Found {len(results)} results for '{name}'")
+        
+        # Enrich with location data and filter
+        enriched = []
+        for res in results:
+            if res:  # Check if result is not None
+                location = res.get("location") or {}
+                # Try to extract city from multiple possible locations
+                city = res.get("city") or location.get("city")
+                country = location.get("country")
+                if not city:
+                    # Try Qloo's new format: properties.geocode.city
+                    properties = res.get("properties", {})
+                    geocode = properties.get("geocode", {})
+                    city = geocode.get("city")
+                    country = country or geocode.get("country")
+                
+                # Filter by expected city and country
+                if expected_city and expected_city.lower() not in str(city or "").lower():
+                    continue
+                if expected_country and expected_country.lower() not in str(country or "").lower():
+                    continue
+                
+                enriched.append({
+                    "name": res.get("name"),
+                    "type": res.get("type"),
+                    "city": city,
+                    "country": country,
+                    "category": res.get("category")
+                })
+        print(f"[Qloo] Enriched to {len(enriched)} results")
+        if enriched:
+            _search_cache.set(cache_key, enriched)
+        else:
+            _search_cache.set_negative(cache_key, [])
+        return list(enriched)
+    else:
+        print(f"[Qloo] API returned status {response.status_code} for query '{name}'")
+        _search_cache.set_negative(cache_key, [])
+        return []
+
+def search_many(searches):
+    """Run several get_similar_entities searches concurrently.
+
+    `searches` is a list of (name, expected_city, expected_country) tuples. Results come
+    back as a list in the same order as the input, so callers merge exactly as before.
+    """
+    def run(search):
+        name, expected_city, expected_country = search
+        try:
+            return get_similar_entities('', name, expected_city=expected_city, expected_country=expected_country)
+        except Exception as e:
+            print(f"[Qloo] Error searching for '{name}': {e}")
+            return []
+
+    searches = list(searches)
+    if len(searches) <= 1:
+        return [run(search) for search in searches]
+    # Each search runs in a copy of the caller's context, so it keeps the request deadline
+    contexts = [contextvars.copy_context() for _ in searches]
+    return list(_search_pool.map(lambda context, search: context.run(run, search), contexts, searches))
+
+async def search_many_async(searches):
+    """search_many on the event loop: every search is awaited together, results in input order."""
+    async def run(search):
+        name, expected_city, expected_country = search
+        try:
+            return await get_similar_entities_async('', name, expected_city=expected_city, expected_country=expected_country)
+        except Exception as e:
+            print(f"[Qloo] Error searching for '{name}': {e}")
+            return []
+
+    return list(await asyncio.gather(*(run(search) for search in searches)))
+
+# Functions that need several rounds of searches are written as generators ("steps") that
+# yield a list of searches and are sent back the results, so the same logic runs on the
+# thread pool (run_search_steps) or on the event loop (run_search_steps_async).
+def run_search_steps(steps):
+    try:
+        searches = next(steps)
+        while True:
+            searches = steps.send(search_many(searches))
+    except StopIteration as done:
+        return done.value
+
+async def run_search_steps_async(steps):
+    try:
+        searches = next(steps)
+        while True:
+            searches = steps.send(await search_many_async(searches))
+    except StopIteration as done:
+        return done.value
+
 def get_associated_locations(entity_name, entity_type):
     """Get locations from Qloo search with enhanced cultural mapping"""
     return get_similar_entities(entity_type, entity_name)
 
 def get_venues_for_city(city, country=None, categories=["attractions", "restaurants", "music venues"], venues_needed=12):
     """Get venues for a specific city with country filtering"""
+    return run_search_steps(venues_for_city_steps(city, country, categories, venues_needed))
+
+async def get_venues_for_city_async(city, country=None, categories=["attractions", "restaurants", "music venues"], venues_needed=12):
+    return await run_search_steps_async(venues_for_city_steps(city, country, categories, venues_needed))
+
+def venues_for_city_steps(city, country, categories, venues_needed):
     venues = []
-    for category in categories:
+    # One search per category, issued concurrently and merged in category order
+    searches = [(f"{city} {category}", city, country) for category in categories]
+    if circuit_breaker.is_open('qloo'):
+        print(f"[Qloo] Circuit open, using fallback venues for {city}")
+        all_results = [[] for _ in searches]
+    else:
+        all_results = yield searches
+    for category, results in zip(categories, all_results):
         try:
-            query = f"{city} {category}"
-            results = get_similar_entities('', query, expected_city=city, expected_country=country)
             for r in results[:3]:  # Top 3 per category
                 if r.get("name") and r["name"] not in venues:
                     venues.append(r["name"])
@@ -91,15 +241,7 @@ def get_venues_for_city(city, country=None, categories=["attractions", "restaura
     
     # Fallback if no venues found
     if not venues:
-        fallback_venues = {
-            'Tokyo': ['Shibuya Crossing', 'Senso-ji Temple', 'Harajuku District'],
-            'Paris': ['Eiffel Tower', 'Louvre Museum', 'Montmartre'],
-            'Rome': ['Colosseum', 'Vatican City', 'Trevi Fountain'],
-            'Barcelona': ['Park Güell', 'Sagrada Familia', 'Gothic Quarter'],
-            'London': ['Big Ben', 'Tower Bridge', 'British Museum'],
-            'Kingston': ['Bob Marley Museum', 'Devon House', 'Emancipation Park']
-        }
-        venues = fallback_venues.get(city, ['City Center', 'Historic District', 'Cultural Quarter'])
+        venues = search_fallback_venues(city)
     
     return venues[:venues_needed]
 
@@ -115,6 +257,12 @@ def get_qloo_branding_info():
 
 def get_taste_based_destinations(user_preferences):
     """Get destinations based on user cultural preferences using Qloo's Taste AI™"""
+    return run_search_steps(taste_destination_steps(user_preferences))
+
+async def get_taste_based_destinations_async(user_preferences):
+    return await run_search_steps_async(taste_destination_steps(user_preferences))
+
+def taste_destination_steps(user_preferences):
     music = user_preferences.get('music', '')
     food = user_preferences.get('food', '')
     movie = user_preferences.get('movie', '')
@@ -125,6 +273,10 @@ def get_taste_based_destinations(user_preferences):
     
     if not QLOO_API_KEY:
         return None
+    if circuit_breaker.is_open('qloo'):
+        # Qloo is degraded: let get_taste_recommendations use its keyword fallback right away
+        print("[Qloo] Circuit open, skipping taste search")
+        return None
     
     # Dynamic vibe modifier based on Qloo results
     def get_vibe_modifier(vibe, city):
@@ -152,59 +304,8 @@ def get_taste_based_destinations(user_preferences):
         entity_name = str(result.get("name") or "").lower()
         entity_type = str(result.get("type") or "").lower()
         
-        # Simple inference rules (expanded) - return city, country
-        if any(word in entity_name for word in ['korean', 'k-pop', 'bts', 'ghibli', 'anime', 'japanese']):
-            return 'Tokyo', 'Japan'
-        elif any(word in entity_name for word in ['french', 'paris', 'louvre']):
-            return 'Paris', 'France'
-        elif any(word in entity_name for word in ['italian', 'rome', 'vatican']):
-            return 'Rome', 'Italy'
-        elif any(word in entity_name for word in ['spanish', 'barcelona', 'madrid']):
-            return 'Barcelona', 'Spain'
-        elif any(word in entity_name for word in ['british', 'london', 'beatles']):
-            return 'London', 'United Kingdom'
-        elif any(word in entity_name for word in ['west african', 'nollywood', 'african']):
-            return 'Lagos', 'Nigeria'
-        elif any(word in entity_name for word in ['indian', 'bollywood', 'curry']):
-            return 'Mumbai', 'India'
-        elif any(word in entity_name for word in ['chinese', 'mandarin', 'cantonese']):
-            return 'Beijing', 'China'
-        elif any(word in entity_name for word in ['mexican', 'latin', 'spanish']):
-            return 'Mexico City', 'Mexico'
-        elif any(word in entity_name for word in ['electronic']):
-            return 'Berlin', 'Germany'
-        elif any(word in entity_name for word in ['reggae']):
-            return 'Kingston', 'Jamaica'
-        elif any(word in entity_name for word in ['jazz']):
-            return 'New Orleans', 'United States'
-        elif any(word in entity_name for word in ['hip-hop', 'hiphop', 'rap']):
-            return 'New York', 'United States'
-        elif any(word in entity_name for word in ['classical', 'mozart', 'vienna']):
-            return 'Vienna', 'Austria'
-        elif any(word in entity_name for word in ['mediterranean']):
-            return 'Athens', 'Greece'
-        elif any(word in entity_name for word in ['bbq', 'barbecue', 'southern']):
-            return 'Austin', 'United States'
-        elif any(word in entity_name for word in ['pizza']):
-            return 'Naples', 'Italy'
-        elif any(word in entity_name for word in ['sushi']):
-            return 'Tokyo', 'Japan'
-        elif any(word in entity_name for word in ['tapas']):
-            return 'Madrid', 'Spain'
-        elif any(word in entity_name for word in ['opera']):
-            return 'Milan', 'Italy'
-        elif any(word in entity_name for word in ['blues']):
-            return 'Chicago', 'United States'
-        elif any(word in entity_name for word in ['tango']):
-            return 'Buenos Aires', 'Argentina'
-        elif any(word in entity_name for word in ['wine']):
-            return 'Bordeaux', 'France'
-        elif any(word in entity_name for word in ['beer', 'bier']):
-            return 'Munich', 'Germany'
-        elif any(word in entity_name for word in ['surf']):
-            return 'Sydney', 'Australia'
-        
-        return None, None
+        # Inference rules from the keyword table; the first matching rule wins
+        return infer_city(entity_name)
     
     try:
         # Get Qloo recommendations for each preference
@@ -212,10 +313,13 @@ def get_taste_based_destinations(user_preferences):
         preferences = [music, food, movie]
         pref_types = ['music', 'cuisine', 'entertainment']
         
-        for i, pref in enumerate(preferences):
+        # Search all preferences at once; results keep the music, food, movie order
+        active = [(i, pref) for i, pref in enumerate(preferences) if pref]
+        all_results = yield [(pref, None, None) for _, pref in active]
+        
+        for (i, pref), results in zip(active, all_results):
             if pref:
                 print(f"[Qloo] Processing preference {i}: '{pref}' (type: {pref_types[i]})")
-                results = get_similar_entities('', pref)
                 print(f"[Qloo] Got {len(results)} results for '{pref}'")
                 for result in results[:3]:  # Top 3 matches
                     entity_name = result.get('name', '')
@@ -269,7 +373,7 @@ def get_taste_based_destinations(user_preferences):
             venues_needed = min(num_days * 3, 15)  # 3 venues per day, max 15
             
             # Get venues dynamically from Qloo with country filtering
-            city_venues_list = get_venues_for_city(
+            city_venues_list = yield from venues_for_city_steps(
                 city=best_match['city'],
                 country=best_match.get('country'),
                 categories=["attractions", "restaurants", "music venues"],
@@ -277,45 +381,7 @@ def get_taste_based_destinations(user_preferences):
             )
             
             # Categorize venues by type using Qloo
-            music_venues = []
-            film_venues = []
-            food_venues = []
-            additional_venues = []
-            
-            for venue in city_venues_list:
-                venue_lower = venue.lower()
-                if any(word in venue_lower for word in ['music', 'concert', 'palau', 'born', 'gracia']):
-                    music_venues.append(venue)
-                elif any(word in venue_lower for word in ['market', 'boqueria', 'food', 'mercat', 'raval']):
-                    food_venues.append(venue)
-                elif any(word in venue_lower for word in ['gothic', 'museum', 'park', 'casa', 'sagrada', 'ciutadella', 'poble']):
-                    film_venues.append(venue)
-                else:
-                    additional_venues.append(venue)
-            
-            # Get additional spots from Qloo based on user preferences
-            def get_qloo_additional_spots(city, music, movie, food):
-                additional_spots = []
-                
-                # Use remaining venues from categorization as additional spots
-                for venue in additional_venues:
-                    if len(additional_spots) < 6:
-                        # Create meaningful cultural paths based on venue type
-                        if any(word in venue.lower() for word in ['beach', 'hill', 'mountain']):
-                            cultural_path = f'{music} → Scenic inspiration → {venue}'
-                        elif any(word in venue.lower() for word in ['stadium', 'camp']):
-                            cultural_path = f'{movie} → Sports culture → {venue}'
-                        elif any(word in venue.lower() for word in ['port', 'vell']):
-                            cultural_path = f'{food} → Waterfront dining → {venue}'
-                        else:
-                            cultural_path = f'Cultural exploration → {venue}'
-                        
-                        additional_spots.append({
-                            'venue': venue,
-                            'cultural_path': cultural_path
-                        })
-                
-                return additional_spots[:6]  # Max 6 spots
+            music_venues, food_venues, film_venues, additional_venues = group_venues(city_venues_list)
             
             # Create organized taste mapping structure
             taste_mapping = {
@@ -342,7 +408,7 @@ def get_taste_based_destinations(user_preferences):
                         'cultural_path': f"{food} → Mediterranean diet → {venue.split()[-1] if len(venue.split()) > 1 else 'local flavors'}"
                     } for venue in food_venues[:3]
                 ],
-                'additional_spots': get_qloo_additional_spots(best_match['city'], music, movie, food)
+                'additional_spots': cultural_paths(additional_venues, music, movie, food)
             }
             
             return {
@@ -1,15 +1,71 @@
 import qrcode
+import hashlib
 import io
-from flask import send_file
+import os
+from flask import Response
 from PIL import Image
+from .cache import TTLCache
 
-def generate_qr_code(data):
-    """Generate a QR code image for the given data and return a Flask send_file response."""
-    img = qrcode.make(data)
-    buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    buf.seek(0)
-    return send_file(buf, mimetype='image/png')
+# Encoded QR images keyed on (kind, data). The payloads are deterministic Maps URLs, so
+# entries never go stale and only need LRU bounds.
+_qr_cache = TTLCache(
+    'qr_codes',
+    ttl=None,
+    max_entries=int(os.getenv("QR_CACHE_MAX_ENTRIES", "4096")),
+    max_bytes=int(os.getenv("QR_CACHE_MAX_BYTES", str(16 * 1024 * 1024))) or None,
+)
+
+QR_MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+def encode_qr(data, fmt='png'):
+    """Encoded QR bytes and a strong ETag for `data` as 'png' or 'svg', cached by data."""
+    key = (fmt, data)
+    found, cached = _qr_cache.lookup(key)
+    if found:
+        return cached
+    if fmt == 'svg':
+        body = qr_svg(data)
+    else:
+        buf = io.BytesIO()
+        qrcode.make(data).save(buf, format='PNG')
+        body = buf.getvalue()
+    entry = (body, hashlib.sha256(body).hexdigest()[:32])
+    _qr_cache.set(key, entry)
+    return entry
+
+def qr_svg(data):
+    """
+    QR code as a compact SVG: one <path> with a subpath per horizontal run of dark
+    modules, so nothing is rasterized and the markup scales cleanly at any size.
+    """
+    qr = qrcode.QRCode()
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    size = len(matrix)
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(runs)}"/></svg>'
+    ).encode('utf-8')
+
+def generate_qr_code(data, fmt='png'):
+    """Generate a QR code image for the given data and return a cacheable Flask response."""
+    body, etag = encode_qr(data, fmt)
+    response = Response(body, mimetype=QR_MIMETYPES[fmt])
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 def create_direction_qr(start_location, destination, city):
     """Create QR code for directions between two locations"""
@@ -26,6 +82,9 @@ def create_direction_qr(start_location, destination, city):
 
 def generate_qr_image_data(data):
     """Generate QR code and return image data for PDF embedding"""
+    found, cached = _qr_cache.lookup(('pdf', data))
+    if found:
+        return io.BytesIO(cached)
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -40,6 +99,7 @@ def generate_qr_image_data(data):
     # Convert to bytes for PDF embedding
     buf = io.BytesIO()
     img.save(buf, format='PNG')
+    _qr_cache.set(('pdf', data), buf.getvalue())
     buf.seek(0)
     return buf
 
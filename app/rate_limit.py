@@ -0,0 +1,252 @@
+# app/rate_limit.py
+import asyncio
+import datetime
+import threading
+import time
+from . import deadline
+from .utils import env_settings
+
+# Client-side pacing for upstream APIs. Each provider gets a token bucket for requests per
+# second; LLM providers also get one for tokens per minute and a daily spend cap. A call
+# that can't be admitted within its wait budget raises OverBudget straight away, so callers
+# take their fallback path (Paris, "Contact travel agent...") instead of collecting 429s.
+# Every value can be overridden from the environment, e.g. RATE_QLOO_REQUESTS_PER_SECOND=2
+# or RATE_TOGETHER_DAILY_BUDGET_USD=20. A rate of 0 means unlimited.
+RATE_LIMIT_DEFAULTS = {
+    'qloo': {'requests_per_second': 4.0, 'burst': 8, 'max_wait': 2.0},
+    'together': {
+        'requests_per_second': 3.0, 'burst': 12, 'max_wait': 5.0,
+        'tokens_per_minute': 60000, 'daily_budget_usd': 10.0, 'usd_per_million_tokens': 0.2,
+    },
+    'openweather': {'requests_per_second': 10.0, 'burst': 20, 'max_wait': 1.0},
+    'unsplash': {'requests_per_second': 5.0, 'burst': 10, 'max_wait': 1.0},
+    'default': {'requests_per_second': 0.0, 'burst': 0, 'max_wait': 0.0},
+}
+
+# Rough prompt size in tokens when the provider doesn't tell us
+CHARS_PER_TOKEN = 4
+
+
+class OverBudget(Exception):
+    """Raised when a provider's rate or spend limit can't admit a call in time."""
+
+
+def get_limits(provider):
+    """Rate limits for a provider, with environment overrides applied."""
+    defaults = RATE_LIMIT_DEFAULTS.get(provider, RATE_LIMIT_DEFAULTS['default'])
+    return env_settings(f"RATE_{provider.upper()}_", defaults)
+
+
+class TokenBucket:
+    """
+    Refills at `rate` tokens per second up to `capacity`. Reservations may drive the level
+    negative: the caller then waits until the bucket would have refilled that far.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._clock = clock
+        self._level = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1, max_wait=0):
+        """Take `amount` tokens and return how many seconds to wait before using them,
+        or None (taking nothing) if that would be longer than `max_wait`."""
+        with self._lock:
+            self._refill(self._clock())
+            wait = max(0.0, (amount - self._level) / self.rate)
+            if wait > max_wait:
+                return None
+            self._level -= amount
+            return wait
+
+    def refund(self, amount):
+        with self._lock:
+            self._level = min(self.capacity, self._level + amount)
+
+    def available(self):
+        with self._lock:
+            self._refill(self._clock())
+            return self._level
+
+
+class SpendGovernor:
+    """Caps spending per UTC day."""
+
+    def __init__(self, daily_budget, today=lambda: datetime.datetime.now(datetime.timezone.utc).date()):
+        self.daily_budget = daily_budget
+        self._today = today
+        self._day = today()
+        self._spent = 0.0
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        day = self._today()
+        if day != self._day:
+            self._day = day
+            self._spent = 0.0
+
+    def reserve(self, amount):
+        """Book `amount` against today's budget; False (booking nothing) if it would go over."""
+        with self._lock:
+            self._roll()
+            if self._spent + amount > self.daily_budget:
+                return False
+            self._spent += amount
+            return True
+
+    def adjust(self, delta):
+        with self._lock:
+            self._roll()
+            self._spent = max(0.0, self._spent + delta)
+
+    def spent_today(self):
+        with self._lock:
+            self._roll()
+            return self._spent
+
+
+class ProviderLimiter:
+    """Request, token and spend limits for one provider."""
+
+    def __init__(self, provider, limits):
+        self.provider = provider
+        self.limits = limits
+        self.max_wait = limits['max_wait']
+        rps = limits['requests_per_second']
+        self.requests = TokenBucket(rps, limits['burst'] or rps) if rps > 0 else None
+        tpm = limits.get('tokens_per_minute', 0)
+        self.tokens = TokenBucket(tpm / 60.0, tpm) if tpm > 0 else None
+        budget = limits.get('daily_budget_usd', 0)
+        self.spend = SpendGovernor(budget) if budget > 0 else None
+        self.usd_per_token = limits.get('usd_per_million_tokens', 0) / 1e6
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def reserve(self, tokens=0, max_wait=None):
+        """Admit one call using about `tokens` LLM tokens; returns the seconds to wait first.
+        Raises OverBudget if the call can't start within `max_wait` or today's budget is spent."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        taken = []
+        try:
+            if self.spend is not None and tokens:
+                if not self.spend.reserve(tokens * self.usd_per_token):
+                    raise OverBudget(f"{self.provider} daily budget of ${self.spend.daily_budget:.2f} is spent")
+                taken.append(lambda: self.spend.adjust(-tokens * self.usd_per_token))
+            wait = 0.0
+            for bucket, amount, unit in ((self.requests, 1, 'requests'), (self.tokens, tokens, 'tokens')):
+                if bucket is None or not amount:
+                    continue
+                bucket_wait = bucket.reserve(amount, max_wait)
+                if bucket_wait is None:
+                    raise OverBudget(f"{self.provider} {unit} rate limit: no capacity within {max_wait:g}s")
+                taken.append(lambda bucket=bucket, amount=amount: bucket.refund(amount))
+                wait = max(wait, bucket_wait)
+        except OverBudget:
+            for undo in taken:
+                undo()
+            with self._lock:
+                self.rejected += 1
+            raise
+        with self._lock:
+            self.admitted += 1
+        return wait
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Correct the spend booked for a call once its real token usage is known."""
+        if self.spend is not None and actual_tokens is not None:
+            self.spend.adjust((actual_tokens - estimated_tokens) * self.usd_per_token)
+
+    def over_budget(self, tokens=0):
+        """True if a call of this size would be refused right now (nothing is reserved)."""
+        if self.spend is not None and tokens:
+            if self.spend.spent_today() + tokens * self.usd_per_token > self.spend.daily_budget:
+                return True
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None and amount and (amount - bucket.available()) / bucket.rate > self.max_wait:
+                return True
+        return False
+
+    def stats(self):
+        return {
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'requests_available': round(self.requests.available(), 2) if self.requests else None,
+            'tokens_available': round(self.tokens.available()) if self.tokens else None,
+            'spent_today_usd': round(self.spend.spent_today(), 4) if self.spend else None,
+            'daily_budget_usd': self.spend.daily_budget if self.spend else None,
+        }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """Process-wide limiter for a provider, created on first use."""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                limiter = ProviderLimiter(provider, get_limits(provider))
+                _limiters[provider] = limiter
+    return limiter
+
+
+def estimate_tokens(body):
+    """Upper bound on the tokens an LLM request body will use: prompt size plus max_tokens."""
+    if not isinstance(body, dict) or 'max_tokens' not in body:
+        return 0
+    prompt = ''.join(str(m.get('content', '')) for m in body.get('messages', []) if isinstance(m, dict))
+    prompt += str(body.get('prompt', ''))
+    return len(prompt) // CHARS_PER_TOKEN + int(body['max_tokens'])
+
+
+def usage_tokens(result):
+    """total_tokens from an OpenAI-style response body, if present."""
+    try:
+        return int(result['usage']['total_tokens'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _reserve(provider, tokens, max_wait):
+    limiter = get_limiter(provider)
+    # Waiting for capacity never runs past the request's deadline
+    return limiter.reserve(tokens, deadline.cap_wait(limiter.max_wait if max_wait is None else max_wait))
+
+
+def acquire(provider, tokens=0, max_wait=None):
+    """Block until a call may go out (at most `max_wait` seconds) or raise OverBudget."""
+    wait = _reserve(provider, tokens, max_wait)
+    if wait:
+        time.sleep(wait)
+
+
+async def acquire_async(provider, tokens=0, max_wait=None):
+    wait = _reserve(provider, tokens, max_wait)
+    if wait:
+        await asyncio.sleep(wait)
+
+
+def over_budget(provider, tokens=0):
+    """True if a call to this provider would be refused right now."""
+    return get_limiter(provider).over_budget(tokens)
+
+
+def get_rate_limit_stats():
+    return {provider: limiter.stats() for provider, limiter in list(_limiters.items())}
+
+
+def reset():
+    """Forget every limiter (used by tests)."""
+    with _limiters_lock:
+        _limiters.clear()
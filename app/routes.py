@@ -1,15 +1,28 @@
-from flask import Blueprint, render_template, request, send_file
-from .geodb_api import get_taste_recommendations, get_city_info
+from flask import Blueprint, Response, render_template, request, send_file, url_for
+from .geodb_api import get_taste_recommendations, get_taste_recommendations_async, get_city_info, recommendations_from_qloo
 from .qr_utils import generate_place_qr_codes
-from .itinerary import generate_itinerary_and_sections
-from .unsplash_api import get_image
-from .weather_api import get_weather_forecast
+from .itinerary import fallback_sections, is_fallback, generate_itinerary_and_sections, generate_itinerary_and_sections_async, stream_itinerary_and_sections
+from .image_store import DEFAULT_IMAGE, city_image, read_local_url, read_variant
+from .weather_api import get_weather_forecast, get_weather_forecast_async
 from .maps_utils import google_maps_link
-from .qr_utils import generate_qr_code
+from .qr_utils import QR_MIMETYPES, generate_qr_code
+from .pipeline import Pipeline, Stage
+from .flights import get_estimate, prefetch_estimate
+from .idempotency import IDEMPOTENCY_HEADER, request_key, run_once
+from .jobs import ITINERARY_JOBS, PDF_JOBS, JobQueueFull, get_job
+from .text_layout import wrap_text
+from .text_cleaning import clean_all, clean_budget_line, clean_itinerary_activity, clean_section, clean_text_content
+from .taxonomy import categorize_packing
+from .schemas import TripSections, decode_value
+from .warmer import get_warmer_stats, note_destination
+from . import async_client, deadline, http_client, trip_store
+import asyncio
+import contextvars
 import io
 import os
+import queue
 import re
-import requests
+import threading
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.utils import ImageReader
@@ -22,7 +35,31 @@ def qr():
     data = request.args.get('data')
     if not data:
         return 'Missing data', 400
-    return generate_qr_code(data)
+    fmt = request.args.get('format', 'png').lower()
+    if fmt not in QR_MIMETYPES:
+        return 'Unsupported format', 400
+    # Answers If-None-Match with 304 when the browser already has this code
+    return generate_qr_code(data, fmt).make_conditional(request)
+
+@main.route('/images/<digest>/<variant>.jpg')
+def stored_image(digest, variant):
+    """Serve a destination photo from the local image store."""
+    data = read_variant(digest, variant)
+    if data is None:
+        return 'Image not found', 404
+    response = send_file(io.BytesIO(data), mimetype='image/jpeg')
+    # Content-addressed, so the bytes behind a URL never change
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@main.route('/cache_stats')
+def cache_stats():
+    """Hit/miss counters for the in-process caches, used to size them."""
+    from .cache import all_stats
+    from .circuit_breaker import get_breaker_stats
+    from .rate_limit import get_rate_limit_stats
+    return dict(all_stats(), rate_limits=get_rate_limit_stats(), circuit_breakers=get_breaker_stats(),
+                warmer=get_warmer_stats())
 
 @main.route('/')
 def index():
@@ -40,10 +77,8 @@ def try_parse_json(val):
     except Exception:
         return val
 
-def parse_text_description(description):
-    """Parse free text description to extract preferences using AI"""
-    
-    # Use Together.ai to extract structured data from text
+def _preferences_request(description):
+    """Together AI request body that extracts structured preferences from free text."""
     prompt = f'''
     Extract travel preferences from this description: "{description}"
     
@@ -59,39 +94,31 @@ def parse_text_description(description):
     - "I love jazz and Italian food" → {{"music": "jazz", "movie": "", "food": "Italian", "vibe": "cultural"}}
     - "Beatles fan wanting French cuisine" → {{"music": "Beatles", "movie": "", "food": "French", "vibe": "cultural"}}
     '''
-    
-    try:
-        import requests
-        import os
-        api_key = os.getenv('TOGETHER_API_KEY')
-        
-        response = requests.post(
-            'https://api.together.xyz/v1/chat/completions',
-            headers={'Authorization': f'Bearer {api_key}'},
-            json={
-                'model': 'mistralai/Mistral-7B-Instruct-v0.1',
-                'messages': [{'role': 'user', 'content': prompt}],
-                'max_tokens': 150,
-                'temperature': 0.1
-            }
-        )
+    return {
+        'model': 'mistralai/Mistral-7B-Instruct-v0.1',
+        'messages': [{'role': 'user', 'content': prompt}],
+        'max_tokens': 150,
+        'temperature': 0.1
+    }
+
+def _preferences_from_response(response):
+    """Preferences dict from a Together AI response, or None if it has none."""
+    if response.status_code == 200:
+        content = response.json()['choices'][0]['message']['content'].strip()
+        print(f"DEBUG: AI extracted content: {content}")
         
-        if response.status_code == 200:
-            content = response.json()['choices'][0]['message']['content'].strip()
-            print(f"DEBUG: AI extracted content: {content}")
-            
-            # Extract JSON from response
-            if '{' in content:
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                json_str = content[start:end]
-                parsed_data = json.loads(json_str)
-                print(f"DEBUG: Parsed preferences: {parsed_data}")
-                return parsed_data
-    except Exception as e:
-        print(f"Text parsing error: {e}")
-    
-    # Enhanced fallback - try simple keyword extraction
+        # Extract JSON from response
+        if '{' in content:
+            start = content.find('{')
+            end = content.rfind('}') + 1
+            json_str = content[start:end]
+            parsed_data = json.loads(json_str)
+            print(f"DEBUG: Parsed preferences: {parsed_data}")
+            return parsed_data
+    return None
+
+def _keyword_preferences(description):
+    """Enhanced fallback - try simple keyword extraction"""
     description_lower = description.lower()
     
     # Simple keyword matching as fallback
@@ -110,211 +137,384 @@ def parse_text_description(description):
         'vibe': ''  # No hardcoded default, let downstream logic handle fallback
     }
 
+def parse_text_description(description):
+    """Parse free text description to extract preferences using AI"""
+    try:
+        api_key = os.getenv('TOGETHER_API_KEY')
+        response = http_client.post(
+            'together',
+            'https://api.together.xyz/v1/chat/completions',
+            headers={'Authorization': f'Bearer {api_key}'},
+            json=_preferences_request(description)
+        )
+        parsed_data = _preferences_from_response(response)
+        if parsed_data is not None:
+            return parsed_data
+    except Exception as e:
+        print(f"Text parsing error: {e}")
+    return _keyword_preferences(description)
 
-@main.route('/itinerary', methods=['POST'])
-def itinerary():
-    # Step 1: Collect user input
-    input_type = request.form.get('input_type', 'structured')
-    
-    # Calculate days from start and end dates minus 2 travel days
-    start_date = request.form.get('start_date', '')
-    end_date = request.form.get('end_date', '')
-    
+async def parse_text_description_async(description):
+    """parse_text_description on the shared async client."""
     try:
-        from datetime import datetime
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-        total_days = (end - start).days + 1
-        activity_days = max(1, total_days - 2)  # Subtract 2 travel days, minimum 1 day
-    except Exception:
-        activity_days = 3  # Default fallback
+        api_key = os.getenv('TOGETHER_API_KEY')
+        response = await async_client.post(
+            'together',
+            'https://api.together.xyz/v1/chat/completions',
+            headers={'Authorization': f'Bearer {api_key}'},
+            json=_preferences_request(description)
+        )
+        parsed_data = _preferences_from_response(response)
+        if parsed_data is not None:
+            return parsed_data
+    except Exception as e:
+        print(f"Text parsing error: {e}")
+    return _keyword_preferences(description)
+
+
+def categorize_flat_packing(flat_list):
+    # Simple categorization based on keywords with text cleaning
+    def clean_packing_item(item):
+        if not isinstance(item, str):
+            return str(item)
+        fixes = {'rncoat': 'raincoat', 'rn jacket': 'rain jacket', 'chrgr': 'charger'}
+        for wrong, right in fixes.items():
+            item = item.replace(wrong, right)
+        return item
     
-    # Parse text description using AI
-    trip_description = request.form.get('trip_description', '')
+    return categorize_packing([clean_packing_item(item) for item in flat_list])
+
+def clean_schedule(schedule):
+    """Cleaned morning/afternoon/evening entries for one itinerary day."""
+    if isinstance(schedule, dict):
+        valid_schedule = {}
+        for period in ['morning', 'afternoon', 'evening']:
+            if period in schedule and schedule[period]:
+                valid_schedule[period] = clean_text_content(schedule[period])
+        return valid_schedule if valid_schedule else {'all_day': 'No activities planned'}
+    return {'all_day': clean_text_content(schedule) if schedule else 'No activities planned'}
+
+def prepare_sections(ai_sections):
+    """Turn the AI sections dict into the values the itinerary template renders."""
+    # One validation pass decodes any JSON-encoded sections and fixes their shapes
+    sections = TripSections.from_sections(ai_sections)
+
+    # Packing List Normalization: flat lists are grouped into categories
+    if isinstance(sections.packing, list):
+        packing_list = categorize_flat_packing(sections.packing)
+    else:
+        packing_list = sections.packing
+
+    return {
+        'packing_list': packing_list,
+        'tips': sections.tips,
+        'budget': sections.budget,
+        'transport': sections.transport,
+        'tags': sections.safety,
+        'closing': sections.closing,
+        'itinerary': sections.itinerary,
+        'cleaned_itinerary': {day: clean_schedule(schedule) for day, schedule in sections.itinerary.items()},
+    }
+
+def build_user_input(trip_description, activity_days, departure_city, start_date, end_date):
+    """Step 1: turn the free-text description into structured preferences."""
     user_input = parse_text_description(trip_description)
+    return with_trip_details(user_input, activity_days, departure_city, start_date, end_date)
+
+def with_trip_details(user_input, activity_days, departure_city, start_date, end_date):
     user_input.update({
         "days": str(activity_days),
-        "departure_city": request.form.get('departure_city', ''),
+        "departure_city": departure_city,
         "start_date": start_date,
         "end_date": end_date
     })
+    return user_input
 
-    # Step 2: Get taste-based city recommendation (Qloo -> Together AI)
-    taste_data = get_taste_recommendations(user_input)
-    city = taste_data.get('city', '')
+def forecast_start(taste_data, start_date):
+    """The trip's start date if a forecast covers it (journey starts within 7 days), else None."""
+    from datetime import datetime
+    if not taste_data.get('city', '') or not start_date:
+        return None
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    except Exception:
+        return None
+    if (start - datetime.now().date()).days > 7:
+        # Out of range: show empty or N/A
+        return None
+    return start
 
-    # Step 3: Weather forecast (fetch only if journey is within 7 days from today)
-    from datetime import datetime, timedelta
-    current_date = datetime.now()
+def trip_weather_days(forecast, start):
+    """6-day weather starting from start, N/A where the forecast has no entry."""
+    from datetime import timedelta
+    weather_by_date = {d.get('date', ''): d for d in forecast}
     weather = []
-    if city and start_date:
-        today = datetime.now().date()
-        try:
-            start = datetime.strptime(start_date, '%Y-%m-%d').date()
-            if (start - today).days > 7:
-                # Out of range: show empty or N/A
-                weather = []
-            else:
-                forecast = get_weather_forecast(city, days=7)
-                # Build 6-day weather starting from start_date
-                weather_by_date = {d.get('date', ''): d for d in forecast}
-                weather = []
-                for i in range(6):
-                    day_str = (start + timedelta(days=i)).strftime('%Y-%m-%d')
-                    day_data = weather_by_date.get(day_str)
-                    if day_data:
-                        weather.append(day_data)
-                    else:
-                        weather.append({'date': day_str, 'desc': 'N/A', 'temp': 'N/A'})
-        except Exception as e:
-            weather = []
-    if not weather:
-        weather = []
-    # Step 4: Generate AI-powered itinerary and sections with weather
-    # Ensure days parameter and venues are passed to AI generation
+    for i in range(6):
+        day_str = (start + timedelta(days=i)).strftime('%Y-%m-%d')
+        day_data = weather_by_date.get(day_str)
+        if day_data:
+            weather.append(day_data)
+        else:
+            weather.append({'date': day_str, 'desc': 'N/A', 'temp': 'N/A'})
+    return weather
+
+def get_trip_weather(taste_data, start_date):
+    """Step 3: 6-day forecast from start_date, only if the journey starts within 7 days."""
+    start = forecast_start(taste_data, start_date)
+    if start is None:
+        return []
+    try:
+        return trip_weather_days(get_weather_forecast(taste_data['city'], days=7), start)
+    except Exception:
+        return []
+
+async def get_trip_weather_async(taste_data, start_date):
+    start = forecast_start(taste_data, start_date)
+    if start is None:
+        return []
+    try:
+        return trip_weather_days(await get_weather_forecast_async(taste_data['city'], days=7), start)
+    except Exception:
+        return []
+
+def activity_days_between(start_date, end_date):
+    """Days from start and end dates minus 2 travel days (3 if the dates don't parse)."""
+    try:
+        from datetime import datetime
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        total_days = (end - start).days + 1
+        return max(1, total_days - 2)  # Subtract 2 travel days, minimum 1 day
+    except Exception:
+        return 3  # Default fallback
+
+def taste_data_for_ai(taste_data, activity_days):
+    """Ensure days and venues are passed to AI generation."""
     taste_data_with_days = taste_data.copy()
     taste_data_with_days['days'] = str(activity_days)
     taste_data_with_days['venues'] = taste_data.get('venues', [])
     taste_data_with_days['taste_mapping'] = taste_data.get('taste_mapping', [])
-    ai_sections = generate_itinerary_and_sections(taste_data_with_days, weather=weather)
+    return taste_data_with_days
 
-    # Step 5: Get city image (Unsplash)
-    city_image = get_image(taste_data["city"])
-    # print(f"Image URL for {taste_data['city']}: {city_image}")
+def generate_trip_sections(taste_data, weather, activity_days):
+    """Step 4: AI itinerary and sections."""
+    return generate_itinerary_and_sections(taste_data_for_ai(taste_data, activity_days), weather=weather)
 
-    # Step 6: Additional info and summary - use venues from taste data for consistency
-    city_info = get_city_info(taste_data["city"], taste_data.get('venues', []))
+def stream_trip_sections(taste_data, weather, activity_days, emit):
+    """Step 4 for the streaming view: emits each itinerary day as soon as it is generated."""
+    sections = {}
+    for kind, day, payload in stream_itinerary_and_sections(taste_data_for_ai(taste_data, activity_days), weather=weather):
+        if kind == 'day':
+            emit('day', {'day': day, 'schedule': clean_schedule(payload)})
+        else:
+            sections = payload
+    return sections
 
-    taste_summary = f"You love {user_input.get('music', 'various')} music, movies like {user_input.get('movie', 'various genres')}, and delicious {user_input.get('food', 'cuisine')} food."
+# Fallbacks for /itinerary stages that run short of time (see ITINERARY_DEADLINE_SECONDS).
+# A stage is only started if at least this many seconds are left; otherwise, or if the
+# deadline passes while it runs, the page is built from the cheaper result below.
+STAGE_MIN_SECONDS = {
+    'user_input': 25,   # leave room for the AI sections after parsing
+    'taste_data': 20,
+    'weather': 12,
+    'ai_sections': 8,
+    'city_image': 3,
+    'city_info': 1,
+    'flight_prefetch': 1,
+}
 
-    # Step 7: Get places and generate QR codes for navigation
-    places = city_info.get('places', []) if city_info else []
-    maps_links = [google_maps_link(place, taste_data["city"]) for place in places]
-    
-    # Generate QR codes as URLs instead of BytesIO objects
-    place_qr_codes = {place: f"/qr?data={google_maps_link(place, taste_data['city'])}" for place in places}
+def keyword_user_input(trip_description, activity_days, departure_city, start_date, end_date):
+    """Step 1 without the Together call: keyword-matched preferences."""
+    return with_trip_details(_keyword_preferences(trip_description), activity_days, departure_city, start_date, end_date)
 
-    # Packing checklist is now provided by the AI and always includes all electronics and is categorized by season.
+def keyword_taste_data(user_input):
+    """Step 2 without Qloo: the keyword destination get_taste_recommendations falls back to."""
+    return recommendations_from_qloo(user_input, None)
 
-    # All cultural data now comes from AI - no hardcoded fallbacks
+def no_weather(*args):
+    return []
 
-    # Packing List Normalization
-    def robust_json_parse(val):
-        tries = 0
-        while isinstance(val, str) and tries < 2:
-            try:
-                val = json.loads(val)
-            except Exception:
-                break
-            tries += 1
-        return val
+def late_sections(*args):
+    return fallback_sections("We ran out of time writing your itinerary. Please try again in a moment.")
 
-    def categorize_flat_packing(flat_list):
-        # Simple categorization based on keywords with text cleaning
-        def clean_packing_item(item):
-            if not isinstance(item, str):
-                return str(item)
-            fixes = {'rncoat': 'raincoat', 'rn jacket': 'rain jacket', 'chrgr': 'charger'}
-            for wrong, right in fixes.items():
-                item = item.replace(wrong, right)
-            return item
-        
-        categories = {
-            'Clothing': [],
-            'Electronics': [],
-            'Documents': [],
-            'Personal Care': [],
-            'Other': []
-        }
-        
-        for item in flat_list:
-            item = clean_packing_item(item)
-            item_lower = item.lower()
-            
-            if any(word in item_lower for word in ['shirt', 'pants', 'dress', 'jacket', 'coat', 'shoes', 'socks', 'underwear', 'hat', 'scarf']):
-                categories['Clothing'].append(item)
-            elif any(word in item_lower for word in ['phone', 'charger', 'camera', 'laptop', 'tablet', 'headphones', 'adapter']):
-                categories['Electronics'].append(item)
-            elif any(word in item_lower for word in ['passport', 'visa', 'ticket', 'id', 'license', 'insurance']):
-                categories['Documents'].append(item)
-            elif any(word in item_lower for word in ['toothbrush', 'shampoo', 'soap', 'medicine', 'sunscreen', 'lotion']):
-                categories['Personal Care'].append(item)
-            else:
-                categories['Other'].append(item)
-        
-        return {k: v for k, v in categories.items() if v}
+def placeholder_image(*args):
+    return DEFAULT_IMAGE
+
+def basic_city_info(taste_data):
+    """City info without the destination lookup: the venues Qloo already gave us."""
+    city = taste_data["city"]
+    return {'name': city, 'description': f"{city} is a vibrant cultural destination.",
+            'places': taste_data.get('venues', [])}
 
-    # Process packing list
-    packing_raw = ai_sections.get('packing', [])
-    packing_parsed = robust_json_parse(packing_raw)
+def skip_flight_prefetch(*args):
+    # The page and PDF ask for the estimate themselves; prefetching only saves them the wait
+    return None
+
+def prefetch_trip_flight(taste_data, departure_city, start_date):
+    """Start the flight estimate the itinerary page and PDF will ask for, keyed like their requests."""
+    prefetch_estimate(departure_city or 'Nairobi', taste_data["city"], (start_date or '')[:7])
+
+def itinerary_stages(sections_stage):
+    """Steps 1-6 of /itinerary as a dependency graph. Once the city is known, weather, the
+    hero image and city info run side by side; the AI call waits for weather because the
+    forecast goes into its prompt."""
+    return [
+        Stage('user_input', build_user_input,
+              inputs=['trip_description', 'activity_days', 'departure_city', 'start_date', 'end_date'],
+              fallback=keyword_user_input, min_seconds=STAGE_MIN_SECONDS['user_input']),
+        Stage('taste_data', lambda user_input: get_taste_recommendations(user_input), inputs=['user_input'],
+              fallback=keyword_taste_data, min_seconds=STAGE_MIN_SECONDS['taste_data']),
+        Stage('weather', get_trip_weather, inputs=['taste_data', 'start_date'],
+              fallback=no_weather, min_seconds=STAGE_MIN_SECONDS['weather']),
+        sections_stage,
+        Stage('city_image', lambda taste_data: city_image(taste_data["city"]), inputs=['taste_data'],
+              fallback=placeholder_image, min_seconds=STAGE_MIN_SECONDS['city_image']),
+        Stage('city_info', lambda taste_data: get_city_info(taste_data["city"], taste_data.get('venues', [])),
+              inputs=['taste_data'], fallback=basic_city_info, min_seconds=STAGE_MIN_SECONDS['city_info']),
+        Stage('flight_prefetch', prefetch_trip_flight, inputs=['taste_data', 'departure_city', 'start_date'],
+              fallback=skip_flight_prefetch, min_seconds=STAGE_MIN_SECONDS['flight_prefetch']),
+    ]
+
+ITINERARY_PIPELINE = Pipeline(itinerary_stages(
+    Stage('ai_sections', generate_trip_sections, inputs=['taste_data', 'weather', 'activity_days'],
+          fallback=late_sections, min_seconds=STAGE_MIN_SECONDS['ai_sections'])
+), name='itinerary')
+
+ITINERARY_STREAM_PIPELINE = Pipeline(itinerary_stages(
+    Stage('ai_sections', stream_trip_sections, inputs=['taste_data', 'weather', 'activity_days', 'emit'],
+          fallback=late_sections, min_seconds=STAGE_MIN_SECONDS['ai_sections'])
+), name='itinerary_stream')
+
+@main.route('/itinerary', methods=['POST'])
+def itinerary():
+    # Double submits and refreshes attach to the run already in progress or its stored result
+    key = request_key('itinerary', request.form, request.headers.get(IDEMPOTENCY_HEADER))
+    context = run_once(key, itinerary_context, request.form.to_dict(), keep=complete_page)
+    return render_template("itinerary.html", **context)
+
+@main.route('/itinerary/async', methods=['POST'])
+def itinerary_async():
+    # Same page as /itinerary, but the upstream calls are awaited on the shared event loop
+    # instead of holding a pool thread each while they wait
+    key = request_key('itinerary_async', request.form, request.headers.get(IDEMPOTENCY_HEADER))
+    context = run_once(key, lambda form: async_client.run(itinerary_context_async(form)), request.form.to_dict(),
+                       keep=complete_page)
+    return render_template("itinerary.html", **context)
+
+def complete_page(context):
+    """False for pages built from a stage fallback or error sections: a retry should run again."""
+    return not context.get('degraded')
+
+def itinerary_context(form):
+    """Run the itinerary pipeline for the submitted form and build the itinerary.html context."""
+    # Step 1: Collect user input
+    input_type = form.get('input_type', 'structured')
     
-    if isinstance(packing_parsed, list):
-        packing_list = categorize_flat_packing(packing_parsed)
-    elif isinstance(packing_parsed, dict):
-        packing_list = packing_parsed
-    else:
-        packing_list = {'Other': [str(packing_raw)]}
+    # Calculate days from start and end dates minus 2 travel days
+    start_date = form.get('start_date', '')
+    end_date = form.get('end_date', '')
+    activity_days = activity_days_between(start_date, end_date)
+    
+    trip_description = form.get('trip_description', '')
 
-    # Process AI sections for template rendering
-    def robust_json_parse(val):
-        tries = 0
-        while isinstance(val, str) and tries < 3:
-            try:
-                val = json.loads(val)
-            except Exception:
-                break
-            tries += 1
-        return val
+    # Steps 1-6: parse preferences (Together AI), pick the city (Qloo), then weather,
+    # AI sections, Unsplash image and city info with independent stages overlapping.
+    # Every upstream call shares one time budget; stages short of time degrade.
+    with deadline.within(deadline.ITINERARY_DEADLINE_SECONDS):
+        run = ITINERARY_PIPELINE.run({
+            'trip_description': trip_description,
+            'activity_days': activity_days,
+            'departure_city': form.get('departure_city', ''),
+            'start_date': start_date,
+            'end_date': end_date,
+        })
+    context = build_itinerary_context(form, run)
+    # A skipped flight prefetch doesn't change the page
+    context['degraded'] = bool(set(run.fallbacks) - {'flight_prefetch'}) or is_fallback(run['ai_sections'])
+    return remember_trip(context)
 
-    # Recursively robustly parse all AI sections
-    sections = {}
-    for key in ['packing','tips','budget','transport','safety','closing','itinerary']:
-        sections[key] = robust_json_parse(ai_sections.get(key, {}))
+async def itinerary_context_async(form):
+    """itinerary_context with every upstream call awaited on the shared event loop."""
+    with deadline.within(deadline.ITINERARY_DEADLINE_SECONDS):
+        return await _itinerary_context_async(form)
 
-    # Get packing data directly from sections
-    packing = sections.get('packing', {})
+async def _itinerary_context_async(form):
+    start_date = form.get('start_date', '')
+    end_date = form.get('end_date', '')
+    activity_days = activity_days_between(start_date, end_date)
+    departure_city = form.get('departure_city', '')
+    trip_description = form.get('trip_description', '')
+    fallbacks = []
 
-    # Special handling for itinerary: if list, convert to dict
-    itinerary_data = sections['itinerary']
-    if isinstance(itinerary_data, list):
-        itinerary_data = {f"Day {i+1}": v for i, v in enumerate(itinerary_data)}
-    elif isinstance(itinerary_data, dict) and set(itinerary_data.keys()) == {'itinerary'}:
-        itinerary_data = itinerary_data['itinerary']
-    if not isinstance(itinerary_data, dict):
-        itinerary_data = {}
-
-    # Clean itinerary structure with text cleaning
-    def clean_text_content(text):
-        """Clean text content to prevent parsing issues"""
-        if not isinstance(text, str):
-            return str(text)
-        # Apply same cleaning as clean_section but lighter
-        word_fixes = {
-            'rncoat': 'raincoat', 'rn ': 'rain ', 'ecnomy': 'economy', 'ecnomic': 'economic',
-            'trvl': 'travel', 'trvel': 'travel', 'accomodation': 'accommodation',
-            'restarant': 'restaurant', 'resturant': 'restaurant', 'transprt': 'transport'
-        }
-        for wrong, correct in word_fixes.items():
-            text = text.replace(wrong, correct)
-        return re.sub(r'\s+', ' ', text).strip()
+    def noted(name, fallback):
+        def use():
+            fallbacks.append(name)
+            return fallback()
+        return use
+
+    user_input = await deadline.run_within(
+        lambda: parse_text_description_async(trip_description),
+        noted('user_input', lambda: _keyword_preferences(trip_description)), STAGE_MIN_SECONDS['user_input'])
+    user_input = with_trip_details(user_input, activity_days, departure_city, start_date, end_date)
+    taste_data = await deadline.run_within(
+        lambda: get_taste_recommendations_async(user_input),
+        noted('taste_data', lambda: keyword_taste_data(user_input)), STAGE_MIN_SECONDS['taste_data'])
+    prefetch_trip_flight(taste_data, departure_city, start_date)
+
+    async def weather_and_sections():
+        # The forecast goes into the AI prompt, so the sections wait for it
+        weather = await deadline.run_within(
+            lambda: get_trip_weather_async(taste_data, start_date), noted('weather', no_weather),
+            STAGE_MIN_SECONDS['weather'])
+        ai_sections = await deadline.run_within(
+            lambda: generate_itinerary_and_sections_async(taste_data_for_ai(taste_data, activity_days), weather=weather),
+            noted('ai_sections', late_sections), STAGE_MIN_SECONDS['ai_sections'])
+        return weather, ai_sections
+
+    (weather, ai_sections), image = await asyncio.gather(
+        weather_and_sections(),
+        # The local image store does blocking file and Unsplash I/O of its own
+        deadline.run_within(lambda: asyncio.to_thread(city_image, taste_data["city"]),
+                            noted('city_image', placeholder_image), STAGE_MIN_SECONDS['city_image']),
+    )
+    context = build_itinerary_context(form, {
+        'user_input': user_input,
+        'taste_data': taste_data,
+        'weather': weather,
+        'ai_sections': ai_sections,
+        'city_image': image,
+        'city_info': get_city_info(taste_data["city"], taste_data.get('venues', [])),
+    })
+    context['degraded'] = bool(fallbacks) or is_fallback(ai_sections)
+    # Compressing and writing the trip (and the odd purge) would stall every request on the loop
+    return await asyncio.to_thread(remember_trip, context)
+
+def build_itinerary_context(form, run):
+    """The itinerary.html context from the form and the results of steps 1-6."""
+    trip_description = form.get('trip_description', '')
+    user_input = run['user_input']
+    taste_data = run['taste_data']
+    weather = run['weather']
+    ai_sections = run['ai_sections']
+    city_image = run['city_image']
+    city_info = run['city_info']
+
+    taste_summary = f"You love {user_input.get('music', 'various')} music, movies like {user_input.get('movie', 'various genres')}, and delicious {user_input.get('food', 'cuisine')} food."
+
+    # Step 7: Get places and generate QR codes for navigation
+    places = city_info.get('places', []) if city_info else []
+    maps_links = [google_maps_link(place, taste_data["city"]) for place in places]
     
-    cleaned_itinerary = {}
-    for day, schedule in itinerary_data.items():
-        if isinstance(schedule, dict):
-            valid_schedule = {}
-            for period in ['morning', 'afternoon', 'evening']:
-                if period in schedule and schedule[period]:
-                    valid_schedule[period] = clean_text_content(schedule[period])
-            cleaned_itinerary[day] = valid_schedule if valid_schedule else {'all_day': 'No activities planned'}
-        else:
-            cleaned_itinerary[day] = {'all_day': clean_text_content(schedule) if schedule else 'No activities planned'}
+    # Generate QR codes as URLs instead of BytesIO objects
+    place_qr_codes = {place: f"/qr?data={google_maps_link(place, taste_data['city'])}" for place in places}
 
-    # Use robustly parsed sections for all template variables
-    packing_list = packing
+    sections = prepare_sections(ai_sections)
+    packing_list = sections['packing_list']
+    itinerary_data = sections['itinerary']
     tips = sections['tips']
     budget = sections['budget']
     transport = sections['transport']
-    tags = sections['safety']
+    tags = sections['tags']
     closing = sections['closing']
     
     # Get Qloo branding info
@@ -326,8 +526,7 @@ def itinerary():
     enhanced_maps_links = [google_maps_link(place, taste_data["city"]) for place in enhanced_places]
     enhanced_qr_codes = {place: f"/qr?data={google_maps_link(place, taste_data['city'])}" for place in enhanced_places}
     
-    return render_template(
-        "itinerary.html",
+    return dict(
         city_info=city_info,
         reason=taste_data.get("reason", ""),
         summary=taste_summary,
@@ -345,6 +544,7 @@ def itinerary():
         weather=weather,
         start_date=user_input["start_date"],
         end_date=user_input["end_date"],
+        departure_city=form.get('departure_city') or 'Nairobi',
         qloo_info=qloo_info,
         qloo_powered=taste_data.get('qloo_powered', True),
         taste_mapping=taste_data.get('taste_mapping', []),
@@ -358,6 +558,173 @@ def itinerary():
         user_prompt=trip_description
     )
 
+def remember_trip(context):
+    """Store the finished page context and add its trip_id, which the page posts instead of its content."""
+    note_destination((context.get('city_info') or {}).get('name'))
+    try:
+        context['trip_id'] = trip_store.save(context)
+    except Exception as e:
+        # The page still works, it just posts every field to /download_pdf as before
+        print(f"[Trips] Could not store trip: {e}")
+        context['trip_id'] = None
+    return context
+
+# Shown at the end of the PDF; the page posts the same text in its killer_note field
+PDF_CLOSING_NOTE = "TasteTrip is not just a travel app. It's a cultural translator — powered by Qloo's API — that turns your unique taste in music, film, and food into a real-world adventure. This {{ city_info.name }} journey was built using cultural AI, and every stop reflects what you love. It's how travel should feel: personal, intelligent, and meaningful."
+
+def trip_pdf_fields(trip):
+    """The fields render_pdf reads, taken from a stored trip instead of the posted page."""
+    city_info = trip.get('city_info') or {}
+    return {
+        'itinerary': trip.get('itinerary', {}),
+        'image_url': trip.get('image', ''),
+        'city_name': city_info.get('name', 'Destination'),
+        'departure_city': trip.get('departure_city', ''),
+        'start_date': trip.get('start_date', ''),
+        'end_date': trip.get('end_date', ''),
+        'packing_list': trip.get('packing_list', {}),
+        'tips': trip.get('tips', []),
+        'budget': trip.get('budget', {}),
+        'transport': trip.get('transport', []),
+        'tags': trip.get('tags', []),
+        'closing': trip.get('closing', ''),
+        'reason': trip.get('reason', ''),
+        'summary': trip.get('summary', ''),
+        'taste_mapping': trip.get('taste_mapping', []),
+        'weather': trip.get('weather', []),
+        'places': trip.get('places', []),
+        'city_description': city_info.get('description', ''),
+        'trip_description': trip.get('user_prompt', ''),
+        'user_name': 'Traveler',
+        'killer_note': PDF_CLOSING_NOTE,
+    }
+
+def pdf_form(form):
+    """render_pdf's input for a posted form: the stored trip's fields when it names a trip_id
+    (plus the page's flight estimate), else the posted fields. None for an unknown trip."""
+    form = form.to_dict()
+    trip_id = form.get('trip_id')
+    if not trip_id:
+        return form
+    trip = trip_store.load(trip_id)
+    if trip is None:
+        return None
+    return dict(trip_pdf_fields(trip), flight_estimate=form.get('flight_estimate', ''))
+
+def _unknown_trip():
+    return {'error': 'Unknown or expired trip'}, 404
+
+@main.route('/trip/<trip_id>')
+def trip_page(trip_id):
+    """Re-render a stored itinerary page (shareable, survives a refresh)."""
+    trip = trip_store.load(trip_id)
+    if trip is None:
+        return _unknown_trip()
+    return render_template("itinerary.html", **trip)
+
+@main.route('/trip/<trip_id>/qr')
+def trip_qr(trip_id):
+    """QR code linking to a stored trip's page, to open it on a phone."""
+    if trip_store.load(trip_id) is None:
+        return _unknown_trip()
+    fmt = request.args.get('format', 'png').lower()
+    if fmt not in QR_MIMETYPES:
+        return 'Unsupported format', 400
+    url = url_for('main.trip_page', trip_id=trip_id, _external=True)
+    return generate_qr_code(url, fmt).make_conditional(request)
+
+# Seconds between SSE comments that keep idle proxies from closing the stream
+SSE_KEEPALIVE_SECONDS = 15
+
+def sse_event(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@main.route('/itinerary/live')
+def itinerary_live():
+    """Page that renders the itinerary progressively from /itinerary/stream."""
+    return render_template("itinerary_live.html", stream_query=request.query_string.decode('utf-8'))
+
+@main.route('/itinerary/stream', methods=['GET', 'POST'])
+def itinerary_stream():
+    """Streaming /itinerary: sends an SSE event as each pipeline stage completes.
+
+    Events: preferences, destination, venues, weather, image, city_info, one `day` per
+    itinerary day as the Together completion streams in, sections, then done (or error).
+    """
+    form = request.values
+    start_date = form.get('start_date', '')
+    end_date = form.get('end_date', '')
+    events = queue.Queue()
+
+    def emit(event, data):
+        events.put((event, data))
+
+    def on_result(stage, value):
+        if stage == 'user_input':
+            emit('preferences', {k: value.get(k, '') for k in ['music', 'movie', 'food', 'vibe', 'days']})
+        elif stage == 'taste_data':
+            city = value.get('city', '')
+            venues = value.get('venues') or []
+            emit('destination', {
+                'city': city,
+                'reason': value.get('reason', ''),
+                'qloo_powered': value.get('qloo_powered', True),
+            })
+            emit('venues', {
+                'venues': venues,
+                'maps_links': [google_maps_link(place, city) for place in venues],
+                'taste_mapping': value.get('taste_mapping', []),
+            })
+        elif stage == 'weather':
+            emit('weather', {'weather': value})
+        elif stage == 'city_image':
+            emit('image', {'image': value})
+        elif stage == 'city_info':
+            places = value.get('places', [])
+            emit('city_info', dict(value, maps_links=[google_maps_link(place, value.get('name')) for place in places]))
+        elif stage == 'ai_sections':
+            sections = prepare_sections(value)
+            sections['closing'] = str(sections['closing'])[:500] if sections['closing'] else ''
+            sections['itinerary'] = sections.pop('cleaned_itinerary')
+            emit('sections', sections)
+
+    def run_pipeline():
+        try:
+            # Same time budget as /itinerary, so slow stages degrade instead of stalling the stream
+            with deadline.within(deadline.ITINERARY_DEADLINE_SECONDS):
+                ITINERARY_STREAM_PIPELINE.run({
+                    'trip_description': form.get('trip_description', ''),
+                    'activity_days': activity_days_between(start_date, end_date),
+                    'departure_city': form.get('departure_city', ''),
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'emit': emit,
+                }, on_result=on_result)
+            emit('done', {})
+        except Exception as e:
+            print(f"Itinerary stream error: {e}")
+            emit('error', {'message': 'Itinerary generation failed'})
+        finally:
+            events.put(None)
+
+    threading.Thread(target=contextvars.copy_context().run, args=(run_pipeline,),
+                     name='itinerary-stream', daemon=True).start()
+
+    def generate():
+        while True:
+            try:
+                item = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            if item is None:
+                return
+            yield sse_event(*item)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @main.route('/get_flight_estimate', methods=['POST'])
 def get_flight_estimate_api():
     data = request.get_json()
@@ -365,73 +732,118 @@ def get_flight_estimate_api():
     destination = data.get('destination', 'Barcelona')
     month = data.get('month', '')
     
-    from .itinerary import get_flight_estimate_with_sites
-    price, sites = get_flight_estimate_with_sites(departure, destination, month)
+    # Usually already computed (or in flight) since the itinerary pipeline prefetched it
+    price, sites = get_estimate(departure, destination, month)
     
     return {'price': price, 'sites': sites}
 
 @main.route('/download_pdf', methods=['POST'])
 def download_pdf():
-    content = request.form.get('content', '')
-    image_url = request.form.get('image_url', '')
-    city_name = request.form.get('city_name', 'Destination')
-    departure_city = request.form.get('departure_city', '')
-    user_name = request.form.get('user_name', 'Traveler')
-    start_date = request.form.get('start_date', '')
-    end_date = request.form.get('end_date', '')
+    form = pdf_form(request.form)
+    if form is None:
+        return _unknown_trip()
+    key = request_key('pdf', request.form, request.headers.get(IDEMPOTENCY_HEADER))
+    buffer = io.BytesIO(run_once(key, render_pdf, form))
+    return send_file(buffer, as_attachment=True, download_name="taste_trip_itinerary.pdf", mimetype='application/pdf')
+
+def parse_budget_category(val):
+    """
+    Parse budget category value into both list and sentence formats.
+    Returns a tuple of (cleaned_list, formatted_sentence)
+    """
+    import re
+    cleaned_list = []
+    formatted_sentence = []
+
+    def clean_item(item):
+        """Clean a single item by removing brackets and quotes"""
+        item = str(item).strip()
+        # Remove any surrounding brackets, quotes, or parentheses
+        item = re.sub(r'^[\[\]\(\)\{\}\'\"]+', '', item)
+        item = re.sub(r'[\[\]\(\)\{\}\'\"]+$', '', item)
+        return item.strip()
+
+    def format_sentence(desc, price):
+        """Format budget item as a sentence with proper spacing"""
+        return f"{desc} (${price})" if price else desc
+
+    if isinstance(val, list):
+        # Clean and group related items
+        for item in val:
+            item = clean_item(item)
+            if not item:
+                continue
+            cleaned = clean_budget_line(item)
+
+            # Extract price (including /night)
+            price_match = re.search(r'\$(\d+(?:\.\d{1,2})?/night|\$\d+)', cleaned)
+            price = price_match.group(0) if price_match else ''
+
+            # Format and add to lists
+            cleaned_list.append(cleaned)
+            formatted_sentence.append(format_sentence(cleaned, price))
+
+    elif isinstance(val, str):
+        # Clean the string first
+        val = clean_item(val)
+        # Split by common delimiters
+        raw_lines = re.split(r'[\n;\,]', val)
+
+        for line in raw_lines:
+            line = clean_item(line)
+            if not line.strip():
+                continue
+
+            cleaned = clean_budget_line(line)
+
+            # Extract price (including /night)
+            price_match = re.search(r'\$(\d+(?:\.\d{1,2})?/night|\$\d+)', cleaned)
+            price = price_match.group(0) if price_match else ''
+
+            # Format and add to lists
+            cleaned_list.append(cleaned)
+            formatted_sentence.append(format_sentence(cleaned, price))
+            cleaned = clean_budget_line(line)
+            cleaned_list.append(cleaned)
+            # Format for sentence
+            if '$' in cleaned:
+                parts = cleaned.split('$')
+                if len(parts) == 2:
+                    desc = parts[0].strip()
+                    price = parts[1].strip()
+                    formatted_sentence.append(f"{desc} (${price})")
+            else:
+                formatted_sentence.append(cleaned)
+
+    # Remove duplicates and empty items
+    cleaned_list = list(dict.fromkeys(cleaned_list))
+    formatted_sentence = list(dict.fromkeys(formatted_sentence))
+
+    # Log the formats
+    print(f"Budget Parsing - List Format: {cleaned_list}")
+    print(f"Budget Parsing - Sentence Format: {formatted_sentence}")
+
+    # Return both formats
+    return cleaned_list[:12], formatted_sentence[:12]
+
+def render_pdf(form):
+    """
+    Render the itinerary PDF for the fields posted by itinerary.html (or taken from a stored
+    trip, see pdf_form) and return its bytes.
+    Takes a plain dict and no request context, so it can run in a worker process.
+    """
+    content = form.get('content', '')
+    image_url = form.get('image_url', '')
+    city_name = form.get('city_name', 'Destination')
+    departure_city = form.get('departure_city', '')
+    user_name = form.get('user_name', 'Traveler')
+    start_date = form.get('start_date', '')
+    end_date = form.get('end_date', '')
+    # The sections posted by the itinerary page (or taken from the stored trip), decoded and validated once
+    sections = TripSections.from_form(form)
 
     # Clean and prepare text
     import re
-    def clean_section(text):
-        if not isinstance(text, str):
-            return text
-        # Remove asterisks, markdown headers, and 'AI' markers
-        text = re.sub(r'\*+', '', text)
-        text = re.sub(r'#\s*', '', text)
-        text = text.replace('AI', '').replace('ai', '')
-        # Remove AI translation artifacts
-        text = re.sub(r'"[^"]"\s,\s*[^"]"[^"]"', '', text)  # Remove quoted translations
-        text = re.sub(r'The English translation of "[^"]" is "([^"])"\.?', r'\1', text)  # Extract translation
-        text = re.sub(r'"([^"])",\s[^"]"[^"]"', r'\1', text)  # Clean quoted names
-        text = re.sub(r'"([^"]*)"\.', r'\1', text)  # Remove quotes and periods
-        
-        # Fix common word parsing errors
-        word_fixes = {
-            'rncoat': 'raincoat', 'rn ': 'rain ', 'ecnomy': 'economy', 'ecnomic': 'economic',
-            'trvl': 'travel', 'trvel': 'travel', 'accomodation': 'accommodation',
-            'restarant': 'restaurant', 'resturant': 'restaurant', 'transprt': 'transport',
-            'airprt': 'airport', 'htl': 'hotel', 'bkng': 'booking', 'flght': 'flight'
-        }
-        for wrong, correct in word_fixes.items():
-            text = text.replace(wrong, correct)
-        
-        # Fix common word breaks and spacing issues
-        text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single
-        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)  # camelCase to spaced
-        text = re.sub(r'([a-z])(\d)', r'\1 \2', text)  # letter+number
-        text = re.sub(r'(\d)([a-z])', r'\1 \2', text)  # number+letter
-        
-        # Fix broken words at line boundaries
-        text = re.sub(r'([a-z])\s+([a-z]{1,3})\s+([a-z])', lambda m: 
-                     m.group(1) + m.group(2) + m.group(3) if len(m.group(2)) <= 2 else m.group(0), text)
-        
-        # Handle budget data specifically
-        if 'Budget Estimates' in text:
-            # Split into sections
-            sections = text.split('Budget Estimates')
-            cleaned_sections = []
-            for section in sections:
-                # Clean each section
-                section = section.strip()
-                if not section:
-                    continue
-                # Remove continuation marks
-                section = re.sub(r'\\', '', section)  # Remove backslashes
-                section = re.sub(r'\s*•\s*', '• ', section)  # Normalize bullet points
-                cleaned_sections.append(section)
-            text = 'Budget Estimates'.join(cleaned_sections)
-        
-        return text.strip()
     clean_content = clean_section(content)
 
     buffer = io.BytesIO()
@@ -513,9 +925,14 @@ def download_pdf():
     # Insert city hero image (large and visually dominant)
     if image_url and not image_url.endswith("logo.png"):
         try:
-            img_response = requests.get(image_url)
-            if img_response.status_code == 200:
-                img_reader = ImageReader(io.BytesIO(img_response.content))
+            # Photos from the local store are read from disk at PDF size; other URLs are downloaded
+            img_bytes = read_local_url(image_url, 'pdf')
+            if img_bytes is None:
+                img_response = http_client.get('images', image_url)
+                if img_response.status_code == 200:
+                    img_bytes = img_response.content
+            if img_bytes is not None:
+                img_reader = ImageReader(io.BytesIO(img_bytes))
                 image_height = 320
                 image_width = width - 80
                 pdf.drawImage(img_reader, 40, y - image_height, width=image_width, height=image_height, preserveAspectRatio=True)
@@ -527,45 +944,8 @@ def download_pdf():
     pdf.drawCentredString(width // 2, y, "Your personalized cultural adventure awaits!")
     y -= 30
 
-    # --- Text wrapping utility (must be defined before use) ---
-    def wrap_text(text, max_width, font_size=11):
-        pdf.setFont("Helvetica", font_size)
-        words = str(text).split()
-        lines = []
-        current_line = ""
-        for word in words:
-            # Handle long words that exceed max width
-            if pdf.stringWidth(word) > max_width:
-                if current_line:
-                    lines.append(current_line)
-                    current_line = ""
-                # Break long word
-                while len(word) > 0:
-                    char_count = 0
-                    temp_word = ""
-                    for char in word:
-                        if pdf.stringWidth(temp_word + char) <= max_width:
-                            temp_word += char
-                            char_count += 1
-                        else:
-                            break
-                    if temp_word:
-                        lines.append(temp_word)
-                    word = word[char_count:]
-            else:
-                test_line = current_line + (" " if current_line else "") + word
-                if pdf.stringWidth(test_line) <= max_width:
-                    current_line = test_line
-                else:
-                    if current_line:
-                        lines.append(current_line)
-                    current_line = word
-        if current_line:
-            lines.append(current_line)
-        return lines
-
     # --- Add user prompt to cover page (before showPage) ---
-    prompt_text = request.form.get('trip_description', '').strip()
+    prompt_text = form.get('trip_description', '').strip()
     if prompt_text:
         # Draw a visually distinct box for the prompt
         box_width = width - 120
@@ -597,15 +977,14 @@ def download_pdf():
     # Get all data from form with better handling
     import json
     try:
-        places_raw = request.form.get('places', '[]')
-        places = json.loads(places_raw) if places_raw and places_raw != '[]' else []
+        # Posted pages send JSON strings; stored trips (trip_pdf_fields) send the lists themselves
+        places = decode_value(form.get('places')) or []
         
-        description = request.form.get('city_description', '') or f"{city_name} is a vibrant cultural destination."
+        description = form.get('city_description', '') or f"{city_name} is a vibrant cultural destination."
         
-        weather_data_raw = request.form.get('weather', '[]')
-        weather_data = json.loads(weather_data_raw) if weather_data_raw and weather_data_raw != '[]' else []
+        weather_data = decode_value(form.get('weather')) or []
         
-        summary = request.form.get('summary', '') or "Your cultural preferences have been carefully analyzed for this personalized recommendation."
+        summary = form.get('summary', '') or "Your cultural preferences have been carefully analyzed for this personalized recommendation."
         
         print(f"PDF Debug - Places: {len(places)}, Weather: {len(weather_data)}, Summary: {len(summary)}")
     except Exception as e:
@@ -615,43 +994,6 @@ def download_pdf():
         weather_data = []
         summary = "Your cultural preferences have been carefully analyzed for this personalized recommendation."
 
-    # Improved text wrapping function with better alignment
-    def wrap_text(text, max_width, font_size=11):
-        pdf.setFont("Helvetica", font_size)
-        words = str(text).split()
-        lines = []
-        current_line = ""
-        
-        for word in words:
-            # Handle long words that exceed max width
-            if pdf.stringWidth(word) > max_width:
-                if current_line:
-                    lines.append(current_line)
-                    current_line = ""
-                # Break long word
-                while len(word) > 0:
-                    char_count = 0
-                    temp_word = ""
-                    for char in word:
-                        if pdf.stringWidth(temp_word + char) <= max_width:
-                            temp_word += char
-                            char_count += 1
-                        else:
-                            break
-                    lines.append(temp_word)
-                    word = word[char_count:]
-            else:
-                test_line = current_line + (" " if current_line else "") + word
-                if pdf.stringWidth(test_line) <= max_width:
-                    current_line = test_line
-                else:
-                    if current_line:
-                        lines.append(current_line)
-                    current_line = word
-        if current_line:
-            lines.append(current_line)
-        return lines
-    
     # --- ENHANCED DESTINATION OVERVIEW ---
     # Section header with icon
     pdf.setFont("Helvetica-Bold", 16)
@@ -677,7 +1019,7 @@ def download_pdf():
         y -= 10
     
     # "Why This City?" highlight box with reason content
-    reason_text = request.form.get('reason', '')
+    reason_text = form.get('reason', '')
     if reason_text:
         # Draw a rounded, colored box for the section
         reason_box_width = width - 100
@@ -701,11 +1043,7 @@ def download_pdf():
         y = box_y - reason_box_height - 18
     
     # --- ENHANCED CULTURAL PREFERENCES SECTION ---
-    taste_mapping_raw = request.form.get('taste_mapping', '[]')
-    try:
-        taste_mapping = json.loads(taste_mapping_raw) if taste_mapping_raw else []
-    except Exception:
-        taste_mapping = []
+    taste_mapping = decode_value(form.get('taste_mapping')) or []
     
     if taste_mapping and isinstance(taste_mapping, list):
         pdf.setFont("Helvetica-Bold", 16)
@@ -775,7 +1113,7 @@ def download_pdf():
     
     if weather_data and len(weather_data) > 0:
         from datetime import datetime, timedelta
-        start_date_str = request.form.get('start_date', '')
+        start_date_str = form.get('start_date', '')
         try:
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
         except Exception:
@@ -864,16 +1202,12 @@ def download_pdf():
     box_left = 40
     box_width = width - 80
     # Estimate box height: header + (categories * (cat header + items * line height + spacing))
-    packing_list_raw = request.form.get('packing_list', '{}')
-    try:
-        packing_list = json.loads(packing_list_raw) if isinstance(packing_list_raw, str) else packing_list_raw
-    except Exception:
-        packing_list = {}
+    packing_list = sections.packing
     # Calculate lines for all items to estimate box height
     def count_lines(items, col_width):
         total = 0
-        for item in items:
-            lines = wrap_text(clean_section(str(item)), col_width, 10)
+        for item_text in clean_all(items):
+            lines = wrap_text(item_text, col_width, 10)
             total += len(lines)
         return total
     box_height = 38  # header
@@ -954,8 +1288,7 @@ def download_pdf():
     elif isinstance(packing_list, list) and packing_list:
         pdf.setFont("Helvetica", 12)
         pdf.setFillColor(text_color)
-        for item in packing_list:
-            item_text = clean_section(str(item))
+        for item_text in clean_all(packing_list):
             lines = wrap_text(item_text, box_width - 40, 12)
             for lidx, line in enumerate(lines):
                 bullet = "• " if lidx == 0 else "  "
@@ -977,11 +1310,7 @@ def download_pdf():
     pdf.setFillColor(header_color)
     pdf.drawString(40, y, u"\U0001F4B0 Budget Estimates (Daily):")
     y -= 16
-    budget_raw = request.form.get('budget', '{}')
-    try:
-        budget = json.loads(budget_raw) if isinstance(budget_raw, str) else budget_raw
-    except Exception:
-        budget = {}
+    budget = sections.budget
     
     if isinstance(budget, dict) and budget:
         # Render as a visually distinct rounded table box
@@ -991,132 +1320,6 @@ def download_pdf():
         col3_x = 320 # Food
         col4_x = 440 # Activities
         col_widths = [col2_x-col1_x, col3_x-col2_x, col4_x-col3_x, box_width-col4_x+40]
-        # Extract values
-        def clean_budget_line(line):
-            """
-            Clean a single budget line: remove brackets, quotes, and extraneous marks, and apply phrase cleaning.
-            Also formats the line into a more readable format.
-            """
-            import re
-            # Remove leading/trailing brackets, quotes
-            line = line.strip()
-            # Remove leading brackets/quotes
-            line = re.sub(r'^[\[\]\(\)\{\}\'\"]+', '', line)
-            # Remove trailing brackets/quotes
-            line = re.sub(r'[\[\]\(\)\{\}\'\"]+$', '', line)
-            line = re.sub(r"^[,\s]+|[,\s]+$", '', line)
-            # Remove repeated/unwanted phrases
-            for phrase in [
-                'cost for', 'expecttospend', 'expect to spend', 'around', 'approximately', 'per activities', 'per activity',
-                'per meals', 'per meal', 'per day for meals', 'per day on', 'per day', 'per activities', 'per activity',
-                'per person', 'for', ':', ' - ', '--', '  '
-            ]:
-                line = line.replace(phrase, '')
-            # Remove double spaces
-            line = ' '.join(line.split())
-            # Format price with proper currency symbol and spacing
-            price_match = re.search(r'\$(\d+(?:\.\d{1,2})?/night|\$\d+)', line)
-            if price_match:
-                price = price_match.group(0)
-                # Remove price from description
-                desc = line.replace(price, '').strip()
-                # Format with proper spacing
-                line = f"{desc} {price}"
-            # Handle specific cases
-            if 'cafe du monde' in line.lower():
-                line = line.replace('cafe du monde', 'Cafe du Monde')
-            if 'beignet cafe' in line.lower():
-                line = line.replace('beignet cafe', 'Beignet Cafe')
-            if 'morial convention center' in line.lower():
-                line = line.replace('morial convention center', 'Ernest N. Morial Convention Center')
-            # Capitalize first letter
-            if line:
-                line = line[0].upper() + line[1:]
-            return line.strip()
-            # Capitalize first letter
-            if line:
-                line = line[0].upper() + line[1:]
-            return line.strip()
-
-        def parse_budget_category(val):
-            """
-            Parse budget category value into both list and sentence formats.
-            Returns a tuple of (cleaned_list, formatted_sentence)
-            """
-            import re
-            cleaned_list = []
-            formatted_sentence = []
-            
-            def clean_item(item):
-                """Clean a single item by removing brackets and quotes"""
-                item = str(item).strip()
-                # Remove any surrounding brackets, quotes, or parentheses
-                item = re.sub(r'^[\[\]\(\)\{\}\'\"]+', '', item)
-                item = re.sub(r'[\[\]\(\)\{\}\'\"]+$', '', item)
-                return item.strip()
-            
-            def format_sentence(desc, price):
-                """Format budget item as a sentence with proper spacing"""
-                return f"{desc} (${price})" if price else desc
-            
-            if isinstance(val, list):
-                # Clean and group related items
-                for item in val:
-                    item = clean_item(item)
-                    if not item:
-                        continue
-                    cleaned = clean_budget_line(item)
-                    
-                    # Extract price (including /night)
-                    price_match = re.search(r'\$(\d+(?:\.\d{1,2})?/night|\$\d+)', cleaned)
-                    price = price_match.group(0) if price_match else ''
-                    
-                    # Format and add to lists
-                    cleaned_list.append(cleaned)
-                    formatted_sentence.append(format_sentence(cleaned, price))
-            
-            elif isinstance(val, str):
-                # Clean the string first
-                val = clean_item(val)
-                # Split by common delimiters
-                raw_lines = re.split(r'[\n;\,]', val)
-                
-                for line in raw_lines:
-                    line = clean_item(line)
-                    if not line.strip():
-                        continue
-                    
-                    cleaned = clean_budget_line(line)
-                    
-                    # Extract price (including /night)
-                    price_match = re.search(r'\$(\d+(?:\.\d{1,2})?/night|\$\d+)', cleaned)
-                    price = price_match.group(0) if price_match else ''
-                    
-                    # Format and add to lists
-                    cleaned_list.append(cleaned)
-                    formatted_sentence.append(format_sentence(cleaned, price))
-                    cleaned = clean_budget_line(line)
-                    cleaned_list.append(cleaned)
-                    # Format for sentence
-                    if '$' in cleaned:
-                        parts = cleaned.split('$')
-                        if len(parts) == 2:
-                            desc = parts[0].strip()
-                            price = parts[1].strip()
-                            formatted_sentence.append(f"{desc} (${price})")
-                    else:
-                        formatted_sentence.append(cleaned)
-            
-            # Remove duplicates and empty items
-            cleaned_list = list(dict.fromkeys(cleaned_list))
-            formatted_sentence = list(dict.fromkeys(formatted_sentence))
-            
-            # Log the formats
-            print(f"Budget Parsing - List Format: {cleaned_list}")
-            print(f"Budget Parsing - Sentence Format: {formatted_sentence}")
-            
-            # Return both formats
-            return cleaned_list[:12], formatted_sentence[:12]
 
         # Parse and clean budget categories robustly
         accommodation_lines, accommodation_sentence = parse_budget_category(budget.get('accommodation', []))
@@ -1256,7 +1459,6 @@ def download_pdf():
     pdf.drawString(40, y, u"✈ Flight Estimates")
     y -= 18
     from datetime import datetime
-    from .itinerary import get_flight_estimate
     # --- Redesigned Flight Estimates Section ---
     # Match Budget Estimates table size and style
     table_left = 40
@@ -1274,14 +1476,17 @@ def download_pdf():
     pdf.roundRect(table_left, box_y, box_width, box_height, 10, fill=0, stroke=1)
     # Flight price
     # Always use web-supplied flight_estimate if present
-    flight_estimate_raw = request.form.get('flight_estimate', '')
+    flight_estimate_raw = form.get('flight_estimate', '')
     price = "N/A"
     sites = ["Skyscanner", "Kayak", "Expedia"]
     try:
         if flight_estimate_raw:
-            flight_data = json.loads(flight_estimate_raw)
+            flight_data = decode_value(flight_estimate_raw)
             price = flight_data.get('price', 'N/A')
             sites = flight_data.get('sites', ["Skyscanner", "Kayak", "Expedia"])
+        elif departure_city:
+            # The page's estimate hadn't arrived when the form was posted; share the cached one
+            price, sites = get_estimate(departure_city, city_name, start_date[:7])
         else:
             price = "N/A"
     except Exception as e:
@@ -1323,12 +1528,7 @@ def download_pdf():
     y -= 25
 
     # Tips
-    tips_raw = request.form.get('tips', '[]')
-    try:
-        tips = json.loads(tips_raw) if isinstance(tips_raw, str) else tips_raw
-    except Exception:
-        tips = []
-    tips = tips if isinstance(tips, list) else []
+    tips = sections.tips
     pdf.setFont("Helvetica-Bold", 12)
     pdf.setFillColor(accent_color)
     pdf.drawString(50, y, u"💡 Tips:")
@@ -1343,12 +1543,7 @@ def download_pdf():
     y -= 8
 
     # Transport Options
-    transport_raw = request.form.get('transport', '[]')
-    try:
-        transport = json.loads(transport_raw) if isinstance(transport_raw, str) else transport_raw
-    except Exception:
-        transport = []
-    transport = transport if isinstance(transport, list) else []
+    transport = sections.transport
     pdf.setFont("Helvetica-Bold", 12)
     pdf.setFillColor(accent_color)
     pdf.drawString(50, y, u"🚗 Transport Options:")
@@ -1363,12 +1558,7 @@ def download_pdf():
     y -= 8
 
     # Safety & Accessibility
-    tags_raw = request.form.get('tags', '[]')
-    try:
-        tags = json.loads(tags_raw) if isinstance(tags_raw, str) else tags_raw
-    except Exception:
-        tags = []
-    tags = tags if isinstance(tags, list) else []
+    tags = sections.safety
     pdf.setFont("Helvetica-Bold", 12)
     pdf.setFillColor(accent_color)
     pdf.drawString(50, y, u"🦺 Safety & Accessibility:")
@@ -1388,17 +1578,12 @@ def download_pdf():
     pdf.drawString(50, y, u"\U0001F698 Transport Options:")
     y -= 14
     
-    transport_raw = request.form.get('transport', '[]')
-    try:
-        transport = json.loads(transport_raw) if isinstance(transport_raw, str) else transport_raw
-    except Exception:
-        transport = []
+    transport = sections.transport
     
     if isinstance(transport, list) and transport:
         pdf.setFont("Helvetica", 10)
         pdf.setFillColor(text_color)
-        for option in transport[:8]:
-            option_text = clean_section(str(option))
+        for option_text in clean_all(transport[:8]):
             option_lines = wrap_text(option_text, width - 140, 10)
             
             for i, line in enumerate(option_lines[:2]):
@@ -1409,7 +1594,7 @@ def download_pdf():
     y -= 10
     
     # Closing message
-    closing = clean_section(request.form.get('closing', ''))
+    closing = clean_section(form.get('closing', ''))
     if closing:
         pdf.setFont("Helvetica-Bold", 13)
         pdf.setFillColor(accent_color)
@@ -1480,11 +1665,7 @@ def download_pdf():
     pdf.drawCentredString(width // 2, y, u"\U0001F4C5 Your Day-by-Day Itinerary")
     y -= 35
     
-    itinerary_raw = request.form.get('itinerary', '{}')
-    try:
-        itinerary = json.loads(itinerary_raw) if isinstance(itinerary_raw, str) else itinerary_raw
-    except Exception:
-        itinerary = {}
+    itinerary = sections.itinerary
     
     if isinstance(itinerary, dict) and itinerary:
         sorted_days = sorted(itinerary.items(), key=lambda x: int(x[0].split()[-1]) if x[0].startswith('Day') and x[0].split()[-1].isdigit() else 999)
@@ -1517,24 +1698,6 @@ def download_pdf():
                         pdf.drawString(50, y, f"{period.capitalize()}:")
                         y -= 12
                         
-                        # Enhanced cleaning for itinerary activities
-                        def clean_itinerary_activity(text):
-                            if not isinstance(text, str):
-                                return text
-                            import re
-                            text = text.replace('AI', '').replace('ai', '')
-                            text = re.sub(r'\*+', '', text)
-                            text = re.sub(r'#\s*', '', text)
-                            text = re.sub(r'\s+', ' ', text)
-                            text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
-                            text = re.sub(r'([a-z])(\d)', r'\1 \2', text)
-                            text = re.sub(r'(\d)([a-z])', r'\1 \2', text)
-                            text = re.sub(r'([a-z])\s+([a-z]{1,2})\s+([a-z])', lambda m: m.group(1) + m.group(2) + m.group(3) if len(m.group(2)) <= 2 else m.group(0), text)
-                            text = re.sub(r'([\.,;:!?])([A-Za-z])', r'\1 \2', text)  # Ensure space after punctuation
-                            text = re.sub(r'([a-zA-Z])([\.,;:!?])', r'\1\2', text)  # Remove space before punctuation
-                            text = re.sub(r'\s+([\.,;:!?])', r'\1', text)  # Remove space before punctuation
-                            text = text.strip()
-                            return text
                         activity_text = clean_itinerary_activity(str(schedule[period]))
                         activity_lines = wrap_text(activity_text, width - 140, 10)
                         
@@ -1558,7 +1721,7 @@ def download_pdf():
         y -= 20
     
     # Final Note
-    killer_note = request.form.get('killer_note', '').replace('{{ city_info.name }}', city_name)
+    killer_note = form.get('killer_note', '').replace('{{ city_info.name }}', city_name)
     if killer_note:
         if y < 120:
             pdf.showPage()
@@ -1586,10 +1749,10 @@ def download_pdf():
         y = height - 40
     
     # --- Add user prompt to cover page (before showPage) ---
-    if request.form.get('trip_description', ''):
+    if form.get('trip_description', ''):
         pdf.setFont("Helvetica-Oblique", 11)
         pdf.setFillColor(secondary_text)
-        prompt_text = request.form['trip_description']
+        prompt_text = form['trip_description']
         prompt_lines = wrap_text(prompt_text, width - 120, 11)
         y_prompt = 70  # Lower section of cover page
         for line in prompt_lines:
@@ -1619,5 +1782,61 @@ def download_pdf():
         pdf.drawString(60, current_y, line)
         current_y -= 14
     pdf.save()
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name="taste_trip_itinerary.pdf", mimetype='application/pdf')
\ No newline at end of file
+    return buffer.getvalue()
+
+
+def _job_submitted(job):
+    return {'job_id': job.id, 'status': job.status, 'status_url': url_for('main.job_status', job_id=job.id),
+            'result_url': url_for('main.job_result', job_id=job.id)}, 202
+
+def _queue_full(error):
+    return {'error': str(error)}, 503, {'Retry-After': '10'}
+
+@main.route('/jobs/itinerary', methods=['POST'])
+def submit_itinerary_job():
+    """Queue /itinerary for a background worker; poll the returned status_url. A repeat of the
+    same form (double click, retry) gets the job already queued for it."""
+    try:
+        key = request_key('itinerary', request.form, request.headers.get(IDEMPOTENCY_HEADER))
+        job = ITINERARY_JOBS.submit_once(key, itinerary_context, request.form.to_dict(), keep=complete_page)
+    except JobQueueFull as e:
+        return _queue_full(e)
+    return _job_submitted(job)
+
+@main.route('/jobs/pdf', methods=['POST'])
+def submit_pdf_job():
+    """Queue /download_pdf for a worker process; poll the returned status_url. Repeats share a job."""
+    form = pdf_form(request.form)
+    if form is None:
+        return _unknown_trip()
+    try:
+        key = request_key('pdf', request.form, request.headers.get(IDEMPOTENCY_HEADER))
+        job = PDF_JOBS.submit_once(key, render_pdf, form)
+    except JobQueueFull as e:
+        return _queue_full(e)
+    return _job_submitted(job)
+
+@main.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return {'error': 'Unknown or expired job'}, 404
+    return job.to_dict()
+
+@main.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """The finished page or PDF; 202 with the status while the job is still going."""
+    job = get_job(job_id)
+    if job is None:
+        return {'error': 'Unknown or expired job'}, 404
+    if job.status == 'failed':
+        return job.to_dict(), 500
+    if job.status != 'done':
+        return job.to_dict(), 202
+    if job.kind == 'pdf':
+        return send_file(io.BytesIO(job.result), as_attachment=True, download_name="taste_trip_itinerary.pdf", mimetype='application/pdf')
+    return render_template("itinerary.html", **job.result)
+
+@main.route('/job_stats')
+def job_stats():
+    return {'itinerary': ITINERARY_JOBS.stats(), 'pdf': PDF_JOBS.stats()}
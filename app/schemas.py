@@ -0,0 +1,156 @@
+# app/schemas.py
+import json
+import re
+from typing import Any, Dict, List, Union
+import jiter
+from pydantic import BaseModel, field_validator
+
+# The itinerary payload the model is asked for, parsed with jiter and validated once with
+# pydantic. Completions cut off by max_tokens are parsed in partial mode, so a long trip
+# keeps every day and section that arrived complete instead of degrading to raw text.
+
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+# Values may arrive JSON-encoded, occasionally more than once
+_MAX_DECODES = 3
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _json_slice(content):
+    """The JSON text of a completion: fenced block or from the first '{' on, minus control characters."""
+    content = content.strip()
+    if content.startswith('```'):
+        content = content.split('\n', 1)[1] if '\n' in content else content.strip('`')
+        content = content.split('```')[0]
+    start = content.find('{')
+    if start > 0:
+        content = content[start:]
+    return _CONTROL_CHARS_RE.sub('', content).strip()
+
+
+def parse_completion(content):
+    """
+    (data, complete) for the JSON object in a completion. `complete` is False when the
+    object had to be salvaged from truncated output; raises ValueError if there is none.
+    """
+    text = _json_slice(content)
+    try:
+        data, complete = jiter.from_json(text.encode('utf-8')), True
+    except ValueError:
+        try:
+            # Complete object followed by commentary: the object ends where the decoder stops
+            data, complete = _JSON_DECODER.raw_decode(text)[0], True
+        except ValueError:
+            try:
+                data, complete = jiter.from_json(text.encode('utf-8'), partial_mode=True), False
+            except ValueError:
+                end = text.rfind('}')
+                if end < 0:
+                    raise
+                data, complete = jiter.from_json(text[:end + 1].encode('utf-8'), partial_mode=True), False
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    return data, complete
+
+
+def decode_value(value):
+    """A value that may be a JSON-encoded string, decoded; text that isn't JSON is returned as is."""
+    for _ in range(_MAX_DECODES):
+        if not isinstance(value, str):
+            break
+        text = value.strip()
+        if not text or text[0] not in '{["':
+            break
+        try:
+            value = jiter.from_json(text.encode('utf-8'))
+        except ValueError:
+            break
+    return value
+
+
+def _text_list(value):
+    value = decode_value(value)
+    if isinstance(value, list):
+        return [item if isinstance(item, str) else str(item) for item in value if item not in (None, '')]
+    if isinstance(value, dict):
+        return [f"{key}: {item}" for key, item in value.items()]
+    if value in (None, ''):
+        return []
+    return [str(value)]
+
+
+class TripSections(BaseModel):
+    """Validated itinerary payload: the sections the itinerary page and the PDF render."""
+
+    packing: Union[Dict[str, List[str]], List[str]] = {}
+    tips: List[str] = []
+    local_info: Any = None
+    budget: Dict[str, Any] = {}
+    transport: List[str] = []
+    safety: List[str] = []
+    closing: str = ''
+    itinerary: Dict[str, Union[Dict[str, str], str]] = {}
+
+    @field_validator('packing', mode='before')
+    @classmethod
+    def _packing(cls, value):
+        value = decode_value(value)
+        if isinstance(value, dict):
+            return {str(category): _text_list(items) for category, items in value.items()}
+        if isinstance(value, list):
+            return _text_list(value)
+        # Plain text (e.g. an error) goes under Other
+        return {'Other': [str(value)]} if value not in (None, '') else {}
+
+    @field_validator('tips', 'transport', 'safety', mode='before')
+    @classmethod
+    def _lists(cls, value):
+        return _text_list(value)
+
+    @field_validator('budget', mode='before')
+    @classmethod
+    def _budget(cls, value):
+        value = decode_value(value)
+        return value if isinstance(value, dict) else {}
+
+    @field_validator('closing', mode='before')
+    @classmethod
+    def _closing(cls, value):
+        value = decode_value(value)
+        return '' if value is None else str(value)
+
+    @field_validator('itinerary', mode='before')
+    @classmethod
+    def _itinerary(cls, value):
+        value = decode_value(value)
+        if isinstance(value, dict) and set(value.keys()) == {'itinerary'}:
+            value = decode_value(value['itinerary'])
+        if isinstance(value, list):
+            value = {f"Day {i+1}": day for i, day in enumerate(value)}
+        if not isinstance(value, dict):
+            return {}
+        days = {}
+        for name, schedule in value.items():
+            schedule = decode_value(schedule)
+            if isinstance(schedule, dict):
+                days[str(name)] = {str(period): str(activity) for period, activity in schedule.items() if activity is not None}
+            elif schedule is not None:
+                days[str(name)] = str(schedule)
+        return days
+
+    @classmethod
+    def from_sections(cls, sections):
+        """Validate a sections dict (from generate_itinerary_and_sections or its fallback)."""
+        return cls.model_validate(sections if isinstance(sections, dict) else {})
+
+    @classmethod
+    def from_form(cls, form):
+        """Validate the JSON hidden fields the itinerary page posts to /download_pdf."""
+        return cls.model_validate({
+            'packing': form.get('packing_list', '{}'),
+            'tips': form.get('tips', '[]'),
+            'budget': form.get('budget', '{}'),
+            'transport': form.get('transport', '[]'),
+            'safety': form.get('tags', '[]'),
+            'closing': form.get('closing', ''),
+            'itinerary': form.get('itinerary', '{}'),
+        })
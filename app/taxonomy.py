@@ -0,0 +1,69 @@
+# app/taxonomy.py
+import json
+import os
+from .matching import KeywordMatcher
+
+# Keyword taxonomies for venues, venue cultural paths and packing items, loaded from
+# data/taxonomy.json. Each taxonomy's keywords are compiled once into a single trie; an item
+# belongs to the first category (in file order) with a keyword in it, else to the default.
+TAXONOMY_FILE = os.getenv("TAXONOMY_FILE", os.path.join(os.path.dirname(__file__), "data", "taxonomy.json"))
+
+
+class Taxonomy:
+    """Ordered keyword categories with a fallback, classifying items by substring match."""
+
+    def __init__(self, categories, default):
+        self.categories = list(categories)
+        self.default = default
+        self._matcher = KeywordMatcher(self.categories)
+
+    def names(self):
+        return [category['name'] for category in self.categories] + [self.default['name']]
+
+    def category(self, item):
+        """The category dict (name plus any extra fields from the data file) for one item."""
+        return self._matcher.first(str(item)) or self.default
+
+    def classify(self, items):
+        """Category name for each item, in order."""
+        return [self.category(item)['name'] for item in items]
+
+    def group(self, items):
+        """{category name: [items]} for every category, in taxonomy order."""
+        groups = {name: [] for name in self.names()}
+        for item, name in zip(items, self.classify(items)):
+            groups[name].append(item)
+        return groups
+
+
+def load_taxonomies(path=TAXONOMY_FILE):
+    """{name: Taxonomy} from a taxonomy data file."""
+    with open(path, encoding='utf-8') as f:
+        table = json.load(f)
+    return {name: Taxonomy(spec['categories'], spec['default']) for name, spec in table.items()}
+
+
+_taxonomies = load_taxonomies()
+VENUES = _taxonomies['venue']
+VENUE_PATHS = _taxonomies['venue_path']
+PACKING = _taxonomies['packing']
+
+
+def group_venues(venues):
+    """(music, food, film, additional) venue lists."""
+    groups = VENUES.group(venues)
+    return groups['music'], groups['food'], groups['film'], groups['additional']
+
+
+def cultural_paths(venues, music, movie, food, limit=6):
+    """[{'venue', 'cultural_path'}] for up to `limit` venues, the path chosen by venue type."""
+    return [
+        {'venue': venue, 'cultural_path': VENUE_PATHS.category(venue)['path'].format(
+            music=music, movie=movie, food=food, venue=venue)}
+        for venue in venues[:limit]
+    ]
+
+
+def categorize_packing(items):
+    """{category: [items]} for a flat packing list, leaving out empty categories."""
+    return {name: group for name, group in PACKING.group(items).items() if group}
@@ -0,0 +1,165 @@
+# app/text_cleaning.py
+import re
+
+# Text normalization for AI-generated sections (PDF and itinerary page). Every pattern is
+# compiled once here; typo fixes are one alternation with a dict lookup instead of a
+# str.replace per entry, and passes that commute are merged. Outputs match the per-request
+# functions these replace (see benchmarks/text_cleaning.py), except for typos that overlap
+# each other: one pass fixes the leftmost, where the chained replaces could fix both.
+
+# Common word parsing errors in model output
+TYPO_FIXES = {
+    'rncoat': 'raincoat', 'rn ': 'rain ', 'ecnomy': 'economy', 'ecnomic': 'economic',
+    'trvl': 'travel', 'trvel': 'travel', 'accomodation': 'accommodation',
+    'restarant': 'restaurant', 'resturant': 'restaurant', 'transprt': 'transport',
+    'airprt': 'airport', 'htl': 'hotel', 'bkng': 'booking', 'flght': 'flight'
+}
+# The lighter set used on the itinerary page
+PAGE_TYPO_FIXES = {wrong: TYPO_FIXES[wrong] for wrong in [
+    'rncoat', 'rn ', 'ecnomy', 'ecnomic', 'trvl', 'trvel', 'accomodation', 'restarant', 'resturant', 'transprt'
+]}
+
+# Budget lines drop these, in this order (earlier removals can expose later ones)
+BUDGET_FILLER_PHRASES = [
+    'cost for', 'expecttospend', 'expect to spend', 'around', 'approximately', 'per activities', 'per activity',
+    'per meals', 'per meal', 'per day for meals', 'per day on', 'per day', 'per activities', 'per activity',
+    'per person', 'for', ':', ' - ', '--', '  '
+]
+# Venue names the model tends to lowercase
+BUDGET_PROPER_NAMES = [
+    ('cafe du monde', 'Cafe du Monde'),
+    ('beignet cafe', 'Beignet Cafe'),
+    ('morial convention center', 'Ernest N. Morial Convention Center'),
+]
+
+
+def typo_pattern(fixes):
+    """One regex matching any key of `fixes`, longest keys tried first."""
+    return re.compile('|'.join(re.escape(wrong) for wrong in sorted(fixes, key=len, reverse=True)))
+
+
+_TYPO_RE = typo_pattern(TYPO_FIXES)
+_PAGE_TYPO_RE = typo_pattern(PAGE_TYPO_FIXES)
+
+# '*' runs go first in the original passes, so a '#' also eats any stars among its trailing spaces
+_MARKDOWN_RE = re.compile(r'#[\s*]*|\*+')
+_TRANSLATION_PAIR_RE = re.compile(r'"[^"]"\s,\s*[^"]"[^"]"')
+_TRANSLATION_RE = re.compile(r'The English translation of "[^"]" is "([^"])"\.?')
+_QUOTED_NAME_RE = re.compile(r'"([^"])",\s[^"]"[^"]"')
+_QUOTED_SENTENCE_RE = re.compile(r'"([^"]*)"\.')
+_SPACES_RE = re.compile(r'\s+')
+# camelCase, letter+number and number+letter boundaries all get a space in one pass
+_WORD_BOUNDARY_RE = re.compile(r'[a-z](?=[A-Z\d])|\d(?=[a-z])')
+_BROKEN_WORD_RE = re.compile(r'([a-z])\s+([a-z]{1,3})\s+([a-z])')
+_BROKEN_SHORT_WORD_RE = re.compile(r'([a-z])\s+([a-z]{1,2})\s+([a-z])')
+_BULLET_RE = re.compile(r'\s*•\s*')
+_SPACE_AFTER_PUNCT_RE = re.compile(r'([\.,;:!?])([A-Za-z])')
+_SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([\.,;:!?])')
+_EDGE_MARKS_RE = re.compile(r'^[\[\]\(\)\{\}\'\"]+|[\[\]\(\)\{\}\'\"]+$')
+_EDGE_COMMAS_RE = re.compile(r"^[,\s]+|[,\s]+$")
+_PRICE_RE = re.compile(r'\$(\d+(?:\.\d{1,2})?/night|\$\d+)')
+
+
+def _fix_typos(text, pattern=_TYPO_RE, fixes=TYPO_FIXES):
+    return pattern.sub(lambda m: fixes[m.group(0)], text)
+
+
+# Callbacks rather than r'\1 \2' templates: on CPython they are cheaper per match
+
+def _join_broken_word(m):
+    return m.group(1) + m.group(2) + m.group(3) if len(m.group(2)) <= 2 else m.group(0)
+
+
+def _space_after(m):
+    return m.group() + ' '
+
+
+def _space_after_punct(m):
+    return m.group(1) + ' ' + m.group(2)
+
+
+def _space_words(text):
+    text = _SPACES_RE.sub(' ', text)
+    return _WORD_BOUNDARY_RE.sub(_space_after, text)
+
+
+def clean_section(text):
+    """PDF body text: strip markdown, 'AI' markers and translation artifacts, fix typos and spacing."""
+    if not isinstance(text, str):
+        return text
+    # Remove asterisks, markdown headers, and 'AI' markers
+    text = _MARKDOWN_RE.sub('', text)
+    text = text.replace('AI', '').replace('ai', '')
+    # Remove AI translation artifacts
+    text = _TRANSLATION_PAIR_RE.sub('', text)
+    text = _TRANSLATION_RE.sub(r'\1', text)
+    text = _QUOTED_NAME_RE.sub(r'\1', text)
+    text = _QUOTED_SENTENCE_RE.sub(r'\1', text)
+    text = _fix_typos(text)
+    text = _space_words(text)
+    # Fix broken words at line boundaries
+    text = _BROKEN_WORD_RE.sub(_join_broken_word, text)
+
+    # Handle budget data specifically
+    if 'Budget Estimates' in text:
+        cleaned_sections = []
+        for section in text.split('Budget Estimates'):
+            section = section.strip()
+            if not section:
+                continue
+            section = _BULLET_RE.sub('• ', section.replace('\\', ''))
+            cleaned_sections.append(section)
+        text = 'Budget Estimates'.join(cleaned_sections)
+
+    return text.strip()
+
+
+def clean_itinerary_activity(text):
+    """One morning/afternoon/evening activity in the PDF itinerary."""
+    if not isinstance(text, str):
+        return text
+    text = text.replace('AI', '').replace('ai', '')
+    text = _MARKDOWN_RE.sub('', text)
+    text = _space_words(text)
+    text = _BROKEN_SHORT_WORD_RE.sub(_join_broken_word, text)
+    text = _SPACE_AFTER_PUNCT_RE.sub(_space_after_punct, text)  # Ensure space after punctuation
+    text = _SPACE_BEFORE_PUNCT_RE.sub(lambda m: m.group(1), text)  # Remove space before punctuation
+    return text.strip()
+
+
+def clean_text_content(text):
+    """Lighter cleaning for text shown on the itinerary page."""
+    if not isinstance(text, str):
+        return str(text)
+    text = _fix_typos(text, _PAGE_TYPO_RE, PAGE_TYPO_FIXES)
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+def clean_budget_line(line):
+    """
+    Clean a single budget line: remove brackets, quotes, and extraneous marks, and apply phrase cleaning.
+    Also formats the line into a more readable format.
+    """
+    line = _EDGE_MARKS_RE.sub('', line.strip())
+    line = _EDGE_COMMAS_RE.sub('', line)
+    for phrase in BUDGET_FILLER_PHRASES:
+        line = line.replace(phrase, '')
+    line = ' '.join(line.split())
+    # Format price with proper currency symbol and spacing
+    price_match = _PRICE_RE.search(line)
+    if price_match:
+        price = price_match.group(0)
+        desc = line.replace(price, '').strip()
+        line = f"{desc} {price}"
+    for lower, proper in BUDGET_PROPER_NAMES:
+        if lower in line.lower():
+            line = line.replace(lower, proper)
+    # Capitalize first letter
+    if line:
+        line = line[0].upper() + line[1:]
+    return line.strip()
+
+
+def clean_all(texts, cleaner=clean_section):
+    """Clean a list of values with one cleaner, converting non-strings with str() first."""
+    return [cleaner(text if isinstance(text, str) else str(text)) for text in texts]
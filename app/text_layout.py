@@ -0,0 +1,102 @@
+# app/text_layout.py
+import os
+from functools import lru_cache
+from reportlab.pdfbase import pdfmetrics
+
+# Line wrapping for the PDF renderer. Widths are kept in integer font units (1/1000 em) and
+# scaled exactly the way reportlab's stringWidth does, so a line fits here iff it fits there.
+TEXT_LAYOUT_CACHE_SIZE = int(os.getenv("TEXT_LAYOUT_CACHE_SIZE", "8192"))
+
+# font name -> {char: width in font units}; Latin-1 is filled up front, anything else on first use
+_width_tables = {}
+
+
+def _glyph_units(char, font_name):
+    return round(pdfmetrics.stringWidth(char, font_name, 1000))
+
+
+def width_table(font_name):
+    """Glyph width table for a registered font, built on first use."""
+    table = _width_tables.get(font_name)
+    if table is None:
+        table = {chr(code): _glyph_units(chr(code), font_name) for code in range(32, 256)}
+        _width_tables[font_name] = table
+    return table
+
+
+def text_units(text, font_name="Helvetica"):
+    """Width of `text` in font units."""
+    table = width_table(font_name)
+    total = 0
+    for char in text:
+        units = table.get(char)
+        if units is None:
+            units = table[char] = _glyph_units(char, font_name)
+        total += units
+    return total
+
+
+def string_width(text, font_name="Helvetica", font_size=11):
+    """Same value as pdf.stringWidth(text, font_name, font_size), without touching the canvas."""
+    return text_units(text, font_name) * 0.001 * font_size
+
+
+def _split_long_word(word, table, fits):
+    """Break a word wider than the line into pieces that fit, at least one character each."""
+    pieces = []
+    start = 0
+    units = 0
+    for i, char in enumerate(word):
+        char_units = table[char]
+        if i > start and not fits(units + char_units):
+            pieces.append(word[start:i])
+            start = i
+            units = 0
+        units += char_units
+    pieces.append(word[start:])
+    return pieces
+
+
+@lru_cache(maxsize=TEXT_LAYOUT_CACHE_SIZE)
+def _wrap(text, max_width, font_size, font_name):
+    text_units(text, font_name)  # make sure every glyph is in the table
+    table = _width_tables[font_name]
+
+    def fits(units):
+        return units * 0.001 * font_size <= max_width
+
+    space_units = table[' ']
+    lines = []
+    current = []
+    current_units = 0
+    for word in text.split():
+        word_units = sum(table[char] for char in word)
+        if not fits(word_units):
+            # Long words go on lines of their own, like the renderer always did
+            if current:
+                lines.append(' '.join(current))
+                current, current_units = [], 0
+            lines.extend(_split_long_word(word, table, fits))
+        elif not current:
+            current, current_units = [word], word_units
+        elif fits(current_units + space_units + word_units):
+            current.append(word)
+            current_units += space_units + word_units
+        else:
+            lines.append(' '.join(current))
+            current, current_units = [word], word_units
+    if current:
+        lines.append(' '.join(current))
+    return tuple(lines)
+
+
+def wrap_text(text, max_width, font_size=11, font_name="Helvetica"):
+    """
+    Greedy word wrap of `text` into lines no wider than `max_width` points, in linear time.
+    Results for repeated (text, width, size, font) are memoized.
+    """
+    return list(_wrap(str(text), max_width, font_size, font_name))
+
+
+def cache_info():
+    return _wrap.cache_info()
@@ -0,0 +1,95 @@
+# app/trip_store.py
+import itertools
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+import zlib
+from .cache import TTLCache
+
+# Finished trips (the itinerary page context) kept server-side under a random id, so the PDF,
+# QR and re-render endpoints can look a trip up instead of having every field posted back.
+# Records are zlib-compressed JSON files, one per trip, shared by every worker process, with
+# a small in-memory cache in front for the downloads that follow a page view.
+TRIP_STORE_DIR = os.getenv("TRIP_STORE_DIR", os.path.join(tempfile.gettempdir(), "tastetrip_trips"))
+TRIP_STORE_TTL = int(os.getenv("TRIP_STORE_TTL", str(7 * 24 * 3600)))
+TRIP_COMPRESSION_LEVEL = int(os.getenv("TRIP_COMPRESSION_LEVEL", "6"))
+# Expired files nobody asks for again are swept every this many saves
+TRIP_PURGE_EVERY = int(os.getenv("TRIP_PURGE_EVERY", "200"))
+
+_TRIP_ID_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+_recent = TTLCache(
+    'trips',
+    ttl=min(TRIP_STORE_TTL, 3600),
+    max_entries=int(os.getenv("TRIP_CACHE_MAX_ENTRIES", "256")),
+)
+
+_saves = itertools.count()
+
+
+def _path(trip_id):
+    return os.path.join(TRIP_STORE_DIR, trip_id[:2], f"{trip_id}.json.z")
+
+
+def encode(trip):
+    return zlib.compress(json.dumps(trip, ensure_ascii=False, default=str).encode('utf-8'), TRIP_COMPRESSION_LEVEL)
+
+
+def decode(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def save(trip):
+    """Store a trip and return its id."""
+    trip_id = secrets.token_urlsafe(16)
+    data = encode(trip)
+    path = _path(trip_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    _recent.set(trip_id, trip)
+    if next(_saves) % TRIP_PURGE_EVERY == TRIP_PURGE_EVERY - 1:
+        purge_expired()
+    print(f"[Trips] Stored {trip_id} ({len(data)} bytes compressed)")
+    return trip_id
+
+
+def load(trip_id):
+    """The stored trip, or None if the id is unknown, malformed or expired."""
+    if not trip_id or not _TRIP_ID_RE.match(trip_id):
+        return None
+    found, trip = _recent.lookup(trip_id)
+    if found:
+        return trip
+    path = _path(trip_id)
+    try:
+        if time.time() - os.path.getmtime(path) > TRIP_STORE_TTL:
+            os.remove(path)
+            return None
+        with open(path, 'rb') as f:
+            trip = decode(f.read())
+    except (OSError, ValueError, zlib.error):
+        return None
+    _recent.set(trip_id, trip)
+    return trip
+
+
+def purge_expired():
+    """Delete trips older than TRIP_STORE_TTL; returns how many were removed."""
+    removed = 0
+    cutoff = time.time() - TRIP_STORE_TTL
+    for root, _, files in os.walk(TRIP_STORE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
@@ -1,6 +1,6 @@
 # app/unsplash_api.py
 import os
-import requests
+from . import http_client
 
 def get_image(query):
     # STEP: Unsplash API → city image
@@ -11,7 +11,7 @@ def get_image(query):
     url = f"https://api.unsplash.com/photos/random?query={query}&client_id={access_key}&orientation=landscape"
 
     try:
-        response = requests.get(url)
+        response = http_client.get('unsplash', url)
         print(f"Unsplash API response status: {response.status_code}")
         if response.status_code == 200:
             image_url = response.json()["urls"]["regular"]
@@ -21,3 +21,32 @@ def get_image(query):
         print(f"Unsplash API error: {e}")
 
     return "/static/images/logo.png"
+
+def get_image_batch(query, count=5):
+    """
+    Fetch up to `count` random landscape photos for `query` in one call.
+    Returns a list of dicts with 'id', 'url' (regular size) and 'credit'; empty on failure.
+    """
+    access_key = os.getenv("UNSPLASH_ACCESS_KEY")
+    url = "https://api.unsplash.com/photos/random"
+    params = {"query": query, "client_id": access_key, "orientation": "landscape", "count": count}
+
+    try:
+        response = http_client.get('unsplash', url, params=params)
+        print(f"Unsplash API batch response status: {response.status_code}")
+        if response.status_code == 200:
+            photos = response.json()
+            if isinstance(photos, dict):
+                photos = [photos]
+            return [
+                {
+                    "id": photo.get("id"),
+                    "url": photo["urls"]["regular"],
+                    "credit": (photo.get("user") or {}).get("name", ""),
+                }
+                for photo in photos if photo.get("urls", {}).get("regular")
+            ]
+    except Exception as e:
+        print(f"Unsplash API error: {e}")
+
+    return []
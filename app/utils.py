@@ -1,4 +1,26 @@
 # app/utils.py
+import os
+
+
+def env_settings(prefix, defaults, int_keys=()):
+    """
+    A copy of `defaults` with overrides from <prefix><KEY> environment variables. Text
+    settings stay text, `int_keys` are whole numbers, everything else is read as a float
+    (so HTTP_QLOO_READ_TIMEOUT=7.5 works although the default is 10).
+    """
+    settings = dict(defaults)
+    for key, value in settings.items():
+        override = os.getenv(prefix + key.upper())
+        if override is None:
+            continue
+        if isinstance(value, str):
+            settings[key] = override
+        elif key in int_keys:
+            settings[key] = int(override)
+        else:
+            settings[key] = float(override)
+    return settings
+
 
 def clean_text(text):
     return text.strip().replace('\n\n', '\n')
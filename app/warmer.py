@@ -0,0 +1,112 @@
+# app/warmer.py
+import collections
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .cache import refresh_ahead
+from .destinations import catalog_cities
+
+# Background cache warmer. Every WARM_INTERVAL_SECONDS it fetches Qloo venues, Unsplash photos
+# and the weather forecast for the catalog destinations (data/destinations.json and the Qloo
+# inference targets), the WARM_CITIES list and the WARM_TOP_N cities trips here have landed on
+# most. Entries that would expire before the next round are refreshed early, so the common
+# path reads warm caches instead of waiting on a cold upstream.
+WARM_ENABLED = os.getenv("WARM_ENABLED", "1") == "1"
+WARM_INTERVAL_SECONDS = int(os.getenv("WARM_INTERVAL_SECONDS", str(2 * 3600)))
+# Let the app finish starting (and serve its first requests) before the first round
+WARM_STARTUP_DELAY = float(os.getenv("WARM_STARTUP_DELAY", "5"))
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "10"))
+WARM_CITIES = [city.strip() for city in os.getenv("WARM_CITIES", "").split(',') if city.strip()]
+# Kept small so warming never competes with live requests for the upstream rate limits
+WARM_MAX_WORKERS = int(os.getenv("WARM_MAX_WORKERS", "2"))
+
+_popular = collections.Counter()
+_popular_lock = threading.Lock()
+_started = False
+_started_lock = threading.Lock()
+_last_run = {}
+
+
+def note_destination(city):
+    """Count a trip to `city`, so the most popular ones are warmed too."""
+    if city:
+        with _popular_lock:
+            _popular[city] += 1
+
+
+def warm_targets():
+    """[(city, country)] to warm: catalog, configured cities, then the most visited."""
+    targets = list(catalog_cities())
+    seen = {city for city, _ in targets}
+    with _popular_lock:
+        popular = [city for city, _ in _popular.most_common(WARM_TOP_N)]
+    for city in WARM_CITIES + popular:
+        if city not in seen:
+            seen.add(city)
+            targets.append((city, None))
+    return targets
+
+
+def warm_city(city, country=None):
+    """Fill the venue, image and weather caches for one city."""
+    from .image_store import city_images
+    from .qloo_api import get_venues_for_city
+    from .weather_api import get_weather_forecast
+
+    get_venues_for_city(city, country)
+    if os.getenv("UNSPLASH_ACCESS_KEY"):
+        city_images(city)
+    get_weather_forecast(city, days=7)
+
+
+def _warm_one(target):
+    city, country = target
+    try:
+        with refresh_ahead(WARM_INTERVAL_SECONDS * 1.5):
+            warm_city(city, country)
+        return True
+    except Exception as e:
+        print(f"[Warmer] Could not warm {city}: {e}")
+        return False
+
+
+def warm_all():
+    """One warming round over every target; returns how many cities were warmed."""
+    started = time.perf_counter()
+    targets = warm_targets()
+    with ThreadPoolExecutor(max_workers=WARM_MAX_WORKERS, thread_name_prefix="cache-warmer") as pool:
+        warmed = sum(pool.map(_warm_one, targets))
+    _last_run.update(finished_at=time.time(), cities=len(targets), warmed=warmed,
+                     duration_s=round(time.perf_counter() - started, 1))
+    print(f"[Warmer] Warmed {warmed}/{len(targets)} cities in {_last_run['duration_s']}s")
+    return warmed
+
+
+def _run_forever():
+    time.sleep(WARM_STARTUP_DELAY)
+    while True:
+        try:
+            warm_all()
+        except Exception as e:
+            print(f"[Warmer] Round failed: {e}")
+        time.sleep(WARM_INTERVAL_SECONDS)
+
+
+def start_warmer():
+    """Start the warming thread once per process (no-op if WARM_ENABLED=0)."""
+    global _started
+    if not WARM_ENABLED:
+        return False
+    with _started_lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_run_forever, name="cache-warmer", daemon=True).start()
+    return True
+
+
+def get_warmer_stats():
+    with _popular_lock:
+        popular = dict(_popular.most_common(WARM_TOP_N))
+    return {'enabled': WARM_ENABLED, 'started': _started, 'last_run': dict(_last_run), 'popular': popular}
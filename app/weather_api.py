@@ -1,36 +1,101 @@
 import os
-import requests
+from . import async_client, http_client
+from .cache import TTLCache, normalize_key_part
+
+# The 5-day/3-hour forecast for a city changes slowly, so one response serves every trip to
+# that city for a while (and the warmer keeps the usual destinations here). Cities the API
+# doesn't know (404) are remembered briefly; rate limiting, server and network errors aren't
+# cached. An expired forecast is
+# served for up to WEATHER_CACHE_STALE_TTL more while a fresh one is fetched in the background.
+_forecast_cache = TTLCache(
+    'weather_forecast',
+    ttl=int(os.getenv("WEATHER_CACHE_TTL", "1800")),
+    max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "512")),
+    negative_ttl=int(os.getenv("WEATHER_CACHE_NEGATIVE_TTL", "300")),
+    stale_ttl=int(os.getenv("WEATHER_CACHE_STALE_TTL", str(6 * 3600))),
+)
+
+def _forecast_url(city_name, api_key):
+    return f"https://api.openweathermap.org/data/2.5/forecast?q={city_name}&units=metric&appid={api_key}"
+
+def _cached_forecast(city_name, api_key, days):
+    """(found, daily forecast) from the cache."""
+    found, data = _forecast_cache.lookup(
+        normalize_key_part(city_name), refresh=lambda: _refresh_forecast(city_name, api_key))
+    if not found:
+        return False, None
+    return True, daily_forecast(data, days) if data else []
+
+def _refresh_forecast(city_name, api_key):
+    """Fetch a stale city's forecast in the background; the stale one stays if this fails."""
+    resp = http_client.get('openweather', _forecast_url(city_name, api_key))
+    if resp.status_code != 200:
+        raise RuntimeError(f"OpenWeather returned status {resp.status_code}")
+    _store_forecast(city_name, resp, 1)
+
+def _store_forecast(city_name, resp, days):
+    key = normalize_key_part(city_name)
+    if resp.status_code == 404:
+        _forecast_cache.set_negative(key, None)
+        return []
+    if resp.status_code != 200:
+        print(f"[Weather] OpenWeather returned status {resp.status_code} for {city_name}")
+        return []
+    data = resp.json()
+    forecast = daily_forecast(data, days)
+    _forecast_cache.set(key, data)
+    print(f"[Weather] Fetched {len(data.get('list', []))} forecast entries for {city_name}")
+    return forecast
 
 def get_weather_forecast(city_name, api_key=None, days=3):
     """Get daily weather forecast for a city using OpenWeatherMap."""
     api_key = api_key or os.getenv('OPENWEATHER_API_KEY')
     if not api_key:
         return []
-    url = f"https://api.openweathermap.org/data/2.5/forecast?q={city_name}&units=metric&appid={api_key}"
+    found, forecast = _cached_forecast(city_name, api_key, days)
+    if found:
+        return forecast
+    url = _forecast_url(city_name, api_key)
+    try:
+        resp = http_client.get('openweather', url, hedge=True)
+        return _store_forecast(city_name, resp, days)
+    except Exception as e:
+        print(f"Weather API error: {e}")
+        return []
+
+async def get_weather_forecast_async(city_name, api_key=None, days=3):
+    """get_weather_forecast on the shared async client."""
+    api_key = api_key or os.getenv('OPENWEATHER_API_KEY')
+    if not api_key:
+        return []
+    found, forecast = _cached_forecast(city_name, api_key, days)
+    if found:
+        return forecast
+    url = _forecast_url(city_name, api_key)
     try:
-        resp = requests.get(url)
-        if resp.status_code != 200:
-            return []
-        data = resp.json()
-        print("[DEBUG] OpenWeatherMap raw data:", data)
-        # Group by day
-        forecasts = {}
-        for entry in data['list']:
-            date = entry['dt_txt'].split(' ')[0]
-            if date not in forecasts:
-                forecasts[date] = []
-            forecasts[date].append(entry)
-        # Take the midday forecast for each day
-        daily = []
-        for i, (date, entries) in enumerate(forecasts.items()):
-            if i >= days:
-                break
-            # Pick the forecast closest to 12:00
-            midday = min(entries, key=lambda e: abs(int(e['dt_txt'].split(' ')[1][:2]) - 12))
-            desc = midday['weather'][0]['main']
-            temp = round(midday['main']['temp'])
-            daily.append({'date': date, 'desc': desc, 'temp': temp})
-        return daily
+        resp = await async_client.get('openweather', url, hedge=True)
+        return _store_forecast(city_name, resp, days)
     except Exception as e:
         print(f"Weather API error: {e}")
         return []
+
+def daily_forecast(data, days):
+    """Reduce an OpenWeatherMap 5-day/3-hour forecast to one midday entry per day."""
+    # Group by day
+    forecasts = {}
+    for entry in data['list']:
+        date = entry['dt_txt'].split(' ')[0]
+        if date not in forecasts:
+            forecasts[date] = []
+        forecasts[date].append(entry)
+    # Take the midday forecast for each day
+    daily = []
+    for i, (date, entries) in enumerate(forecasts.items()):
+        if i >= days:
+            break
+        # Pick the forecast closest to 12:00
+        midday = min(entries, key=lambda e: abs(int(e['dt_txt'].split(' ')[1][:2]) - 12))
+        desc = midday['weather'][0]['main']
+        temp = round(midday['main']['temp'])
+        daily.append({'date': date, 'desc': desc, 'temp': temp})
+    return daily
@@ -0,0 +1,283 @@
+"""
+Benchmark the CPU-bound paths behind the itinerary page and the PDF on synthetic 3-, 14-,
+30- and 90-day trips (no network: every fixture is generated here), and compare the timings
+with a stored baseline so a slower change fails the check.
+
+    python -m benchmarks.hot_paths                 # run and print
+    python -m benchmarks.hot_paths --save          # record benchmarks/baseline.json
+    python -m benchmarks.hot_paths --check         # exit 1 on regressions against it
+
+Timings are compared after scaling by a fixed calibration workload, which absorbs a machine
+that is uniformly faster or slower; still, record the baseline where --check runs.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+from app import create_app, idempotency, qr_utils, text_layout
+from app.itinerary import finish_sections
+from app.qr_utils import generate_qr_image_data
+from app.routes import categorize_flat_packing, parse_budget_category
+from app.text_cleaning import clean_section
+from app.text_layout import wrap_text
+from .text_cleaning import generate_texts
+
+TRIP_DAYS = (3, 14, 30, 90)
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# A case regresses when it is this much slower than its baseline (0.5 = 50%) and also slower
+# by more than BENCH_MIN_DELTA seconds, so timer noise on sub-millisecond cases is ignored
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.5"))
+BENCH_MIN_DELTA = float(os.getenv("BENCH_MIN_DELTA", "0.0005"))
+# Every sample runs a case repeatedly for at least this long, so timer and scheduler noise
+# doesn't swamp the millisecond cases
+BENCH_MIN_SAMPLE = float(os.getenv("BENCH_MIN_SAMPLE", "0.05"))
+CALIBRATION = 'calibration'
+# Cases flagged by --check are measured again this many times and only reported if they stay slow
+BENCH_CONFIRM_RUNS = int(os.getenv("BENCH_CONFIRM_RUNS", "2"))
+
+ACTIVITIES = [
+    'Espresso at a neighbourhood bar, then a walk through the old town before the crowds arrive.',
+    'Guided tour of the cathedral and its rooftop terraces; book tickets online to skip the queue.',
+    'Lunch at a family-run trattoria near the market, followed by a siesta in the park.',
+    'Sunset aperitivo on a rooftop terrace and dinner at a jazz club in the harbour district.',
+    'Morning at the modern art museum, afternoon browsing vintage record shops.',
+    'Day trip by train to the coast: swim, seafood lunch, back in time for a late dinner.',
+    'Cooking class with a local chef, then an evening food tour of the night market.',
+]
+PACKING = [
+    'rncoat', 'Comfortable walking shoes', 'Phone chrgr', 'Passport', 'Sunscreen', 'Swimsuit',
+    'Light jacket', 'Power adapter', 'Reusable water bottle', 'rn jacket', 'Sunglasses', 'Scarf',
+    'Travel insurance papers', 'Hat', 'Day backpack', 'First aid kit', 'Earplugs', 'Toiletries',
+]
+BUDGET = {
+    'accommodation': ['Boutique hotel in the old town $140/night', 'Hostel private room $65/night',
+                      'Apartment near the station $95/night'],
+    'food': ['cost for meals: around $25 per day', 'Street food approximately $10 per meal',
+             'Tasting menu dinner $85'],
+    'activities': ['Museum pass $45', 'Guided walking tour $30 per person', 'Cooking class $70'],
+}
+PLACES = ['Colosseum', 'Trevi Fountain', 'Pantheon', 'Villa Borghese', 'Campo de Fiori',
+          'Trastevere', 'Vatican Museums', 'Piazza Navona', 'Testaccio Market', 'Aventine Hill']
+
+
+def trip_sections(days, seed=1):
+    """The sections dict the model returns for a trip of `days` days."""
+    rng = random.Random(seed)
+    noisy = generate_texts(days + 20, seed)
+    return {
+        'itinerary': {
+            f"Day {day}": {period: rng.choice(ACTIVITIES) for period in ('morning', 'afternoon', 'evening')}
+            for day in range(1, days + 1)
+        },
+        'packing': [rng.choice(PACKING) for _ in range(10 + days)],
+        'tips': noisy[:8 + days // 3],
+        'budget': {category: [rng.choice(lines) for _ in range(2 * days)] for category, lines in BUDGET.items()},
+        'transport': noisy[-5:],
+        'safety': ['Pickpockets on busy trams', 'Tap water is safe', 'Carry cash for small shops'],
+        'closing': 'Enjoy every espresso, every sunset and every late-night conversation.',
+    }
+
+
+def completion(sections):
+    """A fenced completion for `sections` and the same completion cut off at 80%."""
+    content = f"```json\n{json.dumps(sections)}\n```"
+    return content, content[:int(len(content) * 0.8)]
+
+
+def pdf_form(sections, days, seed=1):
+    """The fields itinerary.html posts to /download_pdf for the trip."""
+    rng = random.Random(seed)
+    places = PLACES * (1 + days // len(PLACES))
+    return {
+        'city_name': 'Rome',
+        'departure_city': 'London',
+        'user_name': 'Traveler',
+        'start_date': '2025-07-01',
+        'end_date': f"2025-07-{min(days, 28):02d}",
+        'content': ' '.join(rng.choice(ACTIVITIES) for _ in range(5)),
+        'itinerary': json.dumps(sections['itinerary']),
+        'packing_list': json.dumps(categorize_flat_packing(sections['packing'])),
+        'tips': json.dumps(sections['tips']),
+        'budget': json.dumps(sections['budget']),
+        'transport': json.dumps(sections['transport']),
+        'tags': json.dumps(sections['safety']),
+        'closing': sections['closing'],
+        'places': json.dumps(places[:5 + days // 3]),
+        'weather': json.dumps([{'date': f"2025-07-{d:02d}", 'desc': 'Clear', 'temp': 27} for d in range(1, 8)]),
+        'taste_mapping': json.dumps([{'taste': 'jazz', 'match': 'Live music in Trastevere'}]),
+        'flight_estimate': json.dumps({'price': '$180', 'sites': ['Skyscanner', 'Kayak']}),
+        'reason': 'Matches your love of jazz, long lunches and old architecture.',
+        'summary': 'Music, food and history.',
+        'city_description': 'Rome is a vibrant cultural destination.',
+        'trip_description': 'Jazz, pasta and ruins',
+    }
+
+
+def trip_texts(sections):
+    days = [text for schedule in sections['itinerary'].values() for text in schedule.values()]
+    return days + sections['tips'] + sections['transport'] + [sections['closing']]
+
+
+def _clear_render_caches():
+    text_layout._wrap.cache_clear()
+    qr_utils._qr_cache.clear()
+    idempotency._results.clear()
+
+
+def cases(days, client):
+    """{name: (setup, run)} for one trip length; setup runs untimed before every call."""
+    sections = trip_sections(days)
+    texts = trip_texts(sections)
+    full, truncated = completion(sections)
+    form = pdf_form(sections, days)
+    links = [f"https://www.google.com/maps/search/?api=1&query={place}+Rome+{i}"
+             for i, place in enumerate(json.loads(form['places']))]
+
+    def download_pdf():
+        response = client.post('/download_pdf', data=form)
+        if response.status_code != 200:
+            raise AssertionError(f"/download_pdf returned {response.status_code}")
+
+    return {
+        'wrap_text': (text_layout._wrap.cache_clear, lambda: [wrap_text(text, 250) for text in texts]),
+        'clean_section': (None, lambda: [clean_section(text) for text in texts]),
+        'json_recovery': (None, lambda: (finish_sections(full), finish_sections(truncated))),
+        'budget_parsing': (None, lambda: [parse_budget_category(lines) for lines in sections['budget'].values()]),
+        'categorize_flat_packing': (None, lambda: categorize_flat_packing(sections['packing'])),
+        'qr_codes': (qr_utils._qr_cache.clear, lambda: [generate_qr_image_data(link) for link in links]),
+        'download_pdf': (_clear_render_caches, download_pdf),
+    }
+
+
+def bench(setup, run, repeats, min_sample=BENCH_MIN_SAMPLE):
+    """Best seconds per call over `repeats` samples; short cases are looped until a sample takes min_sample."""
+    best = float('inf')
+    for _ in range(repeats):
+        elapsed, calls = 0.0, 0
+        while elapsed < min_sample or not calls:
+            if setup:
+                setup()
+            start = time.perf_counter()
+            run()
+            elapsed += time.perf_counter() - start
+            calls += 1
+        best = min(best, elapsed / calls)
+    return best
+
+
+def _calibration_workload(texts=tuple(generate_texts(200, seed=7))):
+    """Fixed pure-Python work (parsing, sorting, string handling) that no app change affects."""
+    for text in texts:
+        words = sorted(json.loads(json.dumps(text.split())))
+        ' '.join(word.lower() for word in words).count('the')
+
+
+def run_all(days=TRIP_DAYS, repeats=5, only=None, min_sample=BENCH_MIN_SAMPLE):
+    """
+    {"case/Nd": best seconds per call} for every case and trip length (app logging is silenced),
+    plus CALIBRATION: the machine's speed on a fixed workload, measured before and after.
+    """
+    client = create_app().test_client()
+    calibration = bench(None, _calibration_workload, repeats, min_sample)
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for trip_days in days:
+            for name, (setup, run) in cases(trip_days, client).items():
+                if only and name not in only:
+                    continue
+                results[f"{name}/{trip_days}d"] = bench(setup, run, repeats, min_sample)
+    results[CALIBRATION] = min(calibration, bench(None, _calibration_workload, repeats, min_sample))
+    return results
+
+
+def compare(results, baseline, tolerance=BENCH_TOLERANCE, min_delta=BENCH_MIN_DELTA):
+    """
+    [(case, baseline seconds, current seconds)] for every case that regressed. Baseline times
+    are first scaled by how much slower or faster this machine ran the calibration workload.
+    """
+    scale = 1.0
+    if results.get(CALIBRATION) and baseline.get(CALIBRATION):
+        scale = results[CALIBRATION] / baseline[CALIBRATION]
+    regressions = []
+    for case, current in results.items():
+        before = baseline.get(case)
+        if before is None or case == CALIBRATION:
+            continue
+        before *= scale
+        if current > before * (1 + tolerance) and current - before > min_delta:
+            regressions.append((case, before, current))
+    return regressions
+
+
+def confirm(regressions, baseline, repeats=5, tolerance=BENCH_TOLERANCE, runs=BENCH_CONFIRM_RUNS):
+    """The regressions that still show up when just those cases are measured again, `runs` times."""
+    for _ in range(runs):
+        if not regressions:
+            break
+        flagged = {case for case, _, _ in regressions}
+        names = {case.split('/')[0] for case in flagged}
+        days = sorted({int(case.split('/')[1].rstrip('d')) for case in flagged})
+        rerun = run_all(days, repeats, names)
+        regressions = [r for r in compare(rerun, baseline, tolerance) if r[0] in flagged]
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def save_baseline(results, repeats, path=BASELINE_PATH):
+    record = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeats': repeats,
+        'results': {case: round(seconds, 6) for case, seconds in results.items()},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, nargs='+', default=list(TRIP_DAYS))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--only', nargs='+', help="case names to run (default: all)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help="write the results as the baseline")
+    parser.add_argument('--check', action='store_true', help="exit 1 if a case regressed against the baseline")
+    parser.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_all(args.days, args.repeats, args.only)
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else {}
+    print(f"best of {args.repeats}")
+    for case, seconds in results.items():
+        before = baseline.get(case)
+        change = f"  ({seconds / before:.2f}x baseline)" if before else ''
+        print(f"{case:30} {seconds * 1000:9.2f} ms{change}")
+
+    if args.save:
+        save_baseline(results, args.repeats, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+    if args.check:
+        if not baseline:
+            print(f"No baseline at {args.baseline}; run with --save first")
+            return 1
+        regressions = confirm(compare(results, baseline, args.tolerance), baseline, args.repeats, args.tolerance)
+        for case, before, after in regressions:
+            print(f"REGRESSION {case}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Benchmark app.text_cleaning against the per-request cleaners it replaced (kept below
+verbatim as legacy_*), on a large generated itinerary. Also checks the outputs match.
+
+    python -m benchmarks.text_cleaning [days] [repeats]
+"""
+import random
+import re
+import sys
+import time
+from app import text_cleaning
+
+
+def legacy_clean_section(text):
+    if not isinstance(text, str):
+        return text
+    # Remove asterisks, markdown headers, and 'AI' markers
+    text = re.sub(r'\*+', '', text)
+    text = re.sub(r'#\s*', '', text)
+    text = text.replace('AI', '').replace('ai', '')
+    # Remove AI translation artifacts
+    text = re.sub(r'"[^"]"\s,\s*[^"]"[^"]"', '', text)  # Remove quoted translations
+    text = re.sub(r'The English translation of "[^"]" is "([^"])"\.?', r'\1', text)  # Extract translation
+    text = re.sub(r'"([^"])",\s[^"]"[^"]"', r'\1', text)  # Clean quoted names
+    text = re.sub(r'"([^"]*)"\.', r'\1', text)  # Remove quotes and periods
+    
+    # Fix common word parsing errors
+    word_fixes = {
+        'rncoat': 'raincoat', 'rn ': 'rain ', 'ecnomy': 'economy', 'ecnomic': 'economic',
+        'trvl': 'travel', 'trvel': 'travel', 'accomodation': 'accommodation',
+        'restarant': 'restaurant', 'resturant': 'restaurant', 'transprt': 'transport',
+        'airprt': 'airport', 'htl': 'hotel', 'bkng': 'booking', 'flght': 'flight'
+    }
+    for wrong, correct in word_fixes.items():
+        text = text.replace(wrong, correct)
+    
+    # Fix common word breaks and spacing issues
+    text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)  # camelCase to spaced
+    text = re.sub(r'([a-z])(\d)', r'\1 \2', text)  # letter+number
+    text = re.sub(r'(\d)([a-z])', r'\1 \2', text)  # number+letter
+    
+    # Fix broken words at line boundaries
+    text = re.sub(r'([a-z])\s+([a-z]{1,3})\s+([a-z])', lambda m: 
+                 m.group(1) + m.group(2) + m.group(3) if len(m.group(2)) <= 2 else m.group(0), text)
+    
+    # Handle budget data specifically
+    if 'Budget Estimates' in text:
+        # Split into sections
+        sections = text.split('Budget Estimates')
+        cleaned_sections = []
+        for section in sections:
+            # Clean each section
+            section = section.strip()
+            if not section:
+                continue
+            # Remove continuation marks
+            section = re.sub(r'\\', '', section)  # Remove backslashes
+            section = re.sub(r'\s*•\s*', '• ', section)  # Normalize bullet points
+            cleaned_sections.append(section)
+        text = 'Budget Estimates'.join(cleaned_sections)
+    
+    return text.strip()
+
+
+def legacy_clean_itinerary_activity(text):
+    if not isinstance(text, str):
+        return text
+    import re
+    text = text.replace('AI', '').replace('ai', '')
+    text = re.sub(r'\*+', '', text)
+    text = re.sub(r'#\s*', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    text = re.sub(r'([a-z])(\d)', r'\1 \2', text)
+    text = re.sub(r'(\d)([a-z])', r'\1 \2', text)
+    text = re.sub(r'([a-z])\s+([a-z]{1,2})\s+([a-z])', lambda m: m.group(1) + m.group(2) + m.group(3) if len(m.group(2)) <= 2 else m.group(0), text)
+    text = re.sub(r'([\.,;:!?])([A-Za-z])', r'\1 \2', text)  # Ensure space after punctuation
+    text = re.sub(r'([a-zA-Z])([\.,;:!?])', r'\1\2', text)  # Remove space before punctuation
+    text = re.sub(r'\s+([\.,;:!?])', r'\1', text)  # Remove space before punctuation
+    text = text.strip()
+    return text
+
+
+def legacy_clean_text_content(text):
+    if not isinstance(text, str):
+        return str(text)
+    # Apply same cleaning as clean_section but lighter
+    word_fixes = {
+        'rncoat': 'raincoat', 'rn ': 'rain ', 'ecnomy': 'economy', 'ecnomic': 'economic',
+        'trvl': 'travel', 'trvel': 'travel', 'accomodation': 'accommodation',
+        'restarant': 'restaurant', 'resturant': 'restaurant', 'transprt': 'transport'
+    }
+    for wrong, correct in word_fixes.items():
+        text = text.replace(wrong, correct)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def legacy_clean_budget_line(line):
+    import re
+    # Remove leading/trailing brackets, quotes
+    line = line.strip()
+    # Remove leading brackets/quotes
+    line = re.sub(r'^[\[\]\(\)\{\}\'\"]+', '', line)
+    # Remove trailing brackets/quotes
+    line = re.sub(r'[\[\]\(\)\{\}\'\"]+$', '', line)
+    line = re.sub(r"^[,\s]+|[,\s]+$", '', line)
+    # Remove repeated/unwanted phrases
+    for phrase in [
+        'cost for', 'expecttospend', 'expect to spend', 'around', 'approximately', 'per activities', 'per activity',
+        'per meals', 'per meal', 'per day for meals', 'per day on', 'per day', 'per activities', 'per activity',
+        'per person', 'for', ':', ' - ', '--', '  '
+    ]:
+        line = line.replace(phrase, '')
+    # Remove double spaces
+    line = ' '.join(line.split())
+    # Format price with proper currency symbol and spacing
+    price_match = re.search(r'\$(\d+(?:\.\d{1,2})?/night|\$\d+)', line)
+    if price_match:
+        price = price_match.group(0)
+        # Remove price from description
+        desc = line.replace(price, '').strip()
+        # Format with proper spacing
+        line = f"{desc} {price}"
+    # Handle specific cases
+    if 'cafe du monde' in line.lower():
+        line = line.replace('cafe du monde', 'Cafe du Monde')
+    if 'beignet cafe' in line.lower():
+        line = line.replace('beignet cafe', 'Beignet Cafe')
+    if 'morial convention center' in line.lower():
+        line = line.replace('morial convention center', 'Ernest N. Morial Convention Center')
+    # Capitalize first letter
+    if line:
+        line = line[0].upper() + line[1:]
+    return line.strip()
+
+
+PAIRS = [
+    (legacy_clean_section, text_cleaning.clean_section),
+    (legacy_clean_itinerary_activity, text_cleaning.clean_itinerary_activity),
+    (legacy_clean_text_content, text_cleaning.clean_text_content),
+    (legacy_clean_budget_line, text_cleaning.clean_budget_line),
+]
+
+FRAGMENTS = [
+    'Start the morning with espresso at a neighbourhood bar before the crowds arrive.',
+    'Walk through Trastevere and stop for lunch at a family-run trattoria.',
+    'Evening: sunset aperitivo on a rooftop terrace, then dinner near Campo de Fiori.',
+    'Book museum tickets online to skip the queue; most sites close on Mondays.',
+    'Carry a reusable water bottle and refill it at the public fountains.',
+    'Spend the afternoon at the Vatican Museums and finish in the Sistine Chapel.',
+    'Visit the', 'Colosseum', '**Morning:**', '## Tips', 'AI suggests', 'grab a gelato', 'at 9am',
+    'Day3', 'take the metroLine', 'rncoat', 'trvl light', 'htl check-in', 'cheap flght', 'bkng ahead',
+    'accomodation near', 'the resturant', 'transprt pass', 'a la carte', 'go to the', 'it is ok',
+    '"Roma", "Rome"', 'The English translation of "x" is "y".', 'Budget Estimates', '• meals\\',
+    'cost for meals: around $25 per day', 'approximately $120/night', 'cafe du monde', 'rn jacket',
+    '  ', '\n', 'Rest.Then', 'costs $40 ,', '[hotel]', '{ "dinner" }', '#1 pick', 'ecnomic', 'airprt',
+]
+
+
+def generate_texts(count, seed=1):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 24))) for _ in range(count)]
+
+
+def large_itinerary(days=60, seed=1):
+    """Text the size of a long trip's PDF: per-day activities plus tips, packing and budget lines."""
+    return generate_texts(days * 3 + 120, seed)
+
+
+def check(texts):
+    for legacy, current in PAIRS:
+        for text in texts:
+            expected, actual = legacy(text), current(text)
+            if expected != actual:
+                raise AssertionError(f"{current.__name__} differs on {text!r}: {expected!r} != {actual!r}")
+
+
+def bench(func, texts, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(days=60, repeats=20):
+    texts = large_itinerary(days)
+    check(texts)
+    print(f"{len(texts)} strings, best of {repeats}")
+    for legacy, current in PAIRS:
+        before, after = bench(legacy, texts, repeats), bench(current, texts, repeats)
+        print(f"{current.__name__:26} {before * 1000:8.2f} ms -> {after * 1000:8.2f} ms  ({before / after:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
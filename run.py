@@ -9,6 +9,10 @@ load_dotenv()
 # Create Flask app instance using factory pattern
 app = create_app()
 
+# Keep Qloo venues, photos and forecasts for the usual destinations warm (WARM_ENABLED=0 to skip)
+from app.warmer import start_warmer
+start_warmer()
+
 if __name__ == '__main__':
     # Use PORT from environment if available (Render will inject it)
     port = int(os.getenv('PORT', 5000))
@@ -0,0 +1,53 @@
+// jobs.js
+// Sends a form to one of the background job endpoints (/jobs/itinerary, /jobs/pdf), polls the
+// job and opens its result when it is done, so the heavy work never runs in the request thread.
+// Only if the job can't be queued (e.g. the queue is full) is the form submitted to its regular
+// action instead. A job that fails is reported through onFinished(message) rather than re-run
+// in the request thread, and a status poll that hits a network error is simply retried.
+
+const JOB_POLL_MAX_ERRORS = 5;
+
+function submitAsJob(form, jobUrl, onFinished, pollMs) {
+    pollMs = pollMs || 1000;
+    const finished = onFinished || function() {};
+    fetch(jobUrl, {method: 'POST', body: new FormData(form), headers: {'Accept': 'application/json'}})
+        .then(function(response) {
+            if (response.status !== 202) throw new Error('Job not queued: ' + response.status);
+            return response.json();
+        })
+        .then(function(job) {
+            let errors = 0;
+            function poll() {
+                fetch(job.status_url)
+                    .then(function(response) {
+                        if (response.status === 404) return {status: 'failed'};
+                        if (!response.ok) throw new Error('Status poll failed: ' + response.status);
+                        return response.json();
+                    })
+                    .then(function(status) {
+                        errors = 0;
+                        if (status.status === 'done') {
+                            finished();
+                            window.location.href = job.result_url;
+                        } else if (status.status === 'failed') {
+                            finished('Something went wrong while preparing this. Please try again in a moment.');
+                        } else {
+                            setTimeout(poll, pollMs);
+                        }
+                    })
+                    .catch(function() {
+                        errors += 1;
+                        if (errors >= JOB_POLL_MAX_ERRORS) {
+                            finished('Lost contact with the server. Please check your connection and try again.');
+                        } else {
+                            setTimeout(poll, pollMs * errors);
+                        }
+                    });
+            }
+            setTimeout(poll, pollMs);
+        })
+        .catch(function() {
+            finished();
+            HTMLFormElement.prototype.submit.call(form);
+        });
+}
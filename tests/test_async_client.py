@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from app import async_client, create_app, qloo_api
+
+
+class TestAsyncRequest(unittest.TestCase):
+    def test_retryable_status_is_retried_on_the_shared_loop(self):
+        statuses = [503, 200]
+
+        def handler(request):
+            return httpx.Response(statuses.pop(0), json={'ok': True})
+
+        async def fetch():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            with patch.object(async_client, 'get_client', return_value=client):
+                try:
+                    return await async_client.get('qloo', 'https://example.test/search')
+                finally:
+                    await client.aclose()
+
+        response = async_client.run(fetch(), timeout=10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(statuses, [])
+
+    def test_cancelled_hedge_cancels_its_attempts(self):
+        started, cancelled = [], []
+
+        async def hang(*args):
+            started.append(1)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        async def caller():
+            config = async_client.get_config('openweather')
+            with patch.object(async_client, '_send', side_effect=hang):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(async_client._hedged('openweather', 0.01, config, 'GET', 'https://example.test', None, {}), 0.2)
+                await asyncio.sleep(0.05)
+
+        async_client.run(caller(), timeout=10)
+        self.assertEqual(len(started), 2)
+        self.assertEqual(len(cancelled), 2)
+
+
+class TestSearchSteps(unittest.TestCase):
+    def test_sync_and_async_drivers_agree(self):
+        def results_for(name):
+            return [{'name': f"{name} A"}, {'name': f"{name} B"}]
+
+        async def fake_async(entity_type, name, **kwargs):
+            return results_for(name)
+
+        with patch.object(qloo_api, 'get_similar_entities', side_effect=lambda t, name, **kw: results_for(name)), \
+                patch.object(qloo_api, 'get_similar_entities_async', side_effect=fake_async):
+            sync_venues = qloo_api.get_venues_for_city('Rome', 'Italy', venues_needed=5)
+            async_venues = async_client.run(qloo_api.get_venues_for_city_async('Rome', 'Italy', venues_needed=5), timeout=10)
+        self.assertEqual(sync_venues, async_venues)
+        self.assertEqual(async_venues[:3], ['Rome attractions A', 'Rome attractions B', 'Rome restaurants A'])
+
+
+class TestAsyncItineraryView(unittest.TestCase):
+    def test_async_view_renders_the_itinerary(self):
+        async def preferences(description):
+            return {'music': 'opera', 'food': 'Italian'}
+
+        async def taste(user_input):
+            return {'city': 'Rome', 'reason': 'Pasta', 'venues': ['Colosseum'], 'taste_mapping': []}
+
+        async def sections(taste_data, weather=None):
+            return {'tips': ['Book ahead'], 'itinerary': {'Day 1': {'morning': 'Colosseum'}}}
+
+        client = create_app().test_client()
+        with patch('app.routes.parse_text_description_async', side_effect=preferences), \
+                patch('app.routes.get_taste_recommendations_async', side_effect=taste), \
+                patch('app.routes.generate_itinerary_and_sections_async', side_effect=sections), \
+                patch('app.routes.city_image', return_value='/static/images/logo.png'), \
+                patch('app.routes.prefetch_estimate') as prefetch:
+            response = client.post('/itinerary/async', data={
+                'trip_description': 'opera', 'start_date': '2030-01-01', 'end_date': '2030-01-05'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Colosseum', response.get_data(as_text=True))
+        prefetch.assert_called_once_with('Nairobi', 'Rome', '2030-01')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+from benchmarks import hot_paths
+
+
+class TestHotPathBenchmarks(unittest.TestCase):
+    def test_every_case_runs_on_a_short_trip(self):
+        results = hot_paths.run_all(days=(3,), repeats=1, min_sample=0)
+        self.assertEqual(set(results), {
+            'wrap_text/3d', 'clean_section/3d', 'json_recovery/3d', 'budget_parsing/3d',
+            'categorize_flat_packing/3d', 'qr_codes/3d', 'download_pdf/3d', hot_paths.CALIBRATION,
+        })
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+
+    def test_compare_flags_only_real_regressions(self):
+        baseline = {'wrap_text/3d': 0.010, 'qr_codes/3d': 0.0001, 'clean_section/3d': 0.010}
+        results = {'wrap_text/3d': 0.020, 'qr_codes/3d': 0.0003, 'clean_section/3d': 0.011, 'new_case/3d': 1.0}
+        self.assertEqual(hot_paths.compare(results, baseline, tolerance=0.3, min_delta=0.0005),
+                         [('wrap_text/3d', 0.010, 0.020)])
+
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            hot_paths.save_baseline({'wrap_text/3d': 0.0012345678}, repeats=5, path=path)
+            self.assertEqual(hot_paths.load_baseline(path), {'wrap_text/3d': 0.001235})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from app.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_expiry_and_counters(self):
+        cache = TTLCache('test_expiry', ttl=10)
+        with patch('app.cache.time.monotonic', return_value=100.0):
+            cache.set('jazz', ['New Orleans'])
+            self.assertEqual(cache.lookup('jazz'), (True, ['New Orleans']))
+            self.assertEqual(cache.lookup('blues'), (False, None))
+        with patch('app.cache.time.monotonic', return_value=111.0):
+            self.assertEqual(cache.lookup('jazz'), (False, None))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']), (1, 2, 1))
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        cache = TTLCache('test_lru', max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        by_size = TTLCache('test_bytes', max_entries=None, max_bytes=200)
+        by_size.set('small', 'x')
+        by_size.set('big', 'y' * 500)
+        self.assertEqual(len(by_size), 0)
+
+    def test_negative_entries_use_short_ttl(self):
+        cache = TTLCache('test_negative', ttl=3600, negative_ttl=5)
+        with patch('app.cache.time.monotonic', return_value=0.0):
+            cache.set_negative('broken query', [])
+            self.assertEqual(cache.lookup('broken query'), (True, []))
+        with patch('app.cache.time.monotonic', return_value=6.0):
+            self.assertEqual(cache.lookup('broken query'), (False, None))
+        self.assertEqual(cache.stats()['negative_hits'], 1)
+
+    def test_stale_entries_are_served_while_one_refresh_runs(self):
+        cache = TTLCache('test_stale', ttl=10, stale_ttl=100)
+        release, refreshed = threading.Event(), threading.Event()
+        calls = []
+
+        def refresh():
+            calls.append(1)
+            release.wait(2)
+            cache.set('jazz', ['Chicago'])
+            refreshed.set()
+
+        with patch('app.cache.time.monotonic', return_value=0.0):
+            cache.set('jazz', ['New Orleans'])
+            cache.set('tango', ['Buenos Aires'])
+        with patch('app.cache.time.monotonic', return_value=50.0):
+            self.assertEqual(cache.lookup('jazz'), (False, None))  # no refresh, no stale value
+            for _ in range(20):
+                self.assertEqual(cache.lookup('jazz', refresh=refresh), (True, ['New Orleans']))
+            release.set()
+            self.assertTrue(refreshed.wait(2))
+            self.assertEqual(cache.get('jazz'), ['Chicago'])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['stale_hits'], 20)
+        with patch('app.cache.time.monotonic', return_value=111.0):
+            self.assertEqual(cache.lookup('tango', refresh=refresh), (False, None))  # past the cap
+
+
+class TestQlooSearchCache(unittest.TestCase):
+    def setUp(self):
+        from app import qloo_api
+        self.qloo_api = qloo_api
+        qloo_api._search_cache.clear()
+        self.key_patch = patch.object(qloo_api, 'QLOO_API_KEY', 'test-key')
+        self.key_patch.start()
+
+    def tearDown(self):
+        self.key_patch.stop()
+        self.qloo_api._search_cache.clear()
+
+    def test_repeated_query_hits_cache(self):
+        response = MagicMock(status_code=200, text='{}')
+        response.json.return_value = {'results': [{'name': 'Preservation Hall', 'city': 'New Orleans'}]}
+        with patch.object(self.qloo_api.http_client, 'get', return_value=response) as mock_get:
+            first = self.qloo_api.get_similar_entities('', 'Jazz')
+            second = self.qloo_api.get_similar_entities('', '  jazz ')
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(self.qloo_api.get_search_cache_stats()['hits'], 1)
+
+    def test_error_response_is_negatively_cached(self):
+        response = MagicMock(status_code=503, text='unavailable')
+        with patch.object(self.qloo_api.http_client, 'get', return_value=response) as mock_get:
+            self.assertEqual(self.qloo_api.get_similar_entities('', 'tango'), [])
+            self.assertEqual(self.qloo_api.get_similar_entities('', 'tango'), [])
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_stale_result_survives_a_failed_refresh(self):
+        response = MagicMock(status_code=200, text='{}')
+        response.json.return_value = {'results': [{'name': 'Preservation Hall', 'city': 'New Orleans'}]}
+        cache = self.qloo_api._search_cache
+        with patch('app.cache.time.monotonic', return_value=0.0), \
+                patch.object(self.qloo_api.http_client, 'get', return_value=response):
+            first = self.qloo_api.get_similar_entities('', 'jazz')
+        failed = MagicMock(status_code=503, text='unavailable')
+        with patch('app.cache.time.monotonic', return_value=cache.ttl + 1.0), \
+                patch.object(self.qloo_api.http_client, 'get', return_value=failed) as mock_get:
+            self.assertEqual(self.qloo_api.get_similar_entities('', 'jazz'), first)
+            for _ in range(100):
+                if not cache._refreshing:
+                    break
+                threading.Event().wait(0.01)
+            self.assertEqual(self.qloo_api.get_similar_entities('', 'jazz'), first)
+        self.assertGreaterEqual(mock_get.call_count, 1)
+        self.assertEqual(cache.stats()['stale_hits'], 2)
+
+
+class TestItineraryCache(unittest.TestCase):
+    def setUp(self):
+        from app import itinerary
+        self.itinerary = itinerary
+        itinerary._itinerary_cache.clear()
+        self.trip = {'city': 'Rome', 'country': 'Italy', 'vibe': 'cultural', 'days': '3', 'venues': ['Colosseum']}
+
+    def tearDown(self):
+        self.itinerary._itinerary_cache.clear()
+
+    def _response(self, content):
+        response = MagicMock()
+        response.json.return_value = {'choices': [{'message': {'content': content}}]}
+        return response
+
+    def test_weather_is_bucketed_in_key(self):
+        warm = [{'date': '2025-07-01', 'desc': 'Clear', 'temp': 27}]
+        warmer = [{'date': '2025-07-01', 'desc': 'clear', 'temp': 28}]
+        hot = [{'date': '2025-07-01', 'desc': 'Clear', 'temp': 35}]
+        key = self.itinerary.itinerary_cache_key
+        self.assertEqual(key(self.trip, warm), key(self.trip, warmer))
+        self.assertNotEqual(key(self.trip, warm), key(self.trip, hot))
+
+    def test_trip_dates_are_in_key(self):
+        key = self.itinerary.itinerary_cache_key
+        june = dict(self.trip, start_date='2030-06-01', end_date='2030-06-04')
+        self.assertEqual(key(june), key(dict(june, start_date=' 2030-06-01')))
+        self.assertNotEqual(key(june), key(dict(june, start_date='2030-07-01', end_date='2030-07-04')))
+        self.assertNotEqual(key(june), key(self.trip))
+
+    def test_valid_json_is_memoized(self):
+        content = '{"tips": ["Book ahead"], "closing": "Enjoy", "itinerary": {"Day 1": {"morning": "Colosseum"}}}'
+        with patch.object(self.itinerary.http_client, 'post', return_value=self._response(content)) as mock_post:
+            first = self.itinerary.generate_itinerary_and_sections(dict(self.trip))
+            first['tips'].append('mutated by caller')
+            second = self.itinerary.generate_itinerary_and_sections(dict(self.trip))
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(second['tips'], ['Book ahead'])
+
+    def test_unparseable_response_is_not_cached(self):
+        with patch.object(self.itinerary.http_client, 'post', return_value=self._response('not json at all')) as mock_post:
+            self.itinerary.generate_itinerary_and_sections(dict(self.trip))
+            self.itinerary.generate_itinerary_and_sections(dict(self.trip))
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(len(self.itinerary._itinerary_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
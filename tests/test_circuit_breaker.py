@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+from app import circuit_breaker, http_client, qloo_api, rate_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def make_breaker(self, clock):
+        config = dict(circuit_breaker.BREAKER_DEFAULTS['qloo'], failure_threshold=3, reset_timeout=30.0)
+        return circuit_breaker.CircuitBreaker('qloo', config, clock=clock)
+
+    def test_opens_on_failures_and_slow_calls_then_probes(self):
+        clock = FakeClock()
+        breaker = self.make_breaker(clock)
+        breaker.record_failure()
+        breaker.record(10.0)  # over the 3s latency SLO
+        self.assertTrue(breaker.allow())
+        breaker.record(0.5, ok=False)
+        self.assertTrue(breaker.is_open())
+        with self.assertRaises(circuit_breaker.CircuitOpen):
+            breaker.before_call()
+        clock.now = 31
+        self.assertTrue(breaker.allow())  # the probe
+        self.assertFalse(breaker.allow())
+        breaker.record(0.2)
+        self.assertEqual(breaker.stats()['state'], 'closed')
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = self.make_breaker(clock)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 31
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open())
+        self.assertEqual(breaker.stats()['trips'], 2)
+
+
+class TestHttpResilience(unittest.TestCase):
+    def setUp(self):
+        circuit_breaker.reset()
+
+    def tearDown(self):
+        circuit_breaker.reset()
+        http_client.close_all()
+
+    def test_breaker_short_circuits_requests(self):
+        session = http_client.get_session('qloo')
+        with patch.object(session, 'request', side_effect=requests.ConnectionError('down')) as mock_request:
+            for _ in range(5):
+                with self.assertRaises(requests.ConnectionError):
+                    http_client.get('qloo', 'https://example.com/search')
+            with self.assertRaises(circuit_breaker.CircuitOpen):
+                http_client.get('qloo', 'https://example.com/search')
+        self.assertEqual(mock_request.call_count, 5)
+
+    def test_hedged_get_takes_first_response(self):
+        slow, fast = MagicMock(status_code=200), MagicMock(status_code=200)
+        release = threading.Event()
+        calls = []
+
+        def respond(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return slow
+            return fast
+
+        session = http_client.get_session('openweather')
+        with patch.dict(os.environ, {'BREAKER_OPENWEATHER_HEDGE_DELAY': '0.05'}), \
+                patch.object(session, 'request', side_effect=respond):
+            started = time.monotonic()
+            self.assertIs(http_client.get('openweather', 'https://example.com/forecast', hedge=True), fast)
+            self.assertLess(time.monotonic() - started, 1)
+            release.set()
+        self.assertEqual(len(calls), 2)
+
+    def test_probe_refused_by_rate_limiter_is_handed_back(self):
+        clock = FakeClock()
+        breaker = circuit_breaker.CircuitBreaker('qloo', circuit_breaker.get_breaker_config('qloo'), clock=clock)
+        for _ in range(breaker.config['failure_threshold']):
+            breaker.record_failure()
+        clock.now = 31
+        with patch.object(circuit_breaker, 'get_breaker', return_value=breaker), \
+                patch.object(http_client.rate_limit, 'acquire', side_effect=rate_limit.OverBudget('no capacity')):
+            with self.assertRaises(rate_limit.OverBudget):
+                http_client.get('qloo', 'https://example.com/search')
+        self.assertTrue(breaker.allow())  # the next call may still probe
+
+    def test_open_qloo_circuit_uses_fallbacks(self):
+        breaker = circuit_breaker.get_breaker('qloo')
+        for _ in range(breaker.config['failure_threshold']):
+            breaker.record_failure()
+        with patch.object(qloo_api, 'QLOO_API_KEY', 'test-key'), \
+                patch.object(qloo_api.http_client, 'get') as mock_get:
+            self.assertIsNone(qloo_api.get_taste_based_destinations({'music': 'jazz'}))
+            self.assertEqual(qloo_api.get_venues_for_city('Rome'), ['Colosseum', 'Vatican City', 'Trevi Fountain'])
+        mock_get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
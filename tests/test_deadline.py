@@ -0,0 +1,56 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+from app import async_client, deadline, http_client, qloo_api
+
+
+class TestDeadline(unittest.TestCase):
+    def tearDown(self):
+        http_client.close_all()
+
+    def test_timeouts_are_capped_to_the_time_left(self):
+        self.assertEqual(deadline.cap_timeout((3.05, 10)), (3.05, 10))
+        with deadline.within(2):
+            connect, read = deadline.cap_timeout((3.05, 10))
+            self.assertLessEqual(read, 2)
+            with deadline.within(60):
+                # An inner budget never extends the outer one
+                self.assertLessEqual(deadline.remaining(), 2)
+        self.assertIsNone(deadline.remaining())
+
+    def test_calls_fail_fast_once_the_deadline_passed(self):
+        session = http_client.get_session('qloo')
+        with patch.object(session, 'request') as mock_request, patch.object(qloo_api, 'QLOO_API_KEY', 'test-key'):
+            with deadline.within(0):
+                with self.assertRaises(deadline.DeadlineExceeded):
+                    http_client.get('qloo', 'https://example.com/search')
+                # Qloo treats it like any failed search, but doesn't remember it
+                self.assertEqual(qloo_api.get_similar_entities('', 'fado'), [])
+        mock_request.assert_not_called()
+        self.assertFalse(qloo_api._search_cache.lookup(qloo_api.search_cache_key('fado'))[0])
+
+    def test_every_itinerary_stage_can_degrade(self):
+        from app.routes import ITINERARY_PIPELINE, ITINERARY_STREAM_PIPELINE
+        for pipeline in (ITINERARY_PIPELINE, ITINERARY_STREAM_PIPELINE):
+            self.assertEqual([stage.name for stage in pipeline.stages if stage.fallback is None], [])
+
+    def test_async_stage_falls_back_at_the_deadline(self):
+        async def slow():
+            await asyncio.sleep(1)
+            return 'done'
+
+        async def run():
+            with deadline.within(0.1):
+                fast = await deadline.run_within(lambda: slow(), lambda: 'late')
+            with deadline.within(1):
+                skipped = await deadline.run_within(lambda: slow(), lambda: 'skipped', min_seconds=5)
+            return fast, skipped
+
+        started = time.perf_counter()
+        self.assertEqual(async_client.run(run()), ('late', 'skipped'))
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
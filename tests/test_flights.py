@@ -0,0 +1,45 @@
+import threading
+import unittest
+from unittest.mock import patch
+from app import create_app, flights
+
+
+class TestFlightEstimates(unittest.TestCase):
+    def setUp(self):
+        flights._estimate_cache.clear()
+        self.client = create_app().test_client()
+
+    def tearDown(self):
+        flights._estimate_cache.clear()
+
+    def test_concurrent_requests_share_one_completion(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_estimate(origin, destination, month):
+            calls.append(month)
+            release.wait(5)
+            return '$640 USD', ['Skyscanner']
+
+        with patch.object(flights, 'get_flight_estimate_with_sites', side_effect=slow_estimate):
+            flights.prefetch_estimate('Nairobi', 'Lisbon', '2030-06')
+            results = []
+            waiter = threading.Thread(target=lambda: results.append(flights.get_estimate(' nairobi', 'LISBON', '2030-6-14')))
+            waiter.start()
+            release.set()
+            waiter.join(5)
+            response = self.client.post('/get_flight_estimate', json={'departure': 'Nairobi', 'destination': 'Lisbon', 'month': '2030-06'})
+        self.assertEqual(calls, ['2030-06'])
+        self.assertEqual(results, [('$640 USD', ['Skyscanner'])])
+        self.assertEqual(response.get_json(), {'price': '$640 USD', 'sites': ['Skyscanner']})
+
+    def test_unavailable_estimate_is_cached_briefly(self):
+        with patch.object(flights, 'get_flight_estimate_with_sites', return_value=('Contact travel agent for pricing', ['Kayak'])) as upstream:
+            flights.get_estimate('Nairobi', 'Oslo', '2030-01')
+            flights.get_estimate('Nairobi', 'Oslo', '2030-01')
+        self.assertEqual(upstream.call_count, 1)
+        self.assertEqual(flights._estimate_cache.stats()['negative_hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
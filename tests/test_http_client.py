@@ -0,0 +1,43 @@
+import os
+import unittest
+from unittest.mock import patch
+from app import http_client
+
+
+class TestHttpClient(unittest.TestCase):
+    def tearDown(self):
+        http_client.close_all()
+
+    def test_sessions_are_shared_per_provider(self):
+        self.assertIs(http_client.get_session('qloo'), http_client.get_session('qloo'))
+        self.assertIsNot(http_client.get_session('qloo'), http_client.get_session('together'))
+
+    def test_default_timeout_and_env_override(self):
+        self.assertEqual(http_client.default_timeout('qloo'), (3.05, 10))
+        with patch.dict(os.environ, {'HTTP_TOGETHER_READ_TIMEOUT': '90', 'HTTP_QLOO_READ_TIMEOUT': '7.5',
+                                     'HTTP_QLOO_RETRIES': '0'}):
+            http_client.close_all()  # settings are read once; drop the parsed ones
+            self.assertEqual(http_client.default_timeout('together')[1], 90.0)
+            self.assertEqual(http_client.default_timeout('qloo'), (3.05, 7.5))
+            self.assertEqual(http_client.get_config('qloo')['retries'], 0)
+        http_client.close_all()
+        self.assertEqual(http_client.default_timeout('unknown-provider'), http_client.default_timeout('default'))
+
+    def test_request_applies_provider_timeout(self):
+        session = http_client.get_session('openweather')
+        with patch.object(session, 'request') as mock_request:
+            http_client.get('openweather', 'https://example.com/forecast')
+            http_client.get('openweather', 'https://example.com/forecast', timeout=2)
+        self.assertEqual(mock_request.call_args_list[0].kwargs['timeout'], (3.05, 8))
+        self.assertEqual(mock_request.call_args_list[1].kwargs['timeout'], 2)
+
+    def test_retry_and_gzip_configured(self):
+        session = http_client.get_session('qloo')
+        adapter = session.get_adapter('https://hackathon.api.qloo.com/search')
+        self.assertEqual(adapter.max_retries.total, 2)
+        self.assertIn(429, adapter.max_retries.status_forcelist)
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+
+
+if __name__ == '__main__':
+    unittest.main()
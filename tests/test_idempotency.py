@@ -0,0 +1,65 @@
+import threading
+import unittest
+from unittest.mock import patch
+from werkzeug.datastructures import MultiDict
+from app import create_app, idempotency
+
+
+class TestIdempotency(unittest.TestCase):
+    def setUp(self):
+        idempotency._results.clear()
+        self.client = create_app().test_client()
+
+    def tearDown(self):
+        idempotency._results.clear()
+
+    def test_key_ignores_field_order_but_not_values(self):
+        key = idempotency.request_key
+        a = key('pdf', MultiDict([('city_name', 'Lima'), ('tips', '[]')]))
+        b = key('pdf', MultiDict([('tips', '[]'), ('city_name', 'Lima')]))
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, key('pdf', MultiDict([('city_name', 'Cusco'), ('tips', '[]')])))
+        self.assertNotEqual(a, key('itinerary', MultiDict([('city_name', 'Lima'), ('tips', '[]')])))
+        self.assertNotEqual(a, key('pdf', MultiDict([('city_name', 'Lima'), ('tips', '[]')]), client_key='tab-2'))
+
+    def test_double_click_renders_pdf_once(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_render(form):
+            calls.append(form['city_name'])
+            started.set()
+            release.wait(5)
+            return b'%PDF-fake'
+
+        responses = []
+        with patch('app.routes.render_pdf', side_effect=slow_render):
+            post = lambda: responses.append(create_app().test_client().post('/download_pdf', data={'city_name': 'Lima'}))
+            first = threading.Thread(target=post)
+            first.start()
+            started.wait(5)
+            second = threading.Thread(target=post)
+            second.start()
+            release.set()
+            first.join(5)
+            second.join(5)
+            # Shortly afterwards the stored result is replayed
+            post()
+            self.client.post('/download_pdf', data={'city_name': 'Cusco'})
+        self.assertEqual(calls, ['Lima', 'Cusco'])
+        self.assertEqual([r.data for r in responses], [b'%PDF-fake'] * 3)
+
+    def test_degraded_itinerary_is_not_replayed(self):
+        pages = [{'degraded': True, 'closing': 'We ran out of time'}, {'degraded': False, 'closing': 'Enjoy'}]
+        form = {'trip_description': 'jazz and tapas', 'start_date': '2025-07-01', 'end_date': '2025-07-05'}
+        with patch('app.routes.itinerary_context', side_effect=pages) as context, \
+                patch('app.routes.render_template', side_effect=lambda name, **page: page['closing']):
+            responses = [self.client.post('/itinerary', data=form).data for _ in range(3)]
+        # The retry runs the pipeline again; the complete page is then replayed
+        self.assertEqual(context.call_count, 2)
+        self.assertEqual(responses, [b'We ran out of time', b'Enjoy', b'Enjoy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import io
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from PIL import Image
+from app import create_app, image_store
+
+
+def jpeg_bytes(color, width=2000, height=1000):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(out, 'JPEG')
+    return out.getvalue()
+
+
+class TestImageStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir_patch = patch.object(image_store, 'IMAGE_STORE_DIR', self.tmp.name)
+        self.dir_patch.start()
+        image_store._index_cache.clear()
+        image_store._rotation.clear()
+        self.photos = [{'id': str(i), 'url': f'https://images.example/{i}.jpg', 'credit': ''} for i in range(3)]
+        self.bodies = {p['url']: jpeg_bytes(color) for p, color in zip(self.photos, ['red', 'green', 'blue'])}
+
+    def tearDown(self):
+        self.dir_patch.stop()
+        image_store._index_cache.clear()
+        image_store._rotation.clear()
+        self.tmp.cleanup()
+
+    def _get(self, provider, url, **kwargs):
+        return MagicMock(status_code=200, content=self.bodies[url])
+
+    def test_batch_is_fetched_once_and_rotated(self):
+        with patch.object(image_store, 'get_image_batch', return_value=self.photos) as batch, \
+                patch.object(image_store.http_client, 'get', side_effect=self._get) as download:
+            urls = [image_store.city_image('Kyoto') for _ in range(4)]
+            image_store._index_cache.clear()
+            # A fresh process reads the index from disk instead of calling Unsplash again
+            image_store.city_image(' kyoto ')
+        self.assertEqual(batch.call_count, 1)
+        self.assertEqual(download.call_count, 3)
+        self.assertEqual(len(set(urls[:3])), 3)
+        self.assertEqual(urls[3], urls[0])
+
+    def test_variants_are_resized_and_served(self):
+        digest = image_store.store_image(jpeg_bytes('red'))
+        with Image.open(io.BytesIO(image_store.read_variant(digest, 'pdf'))) as img:
+            self.assertEqual(img.size, (1000, 500))
+        self.assertIsNotNone(image_store.read_local_url(image_store.local_url(digest), 'thumb'))
+
+        client = create_app().test_client()
+        response = client.get(f'/images/{digest}/page.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(client.get(f'/images/{digest}/huge.jpg').status_code, 404)
+
+    def test_failed_batch_falls_back_to_logo(self):
+        with patch.object(image_store, 'get_image_batch', return_value=[]) as batch:
+            self.assertEqual(image_store.city_image('Atlantis'), image_store.DEFAULT_IMAGE)
+            self.assertEqual(image_store.city_image('Atlantis'), image_store.DEFAULT_IMAGE)
+        self.assertEqual(batch.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
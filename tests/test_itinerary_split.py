@@ -0,0 +1,67 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+from app import deadline, itinerary
+
+
+def fake_post(provider, url, **kwargs):
+    """Answer each split request with JSON for whatever section or days it asked for."""
+    prompt = kwargs['json']['messages'][0]['content']
+    response = MagicMock()
+    if 'Plan Day' in prompt:
+        first, last = [int(n) for n in prompt.split('Plan Day ')[1].split(' of ')[0].split(' to Day ')]
+        content = {'itinerary': {f'Day {i}': {'morning': f'Walk {i}'} for i in range(first, last + 1)}}
+    else:
+        section = prompt.split('Write only the ')[1].split(' section')[0]
+        content = {section: ['Bring shoes'] if section != 'closing' else 'Enjoy'}
+    response.json.return_value = {'choices': [{'message': {'content': json.dumps(content)}}]}
+    return response
+
+
+class TestSplitGeneration(unittest.TestCase):
+    def setUp(self):
+        itinerary._itinerary_cache.clear()
+        self.trip = {'city': 'Lisbon', 'country': 'Portugal', 'vibe': 'relaxed', 'days': '16', 'venues': ['Alfama', 'LX Factory']}
+
+    def tearDown(self):
+        itinerary._itinerary_cache.clear()
+
+    def test_day_chunks_are_weekly(self):
+        self.assertEqual(itinerary.day_chunks(16), [(1, 7), (8, 14), (15, 16)])
+        self.assertEqual(itinerary.day_chunks(3), [(1, 3)])
+
+    def test_split_results_merge_into_single_shape(self):
+        with patch.object(itinerary.http_client, 'post', side_effect=fake_post) as mock_post:
+            data = itinerary.generate_itinerary_and_sections(dict(self.trip), mode='split')
+        self.assertEqual(mock_post.call_count, 3 + 6)
+        self.assertEqual(list(data['itinerary']), [f'Day {i}' for i in range(1, 17)])
+        self.assertEqual(data['closing'], 'Enjoy')
+        self.assertEqual(data['tips'], ['Bring shoes'])
+        self.assertEqual(len(itinerary._itinerary_cache), 1)
+
+    def test_split_calls_keep_the_request_deadline(self):
+        seen = []
+
+        def record(provider, url, **kwargs):
+            seen.append(deadline.remaining())
+            return fake_post(provider, url, **kwargs)
+        with patch.object(itinerary.http_client, 'post', side_effect=record), deadline.within(30):
+            itinerary.generate_itinerary_and_sections(dict(self.trip), mode='split')
+        self.assertEqual(len(seen), 3 + 6)
+        self.assertTrue(all(left is not None and left <= 30 for left in seen))
+
+    def test_failed_chunk_is_not_cached(self):
+        def flaky(provider, url, **kwargs):
+            if 'Plan Day 8' in kwargs['json']['messages'][0]['content']:
+                raise RuntimeError('timeout')
+            return fake_post(provider, url, **kwargs)
+        with patch.object(itinerary.http_client, 'post', side_effect=flaky):
+            events = list(itinerary.stream_itinerary_and_sections(dict(self.trip), mode='split'))
+        days = [name for kind, name, _ in events if kind == 'day']
+        self.assertEqual(days, [f'Day {i}' for i in list(range(1, 8)) + [15, 16]])
+        self.assertEqual(events[-1][0], 'sections')
+        self.assertEqual(len(itinerary._itinerary_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
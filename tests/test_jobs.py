@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.jobs import JobQueue, JobQueueFull, get_job
+
+
+def wait_for(job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = get_job(job_id)
+        if job.status in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+class TestJobQueue(unittest.TestCase):
+    def test_backlog_is_bounded(self):
+        release = threading.Event()
+        queue = JobQueue('test', max_workers=1, max_backlog=1)
+        first = queue.submit(release.wait)
+        second = queue.submit(release.wait)
+        with self.assertRaises(JobQueueFull):
+            queue.submit(release.wait)
+        release.set()
+        self.assertEqual(wait_for(first.id).status, 'done')
+        wait_for(second.id)
+        self.assertEqual(queue.stats()['rejected'], 1)
+        self.assertEqual(queue.stats()['in_flight'], 0)
+
+    def test_failures_are_recorded(self):
+        queue = JobQueue('test_fail', max_workers=1)
+        job = wait_for(queue.submit(int, 'not a number').id)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('invalid literal', job.error)
+
+
+class TestJobEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_itinerary_job_returns_immediately(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_context(form):
+            started.set()
+            release.wait(5)
+            return {'city': form['trip_description']}
+
+        with patch('app.routes.itinerary_context', side_effect=slow_context):
+            response = self.client.post('/jobs/itinerary', data={'trip_description': 'jazz'})
+            self.assertEqual(response.status_code, 202)
+            job_id = response.get_json()['job_id']
+            started.wait(5)
+            self.assertEqual(self.client.get(f'/jobs/{job_id}').get_json()['status'], 'running')
+            self.assertEqual(self.client.get(f'/jobs/{job_id}/result').status_code, 202)
+            release.set()
+            self.assertEqual(wait_for(job_id).result, {'city': 'jazz'})
+        self.assertEqual(self.client.get('/jobs/nope').status_code, 404)
+
+    def test_pdf_job_renders_in_worker_process(self):
+        response = self.client.post('/jobs/pdf', data={'city_name': 'Lisbon', 'tips': '["Wear comfy shoes"]'})
+        job = wait_for(response.get_json()['job_id'])
+        self.assertEqual(job.status, 'done', job.error)
+        result = self.client.get(f"/jobs/{job.id}/result")
+        self.assertEqual(result.mimetype, 'application/pdf')
+        self.assertTrue(result.data.startswith(b'%PDF'))
+
+    def test_repeated_submit_reuses_the_job(self):
+        release = threading.Event()
+        data = {'trip_description': 'double click', 'idempotency_key': 'abc'}
+        with patch('app.routes.itinerary_context', side_effect=lambda form: release.wait(5) and {}) as mock_context:
+            first = self.client.post('/jobs/itinerary', data=data).get_json()['job_id']
+            second = self.client.post('/jobs/itinerary', data=data).get_json()['job_id']
+            release.set()
+            wait_for(first)
+            third = self.client.post('/jobs/itinerary', data=data).get_json()['job_id']
+            other = self.client.post('/jobs/itinerary', data=dict(data, idempotency_key='xyz')).get_json()['job_id']
+            wait_for(other)
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+        self.assertNotEqual(first, other)
+        self.assertEqual(mock_context.call_count, 2)
+
+    def test_index_form_submits_through_the_job_queue(self):
+        page = self.client.get('/').get_data(as_text=True)
+        self.assertIn("submitAsJob(form, \"/jobs/itinerary\", function(error)", page)
+        self.assertIn('id="job-error"', page)
+        self.assertIn('js/jobs.js', page)
+
+
+if __name__ == '__main__':
+    unittest.main()
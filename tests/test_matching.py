@@ -0,0 +1,43 @@
+import random
+import unittest
+from app import matching
+
+
+def brute_force_destination(text, entries, default):
+    best, best_score = default, 0
+    for entry in entries:
+        score = sum(1 for keyword in entry['keywords'] if keyword in text)
+        if score > best_score:
+            best, best_score = entry['city'], score
+    return best
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    def test_matches_overlapping_keywords_as_substrings(self):
+        matcher = matching.KeywordMatcher([{'keywords': ['he', 'she', 'hers']}, {'keywords': ['his', 'hers']}])
+        self.assertEqual(matcher.matched_keywords('USHERS'), {'he', 'she', 'hers'})
+        self.assertEqual([score for _, score in matcher.scores('ushers')], [3, 1])
+
+    def test_destination_and_inference(self):
+        self.assertEqual(matching.best_destination('beatles rock fish and chips'), 'London')
+        # Barcelona and Madrid tie on "spanish tapas"; the earlier city wins, as before
+        self.assertEqual(matching.best_destination('spanish tapas'), 'Barcelona')
+        self.assertEqual(matching.best_destination('nothing here', default='Paris'), 'Paris')
+        self.assertEqual(matching.infer_city('studio ghibli soundtrack'), ('Tokyo', 'Japan'))
+        # The first rule wins even when a later rule matches too
+        self.assertEqual(matching.infer_city('latin jazz'), ('Mexico City', 'Mexico'))
+        self.assertEqual(matching.infer_city('polka'), (None, None))
+
+    def test_agrees_with_substring_scan(self):
+        entries = matching._destinations.entries
+        vocabulary = [k for entry in entries for k in entry['keywords']] + ['the', 'and', 'music', 'x']
+        rng = random.Random(7)
+        for _ in range(500):
+            text = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(0, 6)))
+            text = text[rng.randint(0, 3):]
+            self.assertEqual(matching.best_destination(text, default='Paris'),
+                             brute_force_destination(text, entries, 'Paris'), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
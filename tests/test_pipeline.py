@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from app import deadline
+from app import pipeline as pipeline_module
+from app.pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+    def test_independent_stages_overlap(self):
+        def slow(value):
+            time.sleep(0.1)
+            return value
+
+        pipeline = Pipeline([
+            Stage('city', lambda: 'Rome'),
+            Stage('weather', slow, inputs=['city']),
+            Stage('image', slow, inputs=['city']),
+            Stage('info', slow, inputs=['city']),
+            Stage('page', lambda w, i, f: (w, i, f), inputs=['weather', 'image', 'info']),
+        ])
+        started = time.perf_counter()
+        result = pipeline.run()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result['page'], ('Rome', 'Rome', 'Rome'))
+        self.assertLess(elapsed, 0.25)
+        self.assertEqual(set(result.timings), {'city', 'weather', 'image', 'info', 'page'})
+        self.assertGreaterEqual(result.timings['page']['start_ms'], result.timings['weather']['end_ms'])
+
+    def test_initial_values_and_multiple_outputs(self):
+        pipeline = Pipeline([
+            Stage('split', lambda text: tuple(text.split()), inputs=['text'], outputs=['first', 'second']),
+            Stage('joined', lambda a, b: f"{b} {a}", inputs=['first', 'second']),
+        ])
+        result = pipeline.run({'text': 'hello world'})
+        self.assertEqual(result['joined'], 'world hello')
+
+    def test_stage_error_is_raised(self):
+        def boom():
+            raise KeyError('city')
+
+        pipeline = Pipeline([Stage('city', boom), Stage('weather', lambda c: c, inputs=['city'])])
+        with self.assertRaises(KeyError):
+            pipeline.run()
+
+    def test_stages_degrade_under_deadline(self):
+        def slow(city):
+            time.sleep(1)
+            return 'sunny'
+
+        pipeline = Pipeline([
+            Stage('city', lambda: 'Rome'),
+            Stage('weather', slow, inputs=['city'], fallback=lambda city: []),
+            Stage('ai', lambda city: 'plan', inputs=['city'], fallback=lambda city: 'late', min_seconds=5),
+            Stage('broken', lambda city: 1 / 0, inputs=['city'], fallback=lambda city: 'n/a'),
+            Stage('page', lambda w, a, b: (w, a, b), inputs=['weather', 'ai', 'broken']),
+        ])
+        started = time.perf_counter()
+        with deadline.within(0.2):
+            result = pipeline.run()
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(result['page'], ([], 'late', 'n/a'))
+        self.assertEqual(set(result.fallbacks), {'weather', 'ai', 'broken'})
+
+    def test_abandoned_stages_are_bounded(self):
+        release = threading.Event()
+        pipeline = Pipeline([Stage('weather', lambda: release.wait(5) and 'sunny', fallback=lambda: [])])
+        with patch.object(pipeline_module, 'PIPELINE_ABANDONED_HEADROOM', 1):
+            with deadline.within(0.1):
+                self.assertEqual(pipeline.run().fallbacks, {'weather': 'ran past the deadline'})
+            self.assertEqual(pipeline_module.abandoned_stages(), 1)
+            # With the headroom used up the next run doesn't queue another thread behind it
+            self.assertEqual(pipeline.run().fallbacks, {'weather': 'skipped with 1 abandoned stages still running'})
+            release.set()
+            for _ in range(100):
+                if not pipeline_module.abandoned_stages():
+                    break
+                time.sleep(0.01)
+            self.assertEqual(pipeline.run()['weather'], 'sunny')
+
+    def test_rejects_cycles_and_missing_inputs(self):
+        with self.assertRaises(ValueError):
+            Pipeline([Stage('a', lambda b: b, inputs=['b']), Stage('b', lambda a: a, inputs=['a'])])
+        with self.assertRaises(ValueError):
+            Pipeline([Stage('a', lambda x: x, inputs=['x'])]).run()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
 import requests
 import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -32,5 +36,40 @@ def test_qloo_api():
         except Exception as e:
             print(f"❌ Exception: {e}")
 
+class TestSearchFanOut(unittest.TestCase):
+    def test_search_many_keeps_input_order_and_overlaps(self):
+        from app import qloo_api
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_search(entity_type, name, expected_city=None, expected_country=None):
+            with lock:
+                active.append(name)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(name)
+            return [{"name": f"{name} result"}]
+
+        with patch.object(qloo_api, 'get_similar_entities', side_effect=fake_search):
+            results = qloo_api.search_many([("jazz", None, None), ("Italian", None, None), ("Amélie", None, None)])
+
+        self.assertEqual([r[0]["name"] for r in results], ["jazz result", "Italian result", "Amélie result"])
+        self.assertGreater(max(peak), 1)
+
+    def test_venues_merge_in_category_order(self):
+        from app import qloo_api
+
+        def fake_search(entity_type, name, expected_city=None, expected_country=None):
+            # Slowest category first so completion order differs from input order
+            time.sleep(0.05 if "attractions" in name else 0)
+            return [{"name": name}]
+
+        with patch.object(qloo_api, 'get_similar_entities', side_effect=fake_search):
+            venues = qloo_api.get_venues_for_city("Rome", categories=["attractions", "restaurants", "music venues"])
+
+        self.assertEqual(venues, ["Rome attractions", "Rome restaurants", "Rome music venues"])
+
 if __name__ == "__main__":
     test_qloo_api()
@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import patch
+from app import create_app, qr_utils
+
+
+class TestQrEndpoint(unittest.TestCase):
+    def setUp(self):
+        qr_utils._qr_cache.clear()
+        self.client = create_app().test_client()
+        self.url = '/qr?data=https://maps.google.com/?q=Louvre+Paris'
+
+    def tearDown(self):
+        qr_utils._qr_cache.clear()
+
+    def test_repeat_requests_use_cache_and_revalidate(self):
+        with patch.object(qr_utils.qrcode, 'make', wraps=qr_utils.qrcode.make) as make:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(make.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.mimetype, 'image/png')
+        self.assertIn('immutable', first.headers['Cache-Control'])
+
+        etag = first.headers['ETag']
+        revalidated = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_svg_format(self):
+        svg = self.client.get(self.url + '&format=svg')
+        png = self.client.get(self.url)
+        self.assertEqual(svg.mimetype, 'image/svg+xml')
+        self.assertIn(b'<svg', svg.data)
+        self.assertNotEqual(svg.headers['ETag'], png.headers['ETag'])
+        self.assertEqual(self.client.get(self.url + '&format=gif').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
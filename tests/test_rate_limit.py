@@ -0,0 +1,102 @@
+import datetime
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+from app import http_client, qloo_api, rate_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reservations_wait_for_refill(self):
+        clock = FakeClock()
+        bucket = rate_limit.TokenBucket(rate=2, capacity=2, clock=clock)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(max_wait=1), 0.5)
+        # Nothing is taken when the wait would be too long
+        self.assertIsNone(bucket.reserve(max_wait=0))
+        clock.now = 1.5
+        self.assertAlmostEqual(bucket.available(), 2)
+
+    def test_spend_resets_each_day(self):
+        day = [datetime.date(2026, 1, 1)]
+        governor = rate_limit.SpendGovernor(1.0, today=lambda: day[0])
+        self.assertTrue(governor.reserve(0.75))
+        self.assertFalse(governor.reserve(0.5))
+        day[0] = datetime.date(2026, 1, 2)
+        self.assertTrue(governor.reserve(0.5))
+
+
+class TestProviderLimits(unittest.TestCase):
+    def setUp(self):
+        rate_limit.reset()
+
+    def tearDown(self):
+        rate_limit.reset()
+
+    def test_zero_wait_gives_immediate_signal(self):
+        with patch.dict(os.environ, {'RATE_QLOO_REQUESTS_PER_SECOND': '1', 'RATE_QLOO_BURST': '1'}):
+            rate_limit.acquire('qloo', max_wait=0)
+            with self.assertRaises(rate_limit.OverBudget):
+                rate_limit.acquire('qloo', max_wait=0)
+        self.assertEqual(rate_limit.get_rate_limit_stats()['qloo']['rejected'], 1)
+        # Unknown providers are unlimited
+        for _ in range(100):
+            rate_limit.acquire('somewhere', max_wait=0)
+
+    def test_daily_budget_is_settled_against_usage(self):
+        body = {'messages': [{'content': 'x' * 400}], 'max_tokens': 900}
+        self.assertEqual(rate_limit.estimate_tokens(body), 1000)
+        with patch.dict(os.environ, {'RATE_TOGETHER_DAILY_BUDGET_USD': '0.35',
+                                     'RATE_TOGETHER_USD_PER_MILLION_TOKENS': '100'}):
+            session = http_client.get_session('together')
+            response = MagicMock(status_code=200)
+            response.json.return_value = {'usage': {'total_tokens': 400}}
+            with patch.object(session, 'request', return_value=response) as mock_request:
+                # Each call books $0.10 up front and is settled to $0.04
+                for _ in range(7):
+                    http_client.post('together', 'https://example.com/chat', json=body)
+                self.assertTrue(rate_limit.over_budget('together', 1000))
+                with self.assertRaises(rate_limit.OverBudget):
+                    http_client.post('together', 'https://example.com/chat', json=body)
+        self.assertEqual(mock_request.call_count, 7)
+        self.assertAlmostEqual(rate_limit.get_limiter('together').spend.spent_today(), 0.28)
+        http_client.close_all()
+
+    def test_streamed_call_is_settled_from_the_usage_chunk(self):
+        from app import itinerary
+        itinerary._itinerary_cache.clear()
+        chunks = [
+            {'choices': [{'delta': {'content': '{"itinerary": {"Day 1": {"morning": "Colosseum"}}}'}}]},
+            {'choices': [], 'usage': {'total_tokens': 400}},
+        ]
+        response = MagicMock(status_code=200)
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = [f"data: {json.dumps(chunk)}" for chunk in chunks] + ['data: [DONE]']
+        with patch.dict(os.environ, {'RATE_TOGETHER_USD_PER_MILLION_TOKENS': '100'}), \
+                patch.object(http_client.get_session('together'), 'request', return_value=response) as mock_request:
+            events = list(itinerary.stream_itinerary_and_sections({'city': 'Rome', 'days': '1', 'venues': []}))
+        self.assertEqual(events[0][:2], ('day', 'Day 1'))
+        self.assertTrue(mock_request.call_args.kwargs['json']['stream_options']['include_usage'])
+        self.assertAlmostEqual(rate_limit.get_limiter('together').spend.spent_today(), 0.04)
+        itinerary._itinerary_cache.clear()
+        http_client.close_all()
+
+    def test_qloo_skips_search_without_caching(self):
+        qloo_api._search_cache.clear()
+        with patch.object(qloo_api, 'QLOO_API_KEY', 'test-key'), \
+                patch.object(qloo_api.http_client, 'get', side_effect=rate_limit.OverBudget('qloo')):
+            self.assertEqual(qloo_api.get_similar_entities('', 'tango'), [])
+        self.assertEqual(len(qloo_api._search_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import unittest
+from app import itinerary
+from app.routes import prepare_sections
+from app.schemas import TripSections, parse_completion
+
+
+class TestParseCompletion(unittest.TestCase):
+    def test_complete_and_fenced(self):
+        self.assertEqual(parse_completion('```json\n{"tips": ["a"]}\n```'), ({'tips': ['a']}, True))
+
+    def test_object_followed_by_commentary_is_complete(self):
+        self.assertEqual(parse_completion('Here you go: {"tips": ["a"]} Enjoy!'), ({'tips': ['a']}, True))
+        self.assertEqual(parse_completion('{"tips": {"x": "a}"}}\nNote: prices vary {roughly}'),
+                         ({'tips': {'x': 'a}'}}, True))
+
+    def test_truncated_output_keeps_complete_parts(self):
+        content = '{"tips": ["Book ahead"], "itinerary": {"Day 1": {"morning": "Alfama"}, "Day 2": {"morning": "Bel'
+        data, complete = parse_completion(content)
+        self.assertFalse(complete)
+        self.assertEqual(data['tips'], ['Book ahead'])
+        self.assertEqual(data['itinerary']['Day 1'], {'morning': 'Alfama'})
+
+    def test_truncated_sections_are_not_cached(self):
+        itinerary._itinerary_cache.clear()
+        data = itinerary.finish_sections('{"tips": ["Book ahead"], "closing": "Enj', cache_key='k')
+        self.assertEqual(data['tips'], ['Book ahead'])
+        self.assertEqual(len(itinerary._itinerary_cache), 0)
+        itinerary.finish_sections('{"tips": ["Book ahead"]} Have a great trip!', cache_key='k')
+        self.assertEqual(len(itinerary._itinerary_cache), 1)
+        itinerary._itinerary_cache.clear()
+
+
+class TestTripSections(unittest.TestCase):
+    def test_encoded_and_odd_shapes_are_normalized(self):
+        sections = TripSections.from_sections({
+            'packing': json.dumps(json.dumps(['rncoat', 'Passport'])),
+            'tips': 'Carry cash',
+            'itinerary': {'itinerary': [{'morning': 'Alfama', 'evening': None}, 'Rest day']},
+            'closing': 42,
+        })
+        self.assertEqual(sections.packing, ['rncoat', 'Passport'])
+        self.assertEqual(sections.tips, ['Carry cash'])
+        self.assertEqual(sections.itinerary, {'Day 1': {'morning': 'Alfama'}, 'Day 2': 'Rest day'})
+        self.assertEqual(sections.closing, '42')
+
+    def test_page_and_pdf_read_the_same_sections(self):
+        page = prepare_sections({'packing': ['rncoat', 'Passport'], 'safety': ['Well lit'],
+                                 'itinerary': {'Day 1': {'morning': 'Alfama'}}})
+        self.assertEqual(page['packing_list'], {'Clothing': ['raincoat'], 'Documents': ['Passport']})
+        form = {'packing_list': json.dumps(page['packing_list']), 'tags': json.dumps(page['tags']),
+                'itinerary': json.dumps(page['itinerary']), 'tips': 'not json ['}
+        sections = TripSections.from_form(form)
+        self.assertEqual(sections.packing, page['packing_list'])
+        self.assertEqual(sections.safety, ['Well lit'])
+        self.assertEqual(sections.itinerary, {'Day 1': {'morning': 'Alfama'}})
+        self.assertEqual(sections.tips, ['not json ['])
+
+
+if __name__ == '__main__':
+    unittest.main()
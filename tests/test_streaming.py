@@ -0,0 +1,51 @@
+import json
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.itinerary import DayStreamParser
+
+
+class TestDayStreamParser(unittest.TestCase):
+    def test_days_are_emitted_once_complete(self):
+        parser = DayStreamParser()
+        self.assertEqual(parser.feed('{"tips": ["x"], "itinerary": {"Day 1": {"morning": "Colos'), [])
+        self.assertEqual(parser.feed('seum {tour}", "evening": "Trastevere"}, "Day 2": {"morning"'),
+                         [('Day 1', {'morning': 'Colosseum {tour}', 'evening': 'Trastevere'})])
+        self.assertEqual(parser.feed(': "Vatican"}}}'), [('Day 2', {'morning': 'Vatican'})])
+        self.assertEqual(parser.feed(''), [])
+
+
+class TestItineraryStream(unittest.TestCase):
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_events_arrive_per_stage_and_per_day(self):
+        def fake_stream(taste_data, weather=None):
+            yield 'day', 'Day 1', {'morning': 'Colosseum'}
+            yield 'day', 'Day 2', {'evening': 'Trastevere'}
+            yield 'sections', None, {'tips': ['Book ahead'], 'packing': ['passport'],
+                                     'itinerary': {'Day 1': {'morning': 'Colosseum'}, 'Day 2': {'evening': 'Trastevere'}}}
+
+        taste = {'city': 'Rome', 'reason': 'Pasta', 'venues': ['Colosseum'], 'taste_mapping': {}}
+        with patch('app.routes.parse_text_description', return_value={'music': 'opera', 'food': 'Italian'}), \
+                patch('app.routes.get_taste_recommendations', return_value=taste), \
+                patch('app.routes.city_image', return_value='/static/images/logo.png'), \
+                patch('app.routes.prefetch_estimate') as prefetch, \
+                patch('app.routes.stream_itinerary_and_sections', side_effect=fake_stream):
+            response = self.client.get('/itinerary/stream?trip_description=opera&start_date=2030-01-01&end_date=2030-01-05')
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        prefetch.assert_called_once_with('Nairobi', 'Rome', '2030-01')
+        events = [block.split('\n')[0][len('event: '):] for block in body.strip().split('\n\n')]
+        for expected in ['preferences', 'destination', 'venues', 'weather', 'image', 'city_info', 'sections']:
+            self.assertIn(expected, events)
+        self.assertEqual(events.count('day'), 2)
+        self.assertEqual(events[-1], 'done')
+        self.assertLess(events.index('destination'), events.index('day'))
+        sections = json.loads(body.split('event: sections\ndata: ')[1].split('\n\n')[0])
+        self.assertEqual(sections['packing_list'], {'Documents': ['passport']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from app import taxonomy
+from app.routes import categorize_flat_packing
+
+
+class TestTaxonomy(unittest.TestCase):
+    def test_first_category_in_file_order_wins(self):
+        # "Music Market" has both a music and a food keyword; music comes first, as before
+        venues = ['Music Market', 'La Boqueria', 'Picasso Museum', 'Camp Nou', 'Palau de la Música']
+        self.assertEqual(taxonomy.VENUES.classify(venues), ['music', 'food', 'film', 'additional', 'music'])
+        self.assertEqual(taxonomy.group_venues(venues),
+                         (['Music Market', 'Palau de la Música'], ['La Boqueria'], ['Picasso Museum'], ['Camp Nou']))
+
+    def test_cultural_paths(self):
+        spots = taxonomy.cultural_paths(['Barceloneta Beach', 'Camp Nou', 'Port Vell', 'Plaza Mayor'], 'jazz', 'noir', 'tapas')
+        self.assertEqual([spot['cultural_path'] for spot in spots], [
+            'jazz → Scenic inspiration → Barceloneta Beach',
+            'noir → Sports culture → Camp Nou',
+            'tapas → Waterfront dining → Port Vell',
+            'Cultural exploration → Plaza Mayor',
+        ])
+        self.assertEqual(len(taxonomy.cultural_paths(['Hill'] * 10, '', '', '')), 6)
+
+    def test_packing_categories(self):
+        self.assertEqual(categorize_flat_packing(['Rncoat', 'rncoat', 'Phone chrgr', 'Passport', 'Sunscreen', 'Snacks']), {
+            'Clothing': ['Rncoat', 'raincoat'],
+            'Electronics': ['Phone charger'],
+            'Documents': ['Passport'],
+            'Personal Care': ['Sunscreen'],
+            'Other': ['Snacks'],
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import random
+import unittest
+from app import text_cleaning
+from benchmarks.text_cleaning import FRAGMENTS, PAIRS, check, large_itinerary
+
+
+class TestTextCleaning(unittest.TestCase):
+    def test_examples(self):
+        self.assertEqual(text_cleaning.clean_section('## **Day1:** Bring the rncoat, book the htl'),
+                         'Day 1: Bring the raincoat, book the hotel')
+        self.assertEqual(text_cleaning.clean_itinerary_activity('Visit the Forum.Then  lunch ,with friends'),
+                         'Visit the Forum. Then lunch, with friends')
+        self.assertEqual(text_cleaning.clean_budget_line('["beignets at cafe du monde: $12"]'), 'Beignets at Cafe du Monde $12')
+        self.assertEqual(text_cleaning.clean_all([3, 'trvl  light'], text_cleaning.clean_text_content),
+                         ['3', 'travel light'])
+
+    def test_matches_previous_cleaners(self):
+        check(large_itinerary(days=40))
+        # Arbitrary character soup around the fragments, to reach pattern edge cases
+        rng = random.Random(11)
+        alphabet = 'aBz1 #*"\\.,:•\n' + 'rn htl'
+        soup = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) + rng.choice(FRAGMENTS)
+                for _ in range(2000)]
+        check(soup)
+        self.assertEqual(len(PAIRS), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import random
+import unittest
+from reportlab.pdfgen import canvas
+from app import text_layout
+
+
+def canvas_wrap(pdf, text, max_width, font_size):
+    """The word wrap download_pdf used to run against the canvas, kept as a reference."""
+    pdf.setFont("Helvetica", font_size)
+    lines, current_line = [], ""
+    for word in str(text).split():
+        if pdf.stringWidth(word) > max_width:
+            if current_line:
+                lines.append(current_line)
+                current_line = ""
+            while word:
+                temp_word = ""
+                for char in word:
+                    if pdf.stringWidth(temp_word + char) <= max_width:
+                        temp_word += char
+                    else:
+                        break
+                lines.append(temp_word)
+                word = word[len(temp_word):]
+        else:
+            test_line = current_line + (" " if current_line else "") + word
+            if pdf.stringWidth(test_line) <= max_width:
+                current_line = test_line
+            else:
+                if current_line:
+                    lines.append(current_line)
+                current_line = word
+    if current_line:
+        lines.append(current_line)
+    return lines
+
+
+class TestWrapText(unittest.TestCase):
+    def test_matches_canvas_wrapping(self):
+        pdf = canvas.Canvas(io.BytesIO())
+        rng = random.Random(7)
+        vocabulary = ['Kyoto', 'café', 'temple', '🏯', 'W', 'i', 'Fushimi-Inari-Taisha', '$120/night', 'ōmakase',
+                      'https://maps.google.com/?q=Kinkaku-ji+Kyoto+Japan']
+        for _ in range(300):
+            text = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(0, 40)))
+            width = rng.choice([60, 90, 140, 170, 372.0, 432])
+            size = rng.choice([9, 10, 11, 12])
+            self.assertEqual(text_layout.wrap_text(text, width, size), canvas_wrap(pdf, text, width, size))
+
+    def test_string_width_and_narrow_columns(self):
+        self.assertEqual(text_layout.string_width('Budget: €45', 'Helvetica-Bold', 13),
+                         canvas.Canvas(io.BytesIO()).stringWidth('Budget: €45', 'Helvetica-Bold', 13))
+        # A column narrower than one glyph still makes progress, one character per line
+        self.assertEqual(text_layout.wrap_text('WW', 1, 12), ['W', 'W'])
+
+
+if __name__ == '__main__':
+    unittest.main()
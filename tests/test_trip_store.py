@@ -0,0 +1,53 @@
+import os
+import re
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from app import create_app, trip_store
+
+
+class TestTripStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir_patch = patch.object(trip_store, 'TRIP_STORE_DIR', self.tmp.name)
+        self.dir_patch.start()
+        trip_store._recent.clear()
+
+    def tearDown(self):
+        self.dir_patch.stop()
+        trip_store._recent.clear()
+        self.tmp.cleanup()
+
+    def test_round_trip_compressed_and_expiring(self):
+        trip = {'city_info': {'name': 'Lisbon'}, 'tips': ['Wear good shoes'] * 50}
+        trip_id = trip_store.save(trip)
+        self.assertLess(os.path.getsize(trip_store._path(trip_id)), len(str(trip)) // 4)
+        trip_store._recent.clear()
+        self.assertEqual(trip_store.load(trip_id), trip)
+        self.assertIsNone(trip_store.load('../../etc/passwd'))
+        self.assertIsNone(trip_store.load('x' * 22))
+
+        trip_store._recent.clear()
+        old = time.time() - trip_store.TRIP_STORE_TTL - 60
+        os.utime(trip_store._path(trip_id), (old, old))
+        self.assertIsNone(trip_store.load(trip_id))
+        self.assertFalse(os.path.exists(trip_store._path(trip_id)))
+
+    def test_pdf_and_page_from_trip_id(self):
+        client = create_app().test_client()
+        page = client.post('/itinerary', data={'trip_description': 'jazz and pasta',
+                                               'start_date': '2030-05-01', 'end_date': '2030-05-04'})
+        trip_id = re.search(rb'name="trip_id" value="([^"]+)"', page.data).group(1).decode()
+        self.assertNotIn(b'name="packing_list"', page.data)
+
+        pdf = client.post('/download_pdf', data={'trip_id': trip_id})
+        self.assertEqual(pdf.status_code, 200)
+        self.assertTrue(pdf.data.startswith(b'%PDF'))
+        self.assertEqual(client.get(f'/trip/{trip_id}').status_code, 200)
+        self.assertEqual(client.get(f'/trip/{trip_id}/qr').mimetype, 'image/png')
+        self.assertEqual(client.post('/download_pdf', data={'trip_id': 'x' * 22}).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
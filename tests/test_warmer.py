@@ -0,0 +1,69 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+from app import warmer, weather_api
+from app.cache import TTLCache, refresh_ahead
+from app.destinations import catalog_cities, known_venues, search_fallback_venues
+from app.geodb_api import get_city_info
+
+
+class TestDestinations(unittest.TestCase):
+    def test_catalog_covers_fallbacks_and_inference_targets(self):
+        cities = dict(catalog_cities())
+        self.assertEqual(cities['Kingston'], 'Jamaica')
+        self.assertIn('Buenos Aires', cities)
+        self.assertEqual(known_venues('Rome')[:2], ['Colosseum', 'Vatican City'])
+        self.assertEqual(search_fallback_venues('Atlantis'), ['City Center', 'Historic District', 'Cultural Quarter'])
+        self.assertTrue(get_city_info('Vienna')['description'].startswith('Vienna is the imperial city of music'))
+
+
+class TestWarmer(unittest.TestCase):
+    def test_refresh_ahead_reports_expiring_entries_as_misses(self):
+        cache = TTLCache('test_refresh', ttl=100)
+        cache.set('rome', ['Colosseum'])
+        with refresh_ahead(50):
+            self.assertEqual(cache.lookup('rome'), (True, ['Colosseum']))
+        with refresh_ahead(200):
+            self.assertEqual(cache.lookup('rome'), (False, None))
+        # Other readers keep the old value until it is replaced
+        self.assertEqual(cache.get('rome'), ['Colosseum'])
+        self.assertEqual(cache.stats()['refreshes'], 1)
+
+    def test_round_covers_catalog_and_popular_cities(self):
+        warmer.note_destination('Lisbon')
+        with patch.object(warmer, 'warm_city') as warm_city:
+            warmed = warmer.warm_all()
+        cities = [call.args[0] for call in warm_city.call_args_list]
+        self.assertEqual(warmed, len(cities))
+        self.assertIn('Paris', cities)
+        self.assertIn('Lisbon', cities)
+        self.assertEqual(len(cities), len(set(cities)))
+
+    def test_forecasts_are_cached(self):
+        weather_api._forecast_cache.clear()
+        response = MagicMock(status_code=200)
+        response.json.return_value = {'list': [
+            {'dt_txt': '2030-05-01 12:00:00', 'weather': [{'main': 'Clear'}], 'main': {'temp': 21.4}},
+        ]}
+        with patch.dict(os.environ, {'OPENWEATHER_API_KEY': 'test-key'}), \
+                patch.object(weather_api.http_client, 'get', return_value=response) as mock_get:
+            first = weather_api.get_weather_forecast('Rome', days=7)
+            second = weather_api.get_weather_forecast(' rome ', days=7)
+        self.assertEqual(first, [{'date': '2030-05-01', 'desc': 'Clear', 'temp': 21}])
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+        weather_api._forecast_cache.clear()
+
+    def test_only_unknown_cities_are_negatively_cached(self):
+        weather_api._forecast_cache.clear()
+        responses = [MagicMock(status_code=503), MagicMock(status_code=429), MagicMock(status_code=404)]
+        with patch.dict(os.environ, {'OPENWEATHER_API_KEY': 'test-key'}), \
+                patch.object(weather_api.http_client, 'get', side_effect=responses) as mock_get:
+            for _ in range(4):
+                self.assertEqual(weather_api.get_weather_forecast('Atlantis'), [])
+        self.assertEqual(mock_get.call_count, 3)
+        weather_api._forecast_cache.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()